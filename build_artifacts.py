@@ -0,0 +1,31 @@
+"""Precompute the built-in presets so the app starts without running the model.
+
+    python build_artifacts.py            # пропускает сборку, если артефакт актуален
+    python build_artifacts.py --force
+"""
+import argparse
+import sys
+import time
+
+from models.preset_artifacts import ARTIFACT_DIR, build_preset_artifacts
+from utils.logging_config import log_error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сборка предрасчитанных пресетов")
+    parser.add_argument('--output-dir', default=ARTIFACT_DIR)
+    parser.add_argument('--force', action='store_true', help="пересобрать, даже если версия не изменилась")
+    args = parser.parse_args(argv)
+    try:
+        started = time.perf_counter()
+        path = build_preset_artifacts(args.output_dir, force=args.force)
+        print(f"Артефакты пресетов: {path} ({time.perf_counter() - started:.2f} с)")
+        return 0
+    except Exception as e:
+        log_error(e, context="Error building preset artifacts")
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
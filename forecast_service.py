@@ -0,0 +1,401 @@
+"""Local HTTP forecast service with request micro-batching (stdlib asyncio only).
+
+    python forecast_service.py --port 8765
+
+POST /forecast     {"preset": "standard", "params": {...}, "horizon": 24, "line_items": [...]}
+POST /sweep        {"preset": ..., "params": {...}, "axes": {"growth_rate_y1": [0.2, 0.3]}, "horizon": 24}
+POST /montecarlo   {"preset": ..., "params": {...}, "n_paths": 10000, "seed": 0, "horizon": 24}
+GET  /stats        latency percentiles per endpoint, batch sizes, cache counters
+GET  /health
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+from models.cache import forecast_cache, parameters_hash
+from models.financial_model import calculate_financials_batch
+from models.metrics import summarize
+from models.monte_carlo import run_monte_carlo
+from models.parameters import INTEGER_KEYS, PARAMETER_KEYS, SHARE_KEYS, ModelParameters, stack_parameters
+from models.results import ForecastResult
+from models.sweep import grid_rows
+from utils.logging_config import log_error, log_info
+from utils.presets import PRESETS
+
+MAX_HORIZON = 240
+MAX_SWEEP_ROWS = 200000
+MAX_MONTE_CARLO_PATHS = 1000000
+STATS_WINDOW = 10000  # последние N запросов для перцентилей
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    """Client error reported as HTTP 400"""
+
+
+def number(value, name):
+    """Finite JSON number (booleans excluded) or RequestError"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise RequestError(f"{name} must be a finite number")
+    return value
+
+
+def integer(value, name):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise RequestError(f"{name} must be an integer")
+    return value
+
+
+def parameter_value(key, value):
+    """Value of parameter ``key`` from a request, checked against the parameter's domain"""
+    number(value, key)
+    if key in INTEGER_KEYS:
+        if value != int(value) or not 1 <= value <= MAX_HORIZON:
+            raise RequestError(f"{key} must be a whole number of months between 1 and {MAX_HORIZON}")
+    elif key in SHARE_KEYS:
+        if not 0 <= value <= 1:
+            raise RequestError(f"{key} must be between 0 and 1")
+    elif value < 0:
+        raise RequestError(f"{key} must be non-negative")
+    return value
+
+
+async def resolve_params(body):
+    """Preset (default 'standard') with ``params`` overrides; unknown keys and out-of-range values are rejected"""
+    overrides = body.get('params', {})
+    if not isinstance(overrides, dict):
+        raise RequestError("params must be a JSON object")
+    unknown = set(overrides) - set(PARAMETER_KEYS)
+    if unknown:
+        raise RequestError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    for key, value in overrides.items():
+        parameter_value(key, value)
+    preset = body.get('preset', 'standard')
+    if not isinstance(preset, str):
+        raise RequestError("preset must be a string")
+    try:
+        if preset in PRESETS:
+            base = ModelParameters.from_mapping(PRESETS[preset])
+        else:
+            # Пользовательские пресеты читаются из файла: не блокируем цикл событий
+            base = await asyncio.get_running_loop().run_in_executor(None, ModelParameters.from_preset, preset)
+    except KeyError as e:
+        raise RequestError(str(e.args[0]))
+    return ModelParameters.from_mapping({**base.to_dict(), **overrides})
+
+
+def resolve_horizon(body):
+    horizon = integer(body.get('horizon', 24), 'horizon')
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise RequestError(f"horizon must be between 1 and {MAX_HORIZON}")
+    return horizon
+
+
+def jsonable(values):
+    """Lists for JSON with NaN and infinities as null"""
+    return [None if isinstance(x, float) and not math.isfinite(x) else x
+            for x in np.asarray(values, dtype=np.float64).tolist()]
+
+
+class ServiceStats:
+    def __init__(self):
+        self.latency = defaultdict(lambda: deque(maxlen=STATS_WINDOW))
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.batch_sizes = deque(maxlen=STATS_WINDOW)
+        self.batches = 0
+        self.batched_requests = 0
+        self.deduplicated = 0
+        self.started = time.time()
+
+    def record(self, endpoint, seconds, ok):
+        self.requests[endpoint] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+        self.latency[endpoint].append(seconds)
+
+    def snapshot(self):
+        latency = {}
+        for endpoint, values in self.latency.items():
+            values = np.array(values) * 1000
+            latency[endpoint] = {
+                'requests': self.requests[endpoint],
+                'errors': self.errors[endpoint],
+                'p50_ms': float(np.percentile(values, 50)),
+                'p99_ms': float(np.percentile(values, 99)),
+                'max_ms': float(values.max()),
+            }
+        sizes = np.array(self.batch_sizes) if self.batch_sizes else np.zeros(1)
+        return {
+            'uptime_s': time.time() - self.started,
+            'latency': latency,
+            'batching': {
+                'batches': self.batches,
+                'requests': self.batched_requests,
+                'deduplicated': self.deduplicated,
+                'mean_size': float(sizes.mean()),
+                'p50_size': float(np.percentile(sizes, 50)),
+                'p99_size': float(np.percentile(sizes, 99)),
+                'max_size': int(sizes.max()),
+            },
+            'cache': forecast_cache.stats(),
+        }
+
+
+class MicroBatcher:
+    """Coalesces forecast requests arriving within ``window`` seconds into one batch call.
+
+    Cached parameter sets are answered at once; identical ones inside a
+    window are computed once. The model runs in a worker thread so the event
+    loop keeps accepting requests while a batch is computed.
+    """
+
+    def __init__(self, stats, window=0.002, max_batch=4096):
+        self.stats = stats
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._tasks = set()
+        self._timer = None
+
+    async def submit(self, params, horizon):
+        key = parameters_hash(params, horizon)
+        loop = asyncio.get_running_loop()
+        cached = forecast_cache.get(key, use_disk=False)
+        if cached is None and forecast_cache.disk is not None:
+            # Чтение с диска — в пуле потоков, чтобы не задерживать другие запросы
+            cached = await loop.run_in_executor(None, forecast_cache.get, key)
+        if cached is not None:
+            return cached
+        future = loop.create_future()
+        self._pending.append((key, params, horizon, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Цикл событий хранит только слабые ссылки на задачи
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        unique = {}
+        waiters = defaultdict(list)
+        for key, params, horizon, future in batch:
+            unique.setdefault(key, (params, horizon))
+            waiters[key].append(future)
+        self.stats.batches += 1
+        self.stats.batched_requests += len(batch)
+        self.stats.deduplicated += len(batch) - len(unique)
+        self.stats.batch_sizes.append(len(unique))
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(None, self._compute, unique)
+        except Exception as e:
+            log_error(e, context="Error in forecast batch")
+            results = None
+            error = e
+        for key, futures in waiters.items():
+            for future in futures:
+                if future.done():
+                    continue
+                if results is None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[key])
+
+    @staticmethod
+    def _compute(unique):
+        by_horizon = defaultdict(list)
+        for key, (params, horizon) in unique.items():
+            by_horizon[horizon].append((key, params))
+        results = {}
+        for horizon, items in by_horizon.items():
+            months = np.arange(1, horizon + 1)
+            out = calculate_financials_batch(stack_parameters([params for _, params in items]),
+                                             months=months)
+            for row, (key, _) in enumerate(items):
+                # Копия строки: кэш не должен удерживать массив всего пакета
+                result = ForecastResult({'month': months, **{name: values[row].copy()
+                                                             for name, values in out.items()}})
+                # Только в памяти: запись на диск задержала бы ответы всего пакета
+                results[key] = forecast_cache.put(key, result, persist=False)
+        return results
+
+
+class ForecastService:
+    def __init__(self, window=0.002, max_batch=4096):
+        self.stats = ServiceStats()
+        self.batcher = MicroBatcher(self.stats, window, max_batch)
+        self.routes = {
+            ('POST', '/forecast'): self.forecast,
+            ('POST', '/sweep'): self.sweep,
+            ('POST', '/montecarlo'): self.monte_carlo,
+            ('GET', '/stats'): self.get_stats,
+            ('GET', '/health'): self.health,
+        }
+
+    async def forecast(self, body):
+        params = await resolve_params(body)
+        horizon = resolve_horizon(body)
+        result = await self.batcher.submit(params, horizon)
+        line_items = body.get('line_items') or [key for key in result.keys() if key != 'month']
+        if not isinstance(line_items, list) or not all(isinstance(key, str) for key in line_items):
+            raise RequestError("line_items must be a list of names")
+        unknown = set(line_items) - set(result.keys())
+        if unknown:
+            raise RequestError(f"Unknown line items: {', '.join(sorted(unknown))}")
+        return {
+            'horizon': horizon,
+            'months': result.months.tolist(),
+            'line_items': {key: jsonable(result[key]) for key in line_items},
+        }
+
+    async def sweep(self, body):
+        params = await resolve_params(body)
+        horizon = resolve_horizon(body)
+        axes = body.get('axes') or {}
+        if not isinstance(axes, dict) or not axes or set(axes) - set(PARAMETER_KEYS) or not all(
+                isinstance(values, list) and values for values in axes.values()):
+            raise RequestError("axes must map parameter names to lists of values")
+        for key, values in axes.items():
+            for value in values:
+                parameter_value(key, value)
+        n_rows = int(np.prod([len(values) for values in axes.values()]))
+        if n_rows > MAX_SWEEP_ROWS:
+            raise RequestError(f"Sweep has {n_rows} scenarios, the limit is {MAX_SWEEP_ROWS}")
+
+        def compute():
+            matrix = grid_rows(params.to_row(), axes, 0, n_rows)
+            return summarize(calculate_financials_batch(matrix, months=range(1, horizon + 1)), matrix)
+
+        summary = await asyncio.get_running_loop().run_in_executor(None, compute)
+        return {
+            'axes': axes,
+            'shape': [len(values) for values in axes.values()],
+            'summary': {key: jsonable(values) for key, values in summary.items()},
+        }
+
+    async def monte_carlo(self, body):
+        params = await resolve_params(body)
+        horizon = resolve_horizon(body)
+        n_paths = integer(body.get('n_paths', 10000), 'n_paths')
+        if not 1 <= n_paths <= MAX_MONTE_CARLO_PATHS:
+            raise RequestError(f"n_paths must be between 1 and {MAX_MONTE_CARLO_PATHS}")
+        seed = integer(body.get('seed', 0), 'seed')
+        if seed < 0:
+            raise RequestError("seed must be non-negative")
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: run_monte_carlo(params, n_paths=n_paths, seed=seed, workers=1,
+                                          months=range(1, horizon + 1)))
+        return {
+            'n_paths': result.n_paths,
+            'seed': result.seed,
+            'months': result.months.tolist(),
+            'bands': {metric: {str(p): jsonable(values) for p, values in bands.items()}
+                      for metric, bands in result.bands.items()},
+            'mean': {metric: jsonable(values) for metric, values in result.mean.items()},
+            'profitable_by_month': jsonable(result.profitable_by_month),
+        }
+
+    async def get_stats(self, body):
+        return self.stats.snapshot()
+
+    async def health(self, body):
+        return {'status': 'ok'}
+
+    async def dispatch(self, method, path, raw_body):
+        started = time.perf_counter()
+        route = path.split('?', 1)[0]
+        handler = self.routes.get((method, route))
+        if handler is None:
+            status = 405 if any(route == known for _, known in self.routes) else 404
+            return status, {'error': STATUS_TEXT[status]}
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise RequestError("Request body must be a JSON object")
+            status, payload = 200, await handler(body)
+        except (RequestError, json.JSONDecodeError) as e:
+            status, payload = 400, {'error': str(e)}
+        except Exception as e:
+            log_error(e, context=f"Error handling {method} {route}")
+            status, payload = 500, {'error': str(e)}
+        if route not in ('/stats', '/health'):
+            self.stats.record(route, time.perf_counter() - started, status == 200)
+        return status, payload
+
+    async def handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive: request line, headers, Content-Length body"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                raw_body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self.dispatch(method, path, raw_body)
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=8765, window=0.002, max_batch=4096):
+    service = ForecastService(window, max_batch)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    log_info(f"Forecast service listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP-сервис прогнозов с пакетной обработкой запросов")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--window-ms', type=float, default=2.0, help="окно сбора запросов в пакет")
+    parser.add_argument('--max-batch', type=int, default=4096)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.window_ms / 1000, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import json
 import plotly.graph_objects as go
-from utils.config import initialize_session_state
+from utils.config import initialize_session_state, get_model_parameters, format_years
 from utils.logging_config import log_error, log_info
+from models.cache import BAND_PATHS, cached_bands, cached_forecast, warm_presets
+from models.cohorts import cohort_economics
 from models.financial_model import FinancialModel
 from utils.presets import PRESETS
 from utils.translations import get_translation
@@ -37,9 +39,21 @@ def init_app():
 # Initialize application state
 init_app()
 
+# Built-in presets are computed once per process and shared by all sessions
+warm_presets()
+
 def format_money(amount):
     return "{:,.0f} ₽".format(amount)
 
+def add_band(fig, months, bands, name, fillcolor):
+    """Shaded P5–P95 area; drawn before the line it belongs to"""
+    fig.add_trace(go.Scatter(
+        x=months, y=bands[95], mode='lines', line=dict(width=0),
+        showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(
+        x=months, y=bands[5], mode='lines', line=dict(width=0),
+        fill='tonexty', fillcolor=fillcolor, name=f'{name}: P5–P95', hoverinfo='skip'))
+
 def main():
     try:
         # Language selector in sidebar
@@ -78,6 +92,16 @@ def main():
 
         # Base Parameters
         with st.expander("Базовые параметры", expanded=False):
+            horizon_options = [2, 3, 5, 7, 10]
+            horizon_years = st.selectbox(
+                "Горизонт прогноза",
+                options=horizon_options,
+                index=horizon_options.index(st.session_state.get('horizon_years', 2)),
+                format_func=format_years,
+                key="horizon_years_select"
+            )
+            # Виджетное состояние не живёт на других страницах: храним горизонт отдельно
+            st.session_state['horizon_years'] = horizon_years
             st.session_state['initial_users'] = st.number_input(
                 "Начальное количество пользователей",
                 min_value=500,
@@ -120,6 +144,13 @@ def main():
                 help="Процент кэшбэка от суммы покупки",
                 key="cashback_rate_slider"
             )
+            st.session_state['points_ledger'] = st.checkbox(
+                "Учёт баллов по выпускам (FIFO)",
+                value=st.session_state.get('points_ledger', False),
+                help="Погашения списывают самые старые баллы; в срок подтверждения сгорает доля остатка, "
+                     "ещё через один срок — всё, что осталось. Показывает обязательства по баллам",
+                key="points_ledger_checkbox"
+            )
 
         # Commission Parameters
         with st.expander("Комиссии", expanded=False):
@@ -164,10 +195,40 @@ def main():
                     value=st.session_state['marketing_efficiency'],
                     step=10
                 )
+            col7, col8 = st.columns(2)
+            with col7:
+                st.session_state['retention_decay'] = st.slider(
+                    "Скорость оттока пользователей",
+                    min_value=0.0,
+                    max_value=0.5,
+                    value=float(st.session_state.get('retention_decay', 0.0)),
+                    step=0.01,
+                    help="0 — без оттока; больше 0 — когортная модель с затухающим удержанием",
+                    key="retention_decay_slider"
+                )
+            with col8:
+                st.session_state['retention_floor'] = st.slider(
+                    "Долгосрочное удержание",
+                    min_value=0.0,
+                    max_value=1.0,
+                    value=float(st.session_state.get('retention_floor', 0.3)),
+                    step=0.05,
+                    help="Доля когорты, которая остаётся активной в долгосрочной перспективе",
+                    key="retention_floor_slider"
+                )
         
         # Initialize model and calculate with current parameters
-        model = FinancialModel()
-        data = model.calculate_financials()
+        params = get_model_parameters()
+        points_ledger = st.session_state['points_ledger']
+        model = FinancialModel(params, horizon=horizon_years * 12, points_ledger=points_ledger)
+        # Пересчитываем только месяцы, на которые повлияло изменение параметров
+        previous = st.session_state.get('last_forecast')
+        if previous is not None:
+            compute = lambda: model.recalculate(previous['data'], previous['params'])
+        else:
+            compute = model.calculate_financials
+        data = cached_forecast(params, len(model.months), compute, points_ledger)
+        st.session_state['last_forecast'] = {'params': params, 'data': data}
         
         if not data:
             st.error("No data available for visualization")
@@ -198,12 +259,12 @@ def main():
                     st.rerun()
                     
         with col_month:
-            selected_month = st.selectbox("Месяц", range(1, 25), 23)
+            selected_month = st.selectbox("Месяц", model.months, len(model.months) - 1)
         month_data = data[selected_month - 1]
         
         # Calculate totals
-        total_revenue = sum(d['revenue'] for d in data)
-        total_profit = sum(d['profit'] for d in data)
+        total_revenue = data['revenue'].sum()
+        total_profit = data['profit'].sum()
         
         # Create metrics columns with detailed information
         st.markdown("""
@@ -271,7 +332,7 @@ def main():
                     <div>Объём покупок (GMV): {month_data['purchase_volume']:,.0f} ₽</div>
                     <div>Оборот программы: {month_data['loyalty_turnover']:,.0f} ₽</div>
                 </div>
-                <div class="metric-subtitle">Общая за 2 года: {total_revenue:,.0f} ₽</div>
+                <div class="metric-subtitle">Общая за {format_years(horizon_years)}: {total_revenue:,.0f} ₽</div>
             </div>
             """, unsafe_allow_html=True)
         
@@ -293,7 +354,7 @@ def main():
             <div class="metric-container">
                 <div class="metric-title">Месячная прибыль</div>
                 <div class="metric-value">{month_data['profit']:,.0f} ₽</div>
-                <div class="metric-subtitle">Общая за 2 года: {total_profit:,.0f} ₽</div>
+                <div class="metric-subtitle">Общая за {format_years(horizon_years)}: {total_profit:,.0f} ₽</div>
             </div>
             """, unsafe_allow_html=True)
             
@@ -310,17 +371,25 @@ def main():
             """, unsafe_allow_html=True)
         
         # Display charts
+        show_bands = st.checkbox(
+            "Показывать диапазон P5–P95 (Монте-Карло)", value=True, key='show_bands',
+            help=f"{BAND_PATHS} траекторий с неопределёнными параметрами вокруг текущего сценария")
+        bands = cached_bands(params, len(model.months)).bands if show_bands else None
+
         st.subheader("Выручка, расходы и прибыль")
         fig_revenue = go.Figure()
+        if bands:
+            add_band(fig_revenue, data.months, bands['revenue'], 'Выручка', 'rgba(136, 132, 216, 0.2)')
+            add_band(fig_revenue, data.months, bands['profit'], 'Чистая прибыль', 'rgba(255, 198, 88, 0.25)')
 
         # Prepare data for traces
-        months = [d['month'] for d in data]
+        months = data.months
         traces_data = [
-            ('Выручка', [d['revenue'] for d in data], '#8884d8'),
-            ('Маркетинг', [d['marketing'] for d in data], '#82ca9d'),
-            ('ФОТ', [d['fot'] for d in data], '#ff7300'),
-            ('Налоги', [d.get('taxes', 0) for d in data], '#d88884'),
-            ('Чистая прибыль', [d['profit'] for d in data], '#ffc658')
+            ('Выручка', data['revenue'], '#8884d8'),
+            ('Маркетинг', data['marketing'], '#82ca9d'),
+            ('ФОТ', data['fot'], '#ff7300'),
+            ('Налоги', data['taxes'], '#d88884'),
+            ('Чистая прибыль', data['profit'], '#ffc658')
         ]
 
         # Add traces with customized hover template
@@ -382,13 +451,13 @@ def main():
         fig_revenue_structure = go.Figure()
 
         # Подготовка данных для графика
-        months = [d['month'] for d in data]
+        months = data.months
         revenue_components = [
-            ('Комиссии обмена/начисления', [d['commission_revenue'] - d.get('expired_points_income', 0) for d in data], '#8884d8'),
-            ('Неизрасходованные баллы', [d.get('expired_points_income', 0) for d in data], '#4B0082'),
-            ('Премиум Бизнес', [d['subscription_revenue'] for d in data], '#82ca9d'),
-            ('Премиум Пользователи', [d['premium_revenue'] for d in data], '#ffc658'),
-            ('Доход от рекламы', [d['additional_revenue'] for d in data], '#ff7300')
+            ('Комиссии обмена/начисления', data['commission_revenue'] - data['expired_points_income'], '#8884d8'),
+            ('Неизрасходованные баллы', data['expired_points_income'], '#4B0082'),
+            ('Премиум Бизнес', data['subscription_revenue'], '#82ca9d'),
+            ('Премиум Пользователи', data['premium_revenue'], '#ffc658'),
+            ('Доход от рекламы', data['additional_revenue'], '#ff7300')
         ]
 
         # Добавление слоев на график
@@ -446,11 +515,14 @@ def main():
         # Display user growth
         st.subheader("Рост пользователей")
         fig_users = go.Figure()
+        if bands:
+            add_band(fig_users, data.months, bands['active_users'], 'Активные пользователи',
+                     'rgba(136, 132, 216, 0.2)')
 
         # Add traces for different types of growth
         fig_users.add_trace(go.Scatter(
-            x=[d['month'] for d in data],
-            y=[d['active_users'] for d in data],
+            x=data.months,
+            y=data['active_users'],
             name='Активные пользователи',
             mode='lines+markers',
             line=dict(color='#8884d8', width=2),
@@ -459,8 +531,8 @@ def main():
         ))
 
         fig_users.add_trace(go.Scatter(
-            x=[d['month'] for d in data],
-            y=[d['new_users'] for d in data],
+            x=data.months,
+            y=data['new_users'],
             name='Новые от маркетинга',
             mode='lines+markers',
             line=dict(color='#82ca9d', width=2),
@@ -469,8 +541,8 @@ def main():
         ))
 
         fig_users.add_trace(go.Scatter(
-            x=[d['month'] for d in data],
-            y=[d['base_growth'] for d in data],
+            x=data.months,
+            y=data['base_growth'],
             name='Органический рост',
             mode='lines+markers',
             line=dict(color='#ffc658', width=2),
@@ -480,8 +552,8 @@ def main():
 
         # Add partner growth
         fig_users.add_trace(go.Scatter(
-            x=[d['month'] for d in data],
-            y=[d['active_users'] / 100 for d in data],  # Partners are 1/100 of active users
+            x=data.months,
+            y=data['active_users'] / 100,  # Partners are 1/100 of active users
             name='Партнеры',
             mode='lines+markers',
             line=dict(color='#ff7300', width=2),
@@ -532,8 +604,8 @@ def main():
         st.subheader("Объём покупок (GMV) и оборот программы")
         fig_turnover = go.Figure()
         fig_turnover.add_trace(go.Scatter(
-            x=[d['month'] for d in data],
-            y=[d['purchase_volume'] for d in data],
+            x=data.months,
+            y=data['purchase_volume'],
             name='Объём покупок (GMV)',
             mode='lines+markers',
             line=dict(color='#8884d8', width=2),
@@ -542,8 +614,8 @@ def main():
         ))
         
         fig_turnover.add_trace(go.Scatter(
-            x=[d['month'] for d in data],
-            y=[d['loyalty_turnover'] for d in data],
+            x=data.months,
+            y=data['loyalty_turnover'],
             name='Оборот программы лояльности',
             mode='lines+markers',
             line=dict(color='#82ca9d', width=2),
@@ -589,6 +661,104 @@ def main():
             )
         )
         st.plotly_chart(fig_turnover, use_container_width=True)
+
+        # Обязательства по баллам (только при учёте по выпускам)
+        if 'points_outstanding' in data:
+            st.subheader("Обязательства по баллам")
+            fig_points = go.Figure()
+            for key, name, color in (('points_issued', 'Начислено', '#82ca9d'),
+                                     ('points_redeemed', 'Погашено', '#8884d8'),
+                                     ('points_expired', 'Сгорело', '#ff7f0e')):
+                fig_points.add_trace(go.Bar(
+                    x=data.months,
+                    y=data[key],
+                    name=name,
+                    marker_color=color,
+                    hovertemplate=f'{name}: %{{y:,.0f}} ₽<extra></extra>'
+                ))
+            fig_points.add_trace(go.Scatter(
+                x=data.months,
+                y=data['points_outstanding'],
+                name='Непогашенные баллы на конец месяца',
+                mode='lines+markers',
+                line=dict(color='#d62728', width=2),
+                marker=dict(size=6),
+                hovertemplate='Обязательства: %{y:,.0f} ₽<extra></extra>'
+            ))
+            fig_points.update_layout(
+                barmode='group',
+                showlegend=True,
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+                height=450,
+                xaxis=dict(
+                    title='Месяц',
+                    showgrid=True,
+                    gridwidth=1,
+                    gridcolor='#f0f0f0',
+                    tickformat=',d',
+                    zeroline=False
+                ),
+                yaxis=dict(
+                    title='Баллы (₽)',
+                    showgrid=True,
+                    gridwidth=1,
+                    gridcolor='#f0f0f0',
+                    tickformat=',.0f',
+                    zeroline=False
+                ),
+                hovermode='x unified',
+                margin=dict(l=50, r=50, t=30, b=50),
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="right",
+                    x=1
+                )
+            )
+            st.plotly_chart(fig_points, use_container_width=True)
+            st.caption(f"Обязательства на конец месяца {selected_month}: "
+                       f"{month_data['points_outstanding']:,.0f} ₽")
+
+        # Экономика когорт (только при включённом оттоке)
+        if params.retention_decay > 0:
+            st.subheader("LTV / CAC по месяцу привлечения")
+            economics = cohort_economics(
+                {key: data[key][None, :] for key in data.keys()}, params.to_row()[None, :])
+            fig_cohorts = go.Figure()
+            fig_cohorts.add_trace(go.Bar(
+                x=data.months,
+                y=economics['ltv_cac'][0],
+                name='LTV / CAC',
+                marker_color='#8884d8',
+                customdata=list(zip(economics['ltv'][0], economics['cac'][0])),
+                hovertemplate='LTV / CAC: %{y:.2f}<br>LTV: %{customdata[0]:,.0f} ₽<br>CAC: %{customdata[1]:,.0f} ₽<extra></extra>'
+            ))
+            fig_cohorts.update_layout(
+                showlegend=False,
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+                height=450,
+                xaxis=dict(
+                    title='Месяц привлечения',
+                    showgrid=True,
+                    gridwidth=1,
+                    gridcolor='#f0f0f0',
+                    tickformat=',d',
+                    zeroline=False
+                ),
+                yaxis=dict(
+                    title='LTV / CAC',
+                    showgrid=True,
+                    gridwidth=1,
+                    gridcolor='#f0f0f0',
+                    tickformat=',.2f',
+                    zeroline=False
+                ),
+                margin=dict(l=50, r=50, t=30, b=50)
+            )
+            st.plotly_chart(fig_cohorts, use_container_width=True)
         
     except Exception as e:
         log_error(e, context="Error in main application")
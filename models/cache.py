@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from models.disk_cache import disk_cache_from_env
+from models.financial_model import DEFAULT_HORIZON, calculate_financials
+from models.monte_carlo import run_monte_carlo
+from models.parameters import ModelParameters
+from utils.logging_config import log_info
+
+DEFAULT_MAX_BYTES = int(os.environ.get('FORECAST_CACHE_MAX_MB', '256')) * 1024 * 1024
+ENTRY_OVERHEAD_BYTES = 2048  # словари, ключ и объект результата
+
+# Траекторий для полос неопределённости на основных графиках
+BAND_PATHS = 2000
+BAND_METRICS = ('revenue', 'profit', 'active_users')
+
+
+def parameters_hash(params, horizon=DEFAULT_HORIZON):
+    """Canonical content hash of a resolved parameter set and horizon"""
+    payload = json.dumps({'params': params.to_dict(), 'horizon': horizon}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ForecastCache:
+    """Thread-safe LRU cache of forecast results with a total size cap.
+
+    Results are immutable ForecastResult objects, so one cached instance can
+    be handed to every Streamlit session at once. An optional ``disk`` cache
+    is the second layer: memory misses are looked up there, and new entries
+    are written through to it so they survive a restart.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk=None):
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(value):
+        return getattr(value, 'nbytes', 0) + ENTRY_OVERHEAD_BYTES
+
+    def get(self, key, use_disk=True):
+        """Cached value or None; ``use_disk=False`` looks only in memory"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        if use_disk and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self._insert(key, value)
+        return value
+
+    def put(self, key, value, persist=True):
+        """Store ``value``; ``persist=False`` keeps it out of the disk layer"""
+        if persist and self.disk is not None:
+            self.disk.put(key, value)
+        return self._insert(key, value)
+
+    def _insert(self, key, value):
+        size = self._entry_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = value
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= self._entry_size(evicted)
+                self.evictions += 1
+            return value
+
+    def get_or_compute(self, key, compute):
+        """Cached value for ``key``; computes outside the lock on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self.size_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'disk': self.disk.stats() if self.disk is not None else None,
+            }
+
+
+# Общий для всего процесса кэш: модули импортируются один раз на все сессии Streamlit
+forecast_cache = ForecastCache(disk=disk_cache_from_env())
+_warm_lock = threading.Lock()
+_warmed = False
+
+
+def cached_forecast(params, horizon=DEFAULT_HORIZON, compute=None, points_ledger=False):
+    """Forecast for ``params`` from the process-wide cache.
+
+    ``compute`` overrides how a miss is filled, e.g. with an incremental
+    recalculation from the session's previous result. Forecasts with the
+    points ledger are cached under their own keys.
+    """
+    key = ('ledger:' if points_ledger else '') + parameters_hash(params, horizon)
+    if compute is None:
+        compute = lambda: calculate_financials(params, range(1, horizon + 1), points_ledger)
+    return forecast_cache.get_or_compute(key, compute)
+
+
+def bands_key(params, horizon=DEFAULT_HORIZON):
+    return 'bands:' + parameters_hash(params, horizon)
+
+
+def compute_bands(params, horizon=DEFAULT_HORIZON):
+    """P5–P95 bands from a small Monte Carlo run with a fixed seed"""
+    return run_monte_carlo(params, n_paths=BAND_PATHS, seed=0, workers=1, chunk_size=BAND_PATHS,
+                           months=range(1, horizon + 1), metrics=BAND_METRICS)
+
+
+def cached_bands(params, horizon=DEFAULT_HORIZON):
+    return forecast_cache.get_or_compute(bands_key(params, horizon), lambda: compute_bands(params, horizon))
+
+
+def warm_presets(horizon=DEFAULT_HORIZON):
+    """Load the built-in presets from prebuilt artifacts, or compute them, once per process"""
+    global _warmed
+    with _warm_lock:
+        if _warmed:
+            return
+        from models.preset_artifacts import load_preset_artifacts
+        from utils.presets import PRESETS
+
+        if load_preset_artifacts():
+            _warmed = True
+            return
+
+        for name in PRESETS:
+            cached_forecast(ModelParameters.from_preset(name), horizon)
+        _warmed = True
+        log_info(f"Forecast cache warmed with {len(PRESETS)} presets")
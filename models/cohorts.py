@@ -0,0 +1,57 @@
+import numpy as np
+
+from models.metrics import parameter_column
+from models.parameters import PARAMETER_KEYS
+
+VAT_RATE = 0.20
+
+
+def retention_curve(decay, floor, n_ages):
+    """N×n_ages share of a cohort still active at each age (age 0 = acquisition month)"""
+    ages = np.arange(n_ages, dtype=np.float64)
+    decay = np.asarray(decay, dtype=np.float64)[:, None]
+    floor = np.asarray(floor, dtype=np.float64)[:, None]
+    return floor + (1 - floor) * np.exp(-decay * ages[None, :])
+
+
+def retained_users(acquisitions, retention, month):
+    """Active users at ``month``: sum over cohorts 0..month of size × retention at their age.
+
+    ``acquisitions[:, c]`` is the cohort acquired in month c (cohort 0 is the
+    launch base), so cohort c has age ``month - c``.
+    """
+    return np.einsum('ij,ij->i', acquisitions[:, :month + 1], retention[:, month::-1])
+
+
+def cohort_acquisitions(out, params, columns=PARAMETER_KEYS):
+    """N×(months+1) cohort sizes: the launch base followed by each month's new users"""
+    base = parameter_column(params, 'initial_users', columns) * parameter_column(params, 'active_conversion', columns)
+    return np.concatenate([base[:, None], out['total_new_users']], axis=1)
+
+
+def cohort_economics(out, params, columns=PARAMETER_KEYS):
+    """LTV, CAC and LTV/CAC per acquisition month within the horizon.
+
+    LTV is the undiscounted net-of-VAT revenue per acquired user over the
+    rest of the horizon: average revenue per active user in each month times
+    the cohort's retention at that age. CAC is the month's marketing budget
+    over the users it brought in, i.e. ``100000 / marketing_efficiency``. Costs are O(months) NumPy steps, not a
+    Python loop over cohort×month cells.
+    """
+    n, horizon = out['revenue'].shape
+    retention = retention_curve(
+        parameter_column(params, 'retention_decay', columns),
+        parameter_column(params, 'retention_floor', columns), horizon)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        arpu = np.where(out['active_users'] > 0,
+                        out['revenue'] * (1 - VAT_RATE) / out['active_users'], 0.0)
+        # Бюджет маркетинга пропорционален привлечённым: new_users × 100000 / marketing_efficiency
+        cac = np.where(out['new_users'] > 0,
+                       100000 / parameter_column(params, 'marketing_efficiency', columns)[:, None], np.nan)
+
+    ltv = np.zeros((n, horizon))
+    for age in range(horizon):
+        ltv[:, :horizon - age] += arpu[:, age:] * retention[:, age:age + 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = ltv / cac
+    return {'ltv': ltv, 'cac': cac, 'ltv_cac': ratio}
@@ -0,0 +1,232 @@
+import hashlib
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: только атомарные rename, без межпроцессной блокировки
+    fcntl = None
+
+from utils.logging_config import log_error, log_info, log_warning
+
+DEFAULT_DIRECTORY = os.environ.get('FORECAST_DISK_CACHE_DIR', '.forecast_cache')
+DEFAULT_MAX_BYTES = int(os.environ.get('FORECAST_DISK_CACHE_MAX_MB', '1024')) * 1024 * 1024
+ENTRY_SUFFIX = '.pkl'
+LOCK_NAME = '.lock'
+# Метка каталога-поколения: чистим только то, что создал сам кэш
+MARKER_NAME = '.forecast_cache_generation'
+GENERATION_NAME = re.compile(r'^[0-9a-f]{16}$')
+
+# Код, от которого зависят сохранённые прогнозы и агрегаты Монте-Карло
+MODEL_SOURCES = (
+    'models/financial_model.py',
+    'models/kernels.py',
+    'models/points_ledger.py',
+    'models/cohorts.py',
+    'models/parameters.py',
+    'models/metrics.py',
+    'models/results.py',
+    'models/monte_carlo.py',
+    'models/sketches.py',
+    'models/cache.py',  # настройки полос Монте-Карло
+)
+
+
+def model_fingerprint(sources=MODEL_SOURCES):
+    """Hash of the model source files; changes whenever the model code does"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(source.encode('utf-8'))
+        with open(os.path.join(root, source), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _is_generation(path):
+    """True for a directory this cache created: it has the marker or a fingerprint name"""
+    if not os.path.isdir(path):
+        return False
+    return (os.path.exists(os.path.join(path, MARKER_NAME))
+            or GENERATION_NAME.match(os.path.basename(path)) is not None)
+
+
+class _FileLock:
+    """Exclusive advisory lock shared by all processes using one cache directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+class DiskCache:
+    """Content-addressed pickle store for forecast results that survives restarts.
+
+    Entries live in ``directory/<model fingerprint>/``; when the model code
+    changes, the fingerprint changes and the old generation is deleted on
+    first use; only directories carrying the cache's own marker or its
+    fingerprint naming are removed, so a shared directory is safe. Every write goes to a temporary file that is renamed into
+    place, so concurrent processes only ever see complete entries. Reads
+    touch the file's mtime, and once the directory grows past ``max_bytes``
+    the least recently used entries are evicted under a file lock.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES, fingerprint=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint or model_fingerprint()
+        self.path = os.path.join(directory, self.fingerprint[:16])
+        self._lock = threading.Lock()
+        self._ready = False
+        self._size_estimate = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _setup(self):
+        """Create this generation's directory and remove outdated ones (once per process)"""
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            open(os.path.join(self.path, MARKER_NAME), 'a').close()
+            with _FileLock(os.path.join(self.directory, LOCK_NAME)):
+                for name in os.listdir(self.directory):
+                    stale = os.path.join(self.directory, name)
+                    if name != os.path.basename(self.path) and _is_generation(stale):
+                        shutil.rmtree(stale, ignore_errors=True)
+                        log_info(f"Disk cache: removed entries of an older model version ({name})")
+            self._size_estimate = sum(size for _, _, size in self._scan())
+            self._ready = True
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, hashlib.sha256(key.encode('utf-8')).hexdigest() + ENTRY_SUFFIX)
+
+    def _scan(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def get(self, key):
+        try:
+            self._setup()
+            path = self._entry_path(key)
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+            self.hits += 1
+            return value
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            # Повреждённая запись считается промахом и удаляется
+            log_warning(f"Disk cache: unreadable entry dropped ({e})")
+            self.misses += 1
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+            return None
+
+    def put(self, key, value):
+        try:
+            self._setup()
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = os.path.getsize(tmp_path)
+                os.replace(tmp_path, self._entry_path(key))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self.writes += 1
+            with self._lock:
+                self._size_estimate += size
+                over = self._size_estimate > self.max_bytes
+            if over:
+                self.evict()
+        except Exception as e:
+            # Кэш на диске необязателен: ошибка записи не должна ломать расчёт
+            log_error(e, context="Error writing disk cache entry")
+
+    def evict(self):
+        """Delete least recently used entries until the directory fits ``max_bytes``"""
+        with _FileLock(os.path.join(self.directory, LOCK_NAME)):
+            entries = sorted(self._scan())
+            total = sum(size for _, _, size in entries)
+            # Оставляем запас, чтобы не чистить каталог после каждой записи
+            target = self.max_bytes * 0.9
+            for _, path, size in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+        with self._lock:
+            self._size_estimate = total
+
+    def clear(self):
+        self._setup()
+        with _FileLock(os.path.join(self.directory, LOCK_NAME)):
+            for _, path, _ in self._scan():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            self._size_estimate = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'directory': self.path,
+            'size_bytes': self._size_estimate,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def disk_cache_from_env():
+    """Disk cache configured by FORECAST_DISK_CACHE_* variables, or None when disabled"""
+    if os.environ.get('FORECAST_DISK_CACHE', '1') == '0':
+        return None
+    try:
+        return DiskCache()
+    except Exception as e:
+        log_error(e, context="Disk cache disabled")
+        return None
@@ -0,0 +1,408 @@
+"""Grid sweeps sharded across hosts over a small TCP protocol (stdlib + pyarrow).
+
+Every message is a frame: two big-endian uint32 lengths, a JSON header and
+an optional binary payload. Workers pull work:
+
+    worker -> {"type": "hello", "worker": name}
+    coord  -> {"type": "spec", ...sweep spec...}
+    worker -> {"type": "ready"}
+    coord  -> {"type": "chunk", "chunk": i, "start": a, "stop": b}
+              | {"type": "wait", "seconds": s} | {"type": "done"}
+    worker -> {"type": "result", "chunk": i} + Arrow IPC stream of the chunk table
+              | {"type": "error", "chunk": i, "message": ...}
+    worker -> {"type": "heartbeat"} every few seconds, also while computing
+
+The coordinator writes each chunk to the same ``part-NNNNNN.parquet`` layout
+as ``run_grid_sweep``, so the output does not depend on which worker
+computed what, and an interrupted run resumes from the finished parts.
+
+The protocol has no authentication, so the coordinator listens on the
+loopback interface unless it is explicitly allowed to bind elsewhere; run
+it only on a trusted network.
+"""
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pyarrow as pa
+
+from models.parameters import PARAMETER_KEYS
+from models.sweep import chunk_table, grid_rows, open_manifest, part_path, write_part
+from utils.logging_config import log_error, log_info, log_warning
+
+FRAME = struct.Struct('!II')
+MAX_HEADER_BYTES = 1 << 20
+MAX_PAYLOAD_BYTES = 1 << 30  # чанк по умолчанию (5000 сценариев) занимает единицы мегабайт
+HEARTBEAT_INTERVAL = 2.0
+HEARTBEAT_TIMEOUT = 10.0
+WAIT_SECONDS = 0.5
+MAX_ATTEMPTS = 3  # чанк, на котором воркеры падают снова и снова, останавливает расчёт
+
+
+class ProtocolError(Exception):
+    """Malformed frame or unexpected message"""
+
+
+def encode_frame(header, payload=b''):
+    data = json.dumps(header).encode('utf-8')
+    return FRAME.pack(len(data), len(payload)) + data + payload
+
+
+def _check_sizes(header_size, payload_size):
+    if header_size > MAX_HEADER_BYTES:
+        raise ProtocolError(f"Header of {header_size} bytes is too large")
+    if payload_size > MAX_PAYLOAD_BYTES:
+        raise ProtocolError(f"Payload of {payload_size} bytes is too large")
+
+
+def _decode_header(data):
+    header = json.loads(data.decode('utf-8'))
+    if not isinstance(header, dict) or 'type' not in header:
+        raise ProtocolError(f"Bad message header: {header!r}")
+    return header
+
+
+async def read_frame(reader):
+    """(header, payload) from an asyncio stream"""
+    header_size, payload_size = FRAME.unpack(await reader.readexactly(FRAME.size))
+    _check_sizes(header_size, payload_size)
+    header = _decode_header(await reader.readexactly(header_size))
+    return header, await reader.readexactly(payload_size)
+
+
+def _recv_exactly(sock, size):
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = sock.recv(min(size - len(chunks), 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        chunks += chunk
+    return bytes(chunks)
+
+
+def recv_frame(sock):
+    """(header, payload) from a blocking socket"""
+    header_size, payload_size = FRAME.unpack(_recv_exactly(sock, FRAME.size))
+    _check_sizes(header_size, payload_size)
+    return _decode_header(_recv_exactly(sock, header_size)), _recv_exactly(sock, payload_size)
+
+
+def table_to_bytes(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def table_from_bytes(payload):
+    return pa.ipc.open_stream(payload).read_all()
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class SweepCoordinator:
+    """Hands out chunks of a grid sweep to TCP workers and collects the results.
+
+    A chunk is in flight until its result arrives. When a worker disconnects
+    or misses heartbeats for ``heartbeat_timeout`` seconds, its chunk goes
+    back to the front of the queue; a late duplicate result is ignored.
+    """
+
+    def __init__(self, params, axes, output_dir, line_items=('profit',), months=range(1, 25),
+                 chunk_size=5000, heartbeat_timeout=HEARTBEAT_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+        self.axes = {key: [float(v) for v in values] for key, values in axes.items()}
+        for key in self.axes:
+            if key not in PARAMETER_KEYS:
+                raise KeyError(f"Unknown parameter: {key}")
+        self.output_dir = output_dir
+        self.months = list(months)
+        self.line_items = list(line_items)
+        self.n_scenarios = int(np.prod([len(values) for values in self.axes.values()]))
+        self.spec = {
+            'axes': self.axes,
+            'base': params.to_dict(),
+            'line_items': self.line_items,
+            'months': self.months,
+            'chunk_size': int(chunk_size),
+            'n_scenarios': self.n_scenarios,
+        }
+        self.chunk_size = open_manifest(output_dir, self.spec)
+        self.spec['chunk_size'] = self.chunk_size
+        self.base_row = params.to_row().tolist()
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+
+        self.n_chunks = -(-self.n_scenarios // self.chunk_size)
+        self.finished = {chunk for chunk in range(self.n_chunks)
+                         if os.path.exists(part_path(output_dir, chunk))}
+        self.resumed = len(self.finished)
+        self.pending = deque(chunk for chunk in range(self.n_chunks) if chunk not in self.finished)
+        self.in_flight = {}  # чанк -> имя воркера
+        self.writing = set()  # чанки, чей результат сейчас пишется на диск
+        self.attempts = {}
+        self.workers = {}  # имя -> {'writer', 'last_seen', 'chunks'}
+        self.failure = None
+        self._done = None
+        self._next_id = 0
+
+    @property
+    def complete(self):
+        return len(self.finished) == self.n_chunks
+
+    def _chunk_bounds(self, chunk):
+        start = chunk * self.chunk_size
+        return start, min(start + self.chunk_size, self.n_scenarios)
+
+    def _requeue(self, chunk, reason):
+        if chunk in self.finished or self.in_flight.pop(chunk, None) is None:
+            return
+        self.attempts[chunk] = self.attempts.get(chunk, 0) + 1
+        if self.attempts[chunk] >= self.max_attempts:
+            self.failure = RuntimeError(f"Chunk {chunk} failed {self.attempts[chunk]} times: {reason}")
+            self._done.set()
+            return
+        log_warning(f"Chunk {chunk} requeued: {reason}")
+        self.pending.appendleft(chunk)
+
+    def _drop_worker(self, name, reason):
+        worker = self.workers.pop(name, None)
+        if worker is None:
+            return
+        for chunk in list(worker['chunks']):
+            self._requeue(chunk, f"worker {name} {reason}")
+        worker['writer'].close()
+        log_info(f"Worker {name} left: {reason}")
+
+    def _next_message(self, worker):
+        if self._done.is_set():
+            return {'type': 'done'}
+        if self.pending:
+            chunk = self.pending.popleft()
+            start, stop = self._chunk_bounds(chunk)
+            self.in_flight[chunk] = worker['name']
+            worker['chunks'].add(chunk)
+            return {'type': 'chunk', 'chunk': chunk, 'start': start, 'stop': stop}
+        return {'type': 'wait', 'seconds': WAIT_SECONDS}
+
+    def _write_result(self, chunk, payload):
+        table = table_from_bytes(payload)
+        start, stop = self._chunk_bounds(chunk)
+        if table.num_rows != stop - start:
+            raise ProtocolError(f"Chunk {chunk} has {table.num_rows} rows, expected {stop - start}")
+        write_part(self.output_dir, chunk, table)
+
+    async def _store_result(self, worker, chunk, payload):
+        worker['chunks'].discard(chunk)
+        if chunk in self.finished or chunk in self.writing:
+            return
+        # Разбор и запись Parquet в пуле потоков: цикл событий продолжает принимать сигналы воркеров
+        self.writing.add(chunk)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_result, chunk, payload)
+        except Exception as e:
+            self._requeue(chunk, f"bad result from {worker['name']}: {e}")
+            raise
+        finally:
+            self.writing.discard(chunk)
+        self.in_flight.pop(chunk, None)
+        if chunk in self.pending:
+            # Опоздавший результат чанка, уже отданного на повтор
+            self.pending.remove(chunk)
+        self.finished.add(chunk)
+        if self.complete:
+            self._done.set()
+
+    async def handle_worker(self, reader, writer):
+        self._next_id += 1
+        worker_id = self._next_id
+        name = f"worker-{worker_id}"
+        try:
+            header, _ = await read_frame(reader)
+            if header['type'] != 'hello':
+                raise ProtocolError(f"Expected hello, got {header['type']}")
+            name = f"{header.get('worker', 'worker')}#{worker_id}"
+            worker = {'name': name, 'writer': writer, 'last_seen': time.monotonic(), 'chunks': set()}
+            self.workers[name] = worker
+            log_info(f"Worker {name} joined from {writer.get_extra_info('peername')}")
+            writer.write(encode_frame({**self.spec, 'type': 'spec', 'base': self.base_row,
+                                       'columns': list(PARAMETER_KEYS), 'heartbeat': HEARTBEAT_INTERVAL}))
+            await writer.drain()
+
+            while name in self.workers:
+                header, payload = await read_frame(reader)
+                worker['last_seen'] = time.monotonic()
+                kind = header['type']
+                if kind == 'heartbeat':
+                    continue
+                if kind == 'result':
+                    await self._store_result(worker, int(header['chunk']), payload)
+                elif kind == 'error':
+                    chunk = int(header['chunk'])
+                    worker['chunks'].discard(chunk)
+                    self._requeue(chunk, f"error on {name}: {header.get('message')}")
+                elif kind != 'ready':
+                    raise ProtocolError(f"Unexpected message: {kind}")
+                message = self._next_message(worker)
+                writer.write(encode_frame(message))
+                await writer.drain()
+                if message['type'] == 'done':
+                    break
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self._drop_worker(name, "disconnected")
+        except Exception as e:
+            log_error(e, context=f"Error in sweep coordinator with {name}")
+            self._drop_worker(name, str(e))
+        else:
+            self._drop_worker(name, "finished")
+        finally:
+            # Соединение без успешного hello не попадает в workers и закрывается здесь
+            writer.close()
+
+    async def _monitor(self):
+        """Drop workers that stopped sending heartbeats"""
+        while not self._done.is_set():
+            await asyncio.sleep(self.heartbeat_timeout / 4)
+            now = time.monotonic()
+            for name, worker in list(self.workers.items()):
+                if now - worker['last_seen'] > self.heartbeat_timeout:
+                    self._drop_worker(name, f"missed heartbeats for {now - worker['last_seen']:.1f}s")
+
+    async def serve(self, host='127.0.0.1', port=9100, on_started=None, allow_remote=False):
+        """Run until every chunk is written; returns a run summary.
+
+        Binding to anything but a loopback address requires ``allow_remote``.
+        """
+        if not allow_remote and not is_loopback(host):
+            raise ValueError(f"Refusing to listen on {host} without allow_remote: the protocol has no authentication")
+        self._done = asyncio.Event()
+        started = time.perf_counter()
+        if self.complete:
+            self._done.set()
+        server = await asyncio.start_server(self.handle_worker, host, port)
+        port = server.sockets[0].getsockname()[1]
+        log_info(f"Sweep coordinator on {host}:{port}: {self.n_scenarios} scenarios, "
+                 f"{self.n_chunks} chunks of {self.chunk_size}, {self.resumed} resumed")
+        if on_started is not None:
+            on_started(port)
+        monitor = asyncio.create_task(self._monitor())
+        try:
+            await self._done.wait()
+            # Воркеры, ожидающие работы, получат done на следующем запросе
+            deadline = time.monotonic() + WAIT_SECONDS * 4
+            while self.workers and time.monotonic() < deadline and self.failure is None:
+                await asyncio.sleep(0.05)
+        finally:
+            monitor.cancel()
+            server.close()
+            for name in list(self.workers):
+                self._drop_worker(name, "coordinator stopped")
+            await server.wait_closed()
+        if self.failure is not None:
+            raise self.failure
+        elapsed = time.perf_counter() - started
+        log_info(f"Sweep finished in {elapsed:.2f}s")
+        return {
+            'output_dir': self.output_dir,
+            'n_scenarios': self.n_scenarios,
+            'n_chunks': self.n_chunks,
+            'chunks_resumed': self.resumed,
+            'retries': sum(self.attempts.values()),
+            'seconds': elapsed,
+        }
+
+
+def run_coordinator(params, axes, output_dir, host='127.0.0.1', port=9100, on_started=None, allow_remote=False,
+                    **kwargs):
+    coordinator = SweepCoordinator(params, axes, output_dir, **kwargs)
+    return asyncio.run(coordinator.serve(host, port, on_started, allow_remote))
+
+
+class _Heartbeat(threading.Thread):
+    def __init__(self, sock, lock, interval):
+        super().__init__(daemon=True)
+        self.sock = sock
+        self.lock = lock
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                with self.lock:
+                    self.sock.sendall(encode_frame({'type': 'heartbeat'}))
+            except OSError:
+                return
+
+
+def run_worker(host, port, name=None, connect_timeout=30.0):
+    """Pull and compute chunks until the coordinator says done; returns chunks computed"""
+    name = name or socket.gethostname()
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            sock = socket.create_connection((host, port), timeout=connect_timeout)
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+    sock.settimeout(None)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    lock = threading.Lock()
+    computed = 0
+    heartbeat = None
+    try:
+        sock.sendall(encode_frame({'type': 'hello', 'worker': name}))
+        spec, _ = recv_frame(sock)
+        if spec['type'] != 'spec':
+            raise ProtocolError(f"Expected spec, got {spec['type']}")
+        if list(spec['columns']) != list(PARAMETER_KEYS):
+            raise ProtocolError("Coordinator runs a different parameter layout")
+        heartbeat = _Heartbeat(sock, lock, spec['heartbeat'])
+        heartbeat.start()
+        log_info(f"Worker {name} connected to {host}:{port}")
+
+        message = {'type': 'ready'}
+        payload = b''
+        while True:
+            with lock:
+                sock.sendall(encode_frame(message, payload))
+            header, _ = recv_frame(sock)
+            if header['type'] == 'done':
+                break
+            if header['type'] == 'wait':
+                time.sleep(header['seconds'])
+                message, payload = {'type': 'ready'}, b''
+                continue
+            if header['type'] != 'chunk':
+                raise ProtocolError(f"Unexpected message: {header['type']}")
+            chunk, start, stop = header['chunk'], header['start'], header['stop']
+            try:
+                matrix = grid_rows(spec['base'], spec['axes'], start, stop)
+                table = chunk_table(matrix, spec['axes'], start, spec['months'], spec['line_items'])
+                message, payload = {'type': 'result', 'chunk': chunk}, table_to_bytes(table)
+                computed += 1
+            except Exception as e:
+                log_error(e, context=f"Error computing chunk {chunk}")
+                message, payload = {'type': 'error', 'chunk': chunk, 'message': str(e)}, b''
+        log_info(f"Worker {name} done: {computed} chunks")
+        return computed
+    finally:
+        if heartbeat is not None:
+            heartbeat.stopped.set()
+        sock.close()
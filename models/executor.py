@@ -0,0 +1,217 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from models.financial_model import LINE_ITEMS, calculate_financials_batch
+from models.parameters import PARAMETER_KEYS
+from utils.logging_config import log_error, log_info
+
+MIN_CHUNK_ROWS = 256
+MAX_CHUNK_ROWS = 20000
+CHUNKS_PER_WORKER = 8  # мелкие чанки: освободившийся воркер берёт следующий
+
+
+def _attach(name):
+    """Open an existing segment created by the parent process"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: воркеры пула делят resource_tracker с родителем, сегмент удаляет родитель
+        return shared_memory.SharedMemory(name=name)
+
+
+def _fill_rows(task):
+    """Worker: compute rows [start, stop) and write them into the shared result block"""
+    params_name, params_shape, results_name, results_shape, start, stop, months, line_items, columns = task
+    started = time.perf_counter()
+    params_segment = _attach(params_name)
+    results_segment = _attach(results_name)
+    try:
+        params = np.ndarray(params_shape, dtype=np.float64, buffer=params_segment.buf)
+        results = np.ndarray(results_shape, dtype=np.float64, buffer=results_segment.buf)
+        out = calculate_financials_batch(params[start:stop], columns, months)
+        for k, key in enumerate(line_items):
+            results[k, start:stop] = out[key]
+        del params, results
+    finally:
+        params_segment.close()
+        results_segment.close()
+    return start, stop, time.perf_counter() - started
+
+
+class SharedResults:
+    """Line items as N×months arrays backed by one shared-memory block.
+
+    The arrays are zero-copy views; call ``release()`` (or use as a context
+    manager) when done, after which they must not be used.
+    """
+
+    def __init__(self, segment, line_items, shape):
+        self._segment = segment
+        self.line_items = tuple(line_items)
+        self._block = np.ndarray((len(line_items),) + shape, dtype=np.float64, buffer=segment.buf)
+
+    def __getitem__(self, key):
+        return self._block[self.line_items.index(key)]
+
+    def keys(self):
+        return self.line_items
+
+    def items(self):
+        return ((key, self[key]) for key in self.line_items)
+
+    def to_dict(self):
+        """Copies that outlive the shared block"""
+        return {key: self[key].copy() for key in self.line_items}
+
+    @property
+    def nbytes(self):
+        return self._block.nbytes
+
+    def release(self):
+        if self._segment is not None:
+            self._block = None
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class ScenarioExecutor:
+    """Long-lived process pool that runs the batch engine over shared memory.
+
+    The parameter matrix and a preallocated result block live in
+    ``multiprocessing.shared_memory``; tasks carry only segment names and a
+    row range, and workers write their rows in place. Work is split into
+    many small chunks that idle workers pull from the queue, so uneven
+    chunks still balance across cores. ``workers`` on a call limits how many
+    of its tasks run at once; a pool whose process died is replaced on the
+    next call.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                log_info(f"Scenario executor started with {self.workers} workers")
+            return self._pool
+
+    def _discard(self, pool):
+        """Drop a broken pool so that the next call starts a fresh one"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        log_info("Scenario executor: worker process died, the pool will be restarted")
+
+    def _limit(self, workers):
+        return max(1, min(workers or self.workers, self.workers))
+
+    def chunk_rows(self, n_rows, workers=None):
+        return int(np.clip(n_rows // (self._limit(workers) * CHUNKS_PER_WORKER), MIN_CHUNK_ROWS, MAX_CHUNK_ROWS))
+
+    def map(self, fn, iterable, workers=None):
+        """Run ``fn`` over ``iterable`` with at most ``workers`` tasks in flight; results in input order.
+
+        A generator: closing it early cancels the tasks that have not started.
+        """
+        limit = self._limit(workers)
+        pool = self._get_pool()
+        pending = deque()
+        try:
+            for item in iterable:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= limit:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def run(self, params, months=range(1, 25), line_items=LINE_ITEMS, columns=PARAMETER_KEYS,
+            chunk_size=None, workers=None):
+        """Forecast every row of an N×P parameter matrix; returns SharedResults"""
+        matrix = np.atleast_2d(np.asarray(params, dtype=np.float64))
+        months = list(months)
+        n = len(matrix)
+        results_shape = (len(line_items), n, len(months))
+        params_segment = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        results_segment = shared_memory.SharedMemory(
+            create=True, size=max(int(np.prod(results_shape)) * 8, 1))
+        try:
+            shared_params = np.ndarray(matrix.shape, dtype=np.float64, buffer=params_segment.buf)
+            shared_params[:] = matrix
+            del shared_params
+            chunk_size = chunk_size or self.chunk_rows(n, workers)
+            started = time.perf_counter()
+            tasks = [
+                (params_segment.name, matrix.shape, results_segment.name, results_shape,
+                 start, min(start + chunk_size, n), months, tuple(line_items), tuple(columns))
+                for start in range(0, n, chunk_size)
+            ]
+            for _ in self.map(_fill_rows, tasks, workers):
+                pass
+            log_info(f"Executor: {n} scenarios in {len(tasks)} chunks, "
+                     f"{time.perf_counter() - started:.2f}s")
+            return SharedResults(results_segment, line_items, (n, len(months)))
+        except Exception as e:
+            log_error(e, context="Error in ScenarioExecutor.run")
+            results_segment.close()
+            results_segment.unlink()
+            raise
+        finally:
+            params_segment.close()
+            params_segment.unlink()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _shutdown_executor():
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+
+
+def get_executor():
+    """Process-wide warm executor with one process per core.
+
+    The pool starts on first use and stays up until the interpreter exits,
+    so repeated batch and Monte Carlo runs do not pay the process start-up.
+    Callers limit their own concurrency with the ``workers`` argument of
+    ``run`` and ``map`` instead of getting a pool of their own.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ScenarioExecutor(os.cpu_count() or 1)
+            atexit.register(_shutdown_executor)
+        return _executor
@@ -1,181 +1,537 @@
-import streamlit as st
+import itertools
+from collections import deque
+from typing import NamedTuple
+
+import numpy as np
+from models.cohorts import retained_users, retention_curve
+from models.kernels import run_numba, select_backend
+from models.points_ledger import LEDGER_ITEMS, PointsLedger
+from models.results import ForecastResult
+from models.parameters import (
+    INTEGER_KEYS, ModelParameters, PARAMETER_DEFAULTS, PARAMETER_KEYS, stack_parameters
+)
 from utils.logging_config import log_error, log_warning, log_info, log_debug
 
-class FinancialModel:
-    def __init__(self):
-        self.months = range(1, 25)  # 2 years
-        log_info("Initializing Financial Model")
-        
-    def calculate_financials(self):
-        try:
-            log_debug("Starting financial calculations")
-            months = list(self.months)
-            data = []
-            
-            # Validate required session state variables
-            required_vars = ['initial_users', 'active_conversion']
-            for var in required_vars:
-                if var not in st.session_state:
-                    raise KeyError(f"Missing required parameter: {var}")
-            
-            active_users = st.session_state['initial_users'] * st.session_state['active_conversion']
+DEFAULT_HORIZON = 24  # 2 years
+
+# Статьи помесячного результата (ключи словаря месяца, кроме 'month')
+LINE_ITEMS = (
+    'revenue', 'expenses', 'marketing', 'fot', 'infra_cost',
+    'operational_expenses', 'profit', 'taxes', 'purchase_volume',
+    'loyalty_turnover', 'active_users', 'new_users', 'base_growth',
+    'total_new_users', 'commission_revenue', 'expired_points_income',
+    'unclaimed_points', 'subscription_revenue', 'premium_revenue',
+    'additional_revenue'
+)
+
+
+def build_parameter_matrix(presets, columns=PARAMETER_KEYS):
+    """Build an N×P parameter matrix from preset dicts or ModelParameters"""
+    params_list = [
+        preset if isinstance(preset, ModelParameters) else ModelParameters.from_mapping(preset)
+        for preset in presets
+    ]
+    return stack_parameters(params_list, columns)
+
+
+class MonthState(NamedTuple):
+    """State carried from one month into the next"""
+    active_users: float
+    revenue: float
+    unclaimed_history: tuple  # неподтверждённые баллы последних месяцев, от старых к новым
+
+
+# Месяц, с которого параметр начинает влиять на расчёт (None — не влияет на помесячный расчёт)
+PARAMETER_FIRST_MONTH = {
+    'growth_rate_y2': lambda old, new: 13,
+    'marketing_spend_rate': lambda old, new: 7,
+    'base_infra_cost': lambda old, new: 7,
+    'premium_business_start_month': lambda old, new: min(old, new),
+    'premium_user_start_month': lambda old, new: min(old, new),
+    'ad_start_month': lambda old, new: min(old, new),
+    'claim_period_months': lambda old, new: min(old, new) + 1,
+    'partnership_rate': lambda old, new: None,
+    'burn_rate_fot_1': lambda old, new: None,
+    'burn_rate_fot_2': lambda old, new: None,
+    'initial_investment': lambda old, new: None,
+    'preparatory_expenses': lambda old, new: None,
+}
+
+
+def first_affected_month(old_params, new_params):
+    """Earliest month whose figures differ between two parameter sets, or None"""
+    first = None
+    for key in PARAMETER_KEYS:
+        old, new = getattr(old_params, key), getattr(new_params, key)
+        if old == new:
+            continue
+        if key == 'expired_points_rate':
+            month = new_params.claim_period_months + 1
+        elif key in PARAMETER_FIRST_MONTH:
+            month = PARAMETER_FIRST_MONTH[key](old, new)
+        else:
+            month = 1
+        if month is not None:
+            first = month if first is None else min(first, month)
+    return first
+
+
+def checkpoint_state(result, month, claim_period):
+    """State after ``month`` recovered from a ForecastResult's columns"""
+    if month < 1:
+        return None
+    start = max(month - claim_period, 0)
+    return MonthState(
+        active_users=result['active_users'][month - 1].item(),
+        revenue=result['revenue'][month - 1].item(),
+        unclaimed_history=tuple(result['unclaimed_points'][start:month].tolist()),
+    )
+
+
+def iter_months(params, horizon=DEFAULT_HORIZON, start_month=1, state=None):
+    """Yield the monthly forecast for one ModelParameters object lazily.
+
+    ``horizon=None`` runs open-ended, so callers can stop at break-even or when
+    cash runs out. Only the last ``claim_period_months`` of unclaimed points are
+    kept, so memory does not grow with the horizon. To resume from a checkpoint
+    pass ``start_month`` and the MonthState after the month before it.
+    Does not touch Streamlit.
+    """
+    try:
+        log_debug(f"Starting financial calculations from month {start_month}")
+        if params.retention_decay > 0:
+            raise ValueError("Cohort mode (retention_decay > 0) needs the batch engine; "
+                             "use calculate_financials or calculate_financials_batch")
+        if horizon is None:
+            months = itertools.count(start_month)
+        else:
+            months = range(start_month, horizon + 1)
+        claim_period = params.claim_period_months
+        # Кольцевой буфер неподтверждённых баллов за последние claim_period месяцев
+        unclaimed_history = deque(maxlen=max(claim_period, 1))
+
+        if state is None:
+            active_users = params.initial_users * params.active_conversion
             log_info(f"Initial active users calculated: {active_users}")
-            
-            for month in months:
-                try:
-                    # Growth rates and marketing impact
-                    is_first_year = month <= 12
-                    base_growth_rate = st.session_state['growth_rate_y1'] if is_first_year else st.session_state['growth_rate_y2']
-                    # Marketing calculations
-                    if month <= 6:  # First 6 months: fixed budget
-                        marketing_expense = 200000  # Fixed monthly budget
-                    else:  # After month 6: percentage of revenue
-                        marketing_expense = revenue * st.session_state['marketing_spend_rate']
-                    
-                    # Calculate marketing impact (new users from marketing spend)
-                    marketing_impact = (marketing_expense / 100000) * st.session_state['marketing_efficiency']
-                    
-                    # Total new users is sum of organic growth and marketing impact
-                    total_new_users = active_users * base_growth_rate + marketing_impact
-                    active_users += total_new_users
-                    
-                    # Purchase volume (GMV) calculations
-                    monthly_check = st.session_state['avg_check']
-                    monthly_transactions = 3.5  # увеличено среднее количество транзакций в месяц
-                    purchase_volume = active_users * monthly_check * monthly_transactions  # GMV - общий объем покупок пользователей
-                    
-                    # Commission calculations
-                    # Расчет кэшбэка по установленной ставке
-                    # Расчет кэшбэка (оборот программы лояльности)
-                    loyalty_turnover = purchase_volume * st.session_state['cashback_rate']  # Фактический оборот программы лояльности
-                    cashback = loyalty_turnover  # Для сохранения обратной совместимости
-                    # Процент использования баллов с учетом периода подтверждения
-                    claim_period = st.session_state.get('claim_period_months', 2)
-                    used_points = cashback * st.session_state['points_usage_rate']
-                    # Расчет дохода от неподтвержденных баллов
-                    unclaimed_points = cashback * (1 - st.session_state['points_usage_rate'])
-                    # Баллы сгорают только если не подтверждены в течение claim_period месяцев
-                    if month <= claim_period:
-                        expired_points_income = 0
-                    else:
-                        # Берем неподтвержденные баллы за период claim_period месяцев назад
-                        historical_unclaimed = data[month - claim_period - 1]['unclaimed_points'] if month > claim_period else 0
-                        expired_points_income = historical_unclaimed * st.session_state['expired_points_rate']
-                    # Комиссия обмена 3% от использованных баллов
-                    exchange_commission = used_points * st.session_state['exchange_commission_rate']
-                    # Комиссия начисления 5% от всего кэшбэка
-                    reward_commission = cashback * st.session_state['reward_commission_rate']
-                    
-                    # Partner and Subscription Revenue
-                    # Расчет количества партнеров (магазинов и ресторанов)
-                    stores = active_users / 100  # 1 магазин на 100 пользователей
-                    restaurants = active_users / 80  # 1 ресторан на 80 пользователей
-                    subscription_revenue = 0
-                    
-                    # Subscription revenue starts from configured month
-                    premium_business_start = st.session_state.get('premium_business_start_month', 13)
-                    if month >= premium_business_start:
-                        # Единый премиум-тариф для всех типов бизнеса
-                        premium_rate = st.session_state.get('premium_business_rate', 0.3)  # процент партнеров на премиум-тарифе
-                        premium_partners = (stores + restaurants) * premium_rate
-                        
-                        # Расчет выручки от подписок
-                        premium_price = st.session_state.get('premium_business_price', 8000)  # стоимость премиум-подписки
-                        subscription_revenue = premium_partners * premium_price
-                    
-                    # Премиум подписка для пользователей
-                    premium_user_rate = 0.04  # 4% премиум пользователей
-                    premium_subscription = 399  # стоимость премиум подписки
-                    
-                    # Расчет выручки от премиум пользователей
-                    premium_user_start = st.session_state.get('premium_user_start_month', 13)
-                    premium_revenue = active_users * premium_user_rate * premium_subscription if month >= premium_user_start else 0
-                    
-                    # Additional Revenue
-                    # Доход от рекламы начиная с указанного месяца
-                    ad_start_month = st.session_state.get('ad_start_month', 13)
-                    ad_revenue_per_user = st.session_state.get('ad_revenue_per_user', 20)
-                    ad_revenue = active_users * ad_revenue_per_user if month >= ad_start_month else 0
-                    partner_revenue = 0  # убрана комиссия с GMV
-                    
-                    # Expenses - FOT calculation based on month
-                    burn_rate_fot = 0  # First 6 months - no FOT
-                    if month > 12:  # Second year
-                        burn_rate_fot = 4000000
-                    elif month > 6:  # Months 7-12
-                        burn_rate_fot = 2500000
-                    
-                    # Infrastructure costs with scaling
-                    infra_multiplier = 1.0
-                    if active_users > 50000:
-                        infra_multiplier = 2.0
-                    elif active_users > 10000:
-                        infra_multiplier = 1.5
-                    infra_cost = st.session_state['base_infra_cost'] * infra_multiplier
-                    
-                    # First 6 months infrastructure costs are covered by initial investment
-                    if month <= 6:
-                        infra_cost = 0  # Not included in operational expenses as covered by initial investment
-                    
-                    # Marketing expenses calculation
-                    if month <= 6:  # First 6 months: fixed budget covered by initial investment
-                        marketing_expense = 0  # Not included in operational expenses as covered by initial investment
-                    else:  # After 6 months: percentage of revenue
-                        marketing_expense = revenue * st.session_state['marketing_spend_rate']
-                    
-                    # Revenue calculations
-                    revenue = (
-                        exchange_commission + reward_commission + subscription_revenue +
-                        premium_revenue + ad_revenue + partner_revenue + expired_points_income
-                    )
-
-                    # Операционные расходы (без налогов)
-                    operational_expenses = burn_rate_fot + infra_cost
-                    total_expenses = operational_expenses + marketing_expense
-                    
-                    # Расчет НДС
-                    vat = revenue * 0.20  # НДС 20%
-                    revenue_after_vat = revenue - vat
-                    
-                    # Расчет прибыли до налога на прибыль
-                    profit_before_tax = revenue_after_vat - total_expenses
-                    
-                    # Расчет налога на прибыль
-                    profit_tax = max(0, profit_before_tax * 0.20)  # 20% только если есть прибыль
-                    
-                    # Итоговые расчеты
-                    total_tax = vat + profit_tax  # Общая сумма налогов
-                    net_profit = profit_before_tax - profit_tax  # Чистая прибыль
+        else:
+            active_users = state.active_users
+            revenue = state.revenue
+            unclaimed_history.extend(state.unclaimed_history)
+
+        for month in months:
+            try:
+                # Growth rates and marketing impact
+                is_first_year = month <= 12
+                base_growth_rate = params.growth_rate_y1 if is_first_year else params.growth_rate_y2
+                # Marketing calculations
+                if month <= 6:  # First 6 months: fixed budget
+                    marketing_expense = 200000  # Fixed monthly budget
+                else:  # After month 6: percentage of revenue
+                    marketing_expense = revenue * params.marketing_spend_rate
+                
+                # Calculate marketing impact (new users from marketing spend)
+                marketing_impact = (marketing_expense / 100000) * params.marketing_efficiency
+                
+                # Total new users is sum of organic growth and marketing impact
+                total_new_users = active_users * base_growth_rate + marketing_impact
+                active_users += total_new_users
+                
+                # Purchase volume (GMV) calculations
+                monthly_check = params.avg_check
+                monthly_transactions = 3.5  # увеличено среднее количество транзакций в месяц
+                purchase_volume = active_users * monthly_check * monthly_transactions  # GMV - общий объем покупок пользователей
+                
+                # Commission calculations
+                # Расчет кэшбэка по установленной ставке
+                # Расчет кэшбэка (оборот программы лояльности)
+                loyalty_turnover = purchase_volume * params.cashback_rate  # Фактический оборот программы лояльности
+                cashback = loyalty_turnover  # Для сохранения обратной совместимости
+                # Процент использования баллов с учетом периода подтверждения
+                used_points = cashback * params.points_usage_rate
+                # Расчет дохода от неподтвержденных баллов
+                unclaimed_points = cashback * (1 - params.points_usage_rate)
+                # Баллы сгорают только если не подтверждены в течение claim_period месяцев
+                if month <= claim_period:
+                    expired_points_income = 0
+                else:
+                    # Берем неподтвержденные баллы за период claim_period месяцев назад
+                    historical_unclaimed = unclaimed_history[0] if claim_period > 0 else unclaimed_points
+                    expired_points_income = historical_unclaimed * params.expired_points_rate
+                # Комиссия обмена 3% от использованных баллов
+                exchange_commission = used_points * params.exchange_commission_rate
+                # Комиссия начисления 5% от всего кэшбэка
+                reward_commission = cashback * params.reward_commission_rate
+                
+                # Partner and Subscription Revenue
+                # Расчет количества партнеров (магазинов и ресторанов)
+                stores = active_users / 100  # 1 магазин на 100 пользователей
+                restaurants = active_users / 80  # 1 ресторан на 80 пользователей
+                subscription_revenue = 0
+                
+                # Subscription revenue starts from configured month
+                premium_business_start = params.premium_business_start_month
+                if month >= premium_business_start:
+                    # Единый премиум-тариф для всех типов бизнеса
+                    premium_rate = params.premium_business_rate  # процент партнеров на премиум-тарифе
+                    premium_partners = (stores + restaurants) * premium_rate
                     
-                    data.append({
-                        'month': month,
-                        'revenue': revenue,
-                        'expenses': total_expenses,
-                        'marketing': marketing_expense,
-                        'fot': burn_rate_fot,
-                        'infra_cost': infra_cost,
-                        'operational_expenses': operational_expenses,
-                        'profit': net_profit,
-                        'taxes': total_tax,
-                        'purchase_volume': purchase_volume,
-                        'loyalty_turnover': loyalty_turnover,
-                        'active_users': active_users,
-                        'new_users': marketing_impact,
-                        'base_growth': active_users * base_growth_rate,
-                        'total_new_users': total_new_users,
-                        'commission_revenue': exchange_commission + reward_commission,
-                        'expired_points_income': expired_points_income,
-                        'unclaimed_points': unclaimed_points,  # Добавляем для отслеживания истории
-                        'subscription_revenue': subscription_revenue,
-                        'premium_revenue': premium_revenue,
-                        'additional_revenue': ad_revenue + partner_revenue
-                    })
-                except Exception as e:
-                    log_error(e, context=f"Error processing month {month}")
-                    raise
-            
-            return data
-            
-        except Exception as e:
-            log_error(e, context="Error in calculate_financials")
-            raise
\ No newline at end of file
+                    # Расчет выручки от подписок
+                    premium_price = params.premium_business_price  # стоимость премиум-подписки
+                    subscription_revenue = premium_partners * premium_price
+                
+                # Премиум подписка для пользователей
+                premium_user_rate = 0.04  # 4% премиум пользователей
+                premium_subscription = 399  # стоимость премиум подписки
+                
+                # Расчет выручки от премиум пользователей
+                premium_user_start = params.premium_user_start_month
+                premium_revenue = active_users * premium_user_rate * premium_subscription if month >= premium_user_start else 0
+                
+                # Additional Revenue
+                # Доход от рекламы начиная с указанного месяца
+                ad_start_month = params.ad_start_month
+                ad_revenue_per_user = params.ad_revenue_per_user
+                ad_revenue = active_users * ad_revenue_per_user if month >= ad_start_month else 0
+                partner_revenue = 0  # убрана комиссия с GMV
+                
+                # Expenses - FOT calculation based on month
+                burn_rate_fot = 0  # First 6 months - no FOT
+                if month > 12:  # Second year
+                    burn_rate_fot = 4000000
+                elif month > 6:  # Months 7-12
+                    burn_rate_fot = 2500000
+                
+                # Infrastructure costs with scaling
+                infra_multiplier = 1.0
+                if active_users > 50000:
+                    infra_multiplier = 2.0
+                elif active_users > 10000:
+                    infra_multiplier = 1.5
+                infra_cost = params.base_infra_cost * infra_multiplier
+                
+                # First 6 months infrastructure costs are covered by initial investment
+                if month <= 6:
+                    infra_cost = 0  # Not included in operational expenses as covered by initial investment
+                
+                # Marketing expenses calculation
+                if month <= 6:  # First 6 months: fixed budget covered by initial investment
+                    marketing_expense = 0  # Not included in operational expenses as covered by initial investment
+                else:  # After 6 months: percentage of revenue
+                    marketing_expense = revenue * params.marketing_spend_rate
+                
+                # Revenue calculations
+                revenue = (
+                    exchange_commission + reward_commission + subscription_revenue +
+                    premium_revenue + ad_revenue + partner_revenue + expired_points_income
+                )
+
+                # Операционные расходы (без налогов)
+                operational_expenses = burn_rate_fot + infra_cost
+                total_expenses = operational_expenses + marketing_expense
+                
+                # Расчет НДС
+                vat = revenue * 0.20  # НДС 20%
+                revenue_after_vat = revenue - vat
+                
+                # Расчет прибыли до налога на прибыль
+                profit_before_tax = revenue_after_vat - total_expenses
+                
+                # Расчет налога на прибыль
+                profit_tax = max(0, profit_before_tax * 0.20)  # 20% только если есть прибыль
+                
+                # Итоговые расчеты
+                total_tax = vat + profit_tax  # Общая сумма налогов
+                net_profit = profit_before_tax - profit_tax  # Чистая прибыль
+                
+                unclaimed_history.append(unclaimed_points)
+                record = {
+                    'month': month,
+                    'revenue': revenue,
+                    'expenses': total_expenses,
+                    'marketing': marketing_expense,
+                    'fot': burn_rate_fot,
+                    'infra_cost': infra_cost,
+                    'operational_expenses': operational_expenses,
+                    'profit': net_profit,
+                    'taxes': total_tax,
+                    'purchase_volume': purchase_volume,
+                    'loyalty_turnover': loyalty_turnover,
+                    'active_users': active_users,
+                    'new_users': marketing_impact,
+                    'base_growth': active_users * base_growth_rate,
+                    'total_new_users': total_new_users,
+                    'commission_revenue': exchange_commission + reward_commission,
+                    'expired_points_income': expired_points_income,
+                    'unclaimed_points': unclaimed_points,  # Добавляем для отслеживания истории
+                    'subscription_revenue': subscription_revenue,
+                    'premium_revenue': premium_revenue,
+                    'additional_revenue': ad_revenue + partner_revenue
+                }
+            except Exception as e:
+                log_error(e, context=f"Error processing month {month}")
+                raise
+            yield record
+
+    except Exception as e:
+        log_error(e, context="Error in iter_months")
+        raise
+
+
+def calculate_financials(params, months=range(1, DEFAULT_HORIZON + 1), points_ledger=False):
+    """Monthly forecast for one ModelParameters object as a ForecastResult.
+
+    ``months`` must run consecutively from 1; only its length is used.
+    ``points_ledger=True`` books points by vintage and adds the LEDGER_ITEMS
+    series, including the outstanding points liability.
+    """
+    if params.retention_decay > 0 or points_ledger:
+        # Когортная модель с оттоком и учёт баллов по выпускам считаются только пакетным движком
+        out = calculate_financials_batch(params.to_row(), months=range(1, len(months) + 1),
+                                         points_ledger=points_ledger)
+        return ForecastResult.from_batch(out, 0, range(1, len(months) + 1))
+    return ForecastResult.from_records(iter_months(params, len(months)))
+
+
+def recalculate_financials(previous_result, previous_params, params):
+    """Recompute only the months a parameter change can affect.
+
+    Months before the earliest affected one are taken from ``previous_result``
+    unchanged, and the recursion restarts from the state checkpointed in its
+    columns (active users, revenue that feeds marketing, unclaimed points).
+    """
+    horizon = len(previous_result)
+    start_month = first_affected_month(previous_params, params)
+    if start_month is None or start_month > horizon:
+        log_debug("Parameter change does not affect monthly figures")
+        return previous_result
+    points_ledger = 'points_outstanding' in previous_result
+    if start_month <= 1 or params.retention_decay > 0 or points_ledger:
+        return calculate_financials(params, range(1, horizon + 1), points_ledger)
+
+    log_debug(f"Recomputing forecast from month {start_month}")
+    state = checkpoint_state(previous_result, start_month - 1, params.claim_period_months)
+    tail = ForecastResult.from_records(iter_months(params, horizon, start_month, state))
+    return ForecastResult({
+        key: np.concatenate([previous_result[key][:start_month - 1], tail[key]])
+        for key in previous_result.keys()
+    })
+
+
+def _batch_python(matrix, columns, months):
+    """Reference backend: the scalar iter_months recursion row by row"""
+    out = {key: np.zeros((len(matrix), len(months))) for key in LINE_ITEMS}
+    for row, values in enumerate(matrix):
+        params = ModelParameters.from_row(values, columns)
+        for t, record in enumerate(iter_months(params, len(months))):
+            for key in LINE_ITEMS:
+                out[key][row, t] = record[key]
+    return out
+
+
+def calculate_financials_batch(params, columns=PARAMETER_KEYS, months=range(1, DEFAULT_HORIZON + 1),
+                               points_ledger=False, backend=None):
+    """Calculate financials for N parameter sets at once.
+
+    ``params`` is an N×P matrix whose columns follow ``columns``. Returns a
+    dict mapping every line item to an N×len(months) float64 array. The
+    month recursion is sequential, each step is vectorized over scenarios.
+    When any row has ``retention_decay > 0`` active users are tracked per
+    acquisition cohort with churn (see models.cohorts). ``points_ledger=True``
+    books points through a FIFO PointsLedger: expiry income then comes from
+    what is left of each vintage, and the LEDGER_ITEMS series are added.
+
+    ``backend`` picks the month-recursion kernel ('python', 'numpy', 'numba'
+    or 'auto'); by default it is chosen by problem size, see models.kernels.
+    """
+    try:
+        matrix = np.atleast_2d(np.asarray(params, dtype=np.float64))
+        columns = list(columns)
+        if matrix.shape[1] != len(columns):
+            raise ValueError(
+                f"Parameter matrix has {matrix.shape[1]} columns, expected {len(columns)}")
+        # Целые параметры округляются один раз, чтобы все ядра видели одни и те же значения
+        integer_columns = [i for i, key in enumerate(columns) if key in INTEGER_KEYS]
+        rounded = np.rint(matrix[:, integer_columns])
+        if not np.array_equal(rounded, matrix[:, integer_columns]):
+            matrix = matrix.copy()
+            matrix[:, integer_columns] = rounded
+        n = matrix.shape[0]
+        months = list(months)
+        log_debug(f"Starting batch financial calculations for {n} scenarios")
+
+        def param(key):
+            if key in columns:
+                return matrix[:, columns.index(key)]
+            if key in PARAMETER_DEFAULTS:
+                return np.full(n, float(PARAMETER_DEFAULTS[key]))
+            raise KeyError(f"Missing required parameter: {key}")
+
+        growth_rate_y1 = param('growth_rate_y1')
+        growth_rate_y2 = param('growth_rate_y2')
+        marketing_spend_rate = param('marketing_spend_rate')
+        marketing_efficiency = param('marketing_efficiency')
+        avg_check = param('avg_check')
+        cashback_rate = param('cashback_rate')
+        points_usage_rate = param('points_usage_rate')
+        expired_points_rate = param('expired_points_rate')
+        exchange_commission_rate = param('exchange_commission_rate')
+        reward_commission_rate = param('reward_commission_rate')
+        premium_business_start = param('premium_business_start_month')
+        premium_business_rate = param('premium_business_rate')
+        premium_business_price = param('premium_business_price')
+        premium_user_start = param('premium_user_start_month')
+        ad_start_month = param('ad_start_month')
+        ad_revenue_per_user = param('ad_revenue_per_user')
+        base_infra_cost = param('base_infra_cost')
+        claim_period = param('claim_period_months').astype(np.int64)
+        cohort_mode = bool((param('retention_decay') > 0).any())
+
+        backend = select_backend(n, months, backend, cohort_mode, points_ledger)
+        if backend == 'python':
+            return _batch_python(matrix, columns, months)
+        if backend == 'numba':
+            return run_numba(param, months)
+
+        line_items = LINE_ITEMS + LEDGER_ITEMS if points_ledger else LINE_ITEMS
+        out = {key: np.zeros((n, len(months))) for key in line_items}
+        rows = np.arange(n)
+        ledger = PointsLedger(claim_period) if points_ledger else None
+        active_users = param('initial_users') * param('active_conversion')
+        revenue = np.zeros(n)
+
+        # Когортный режим: активные = сумма когорт × удержание по возрасту
+        if cohort_mode:
+            acquisitions = np.zeros((n, len(months) + 1))
+            acquisitions[:, 0] = active_users
+            retention = retention_curve(
+                param('retention_decay'), param('retention_floor'), len(months) + 1)
+
+        for t, month in enumerate(months):
+            base_growth_rate = growth_rate_y1 if month <= 12 else growth_rate_y2
+            if month <= 6:
+                marketing_budget = np.full(n, 200000.0)
+            else:
+                marketing_budget = revenue * marketing_spend_rate
+            marketing_impact = (marketing_budget / 100000) * marketing_efficiency
+            total_new_users = active_users * base_growth_rate + marketing_impact
+            if cohort_mode:
+                acquisitions[:, t + 1] = total_new_users
+                active_users = retained_users(acquisitions, retention, t + 1)
+            else:
+                active_users = active_users + total_new_users
+
+            purchase_volume = active_users * avg_check * 3.5
+            cashback = purchase_volume * cashback_rate
+            used_points = cashback * points_usage_rate
+            unclaimed_points = cashback * (1 - points_usage_rate)
+            out['unclaimed_points'][:, t] = unclaimed_points
+
+            if ledger is not None:
+                redeemed, expired_points_income = ledger.step(
+                    cashback, used_points, expired_points_rate)
+                out['points_issued'][:, t] = cashback
+                out['points_redeemed'][:, t] = redeemed
+                out['points_expired'][:, t] = expired_points_income
+                out['points_outstanding'][:, t] = ledger.outstanding
+            else:
+                # Неподтверждённые баллы месяца (month - claim_period) сгорают сейчас
+                lag = t - claim_period
+                historical_unclaimed = out['unclaimed_points'][rows, np.maximum(lag, 0)]
+                expired_points_income = np.where(
+                    lag >= 0, historical_unclaimed * expired_points_rate, 0.0)
+            exchange_commission = used_points * exchange_commission_rate
+            reward_commission = cashback * reward_commission_rate
+
+            partners = active_users / 100 + active_users / 80
+            subscription_revenue = np.where(
+                month >= premium_business_start,
+                partners * premium_business_rate * premium_business_price, 0.0)
+            premium_revenue = np.where(
+                month >= premium_user_start, active_users * 0.04 * 399, 0.0)
+            ad_revenue = np.where(
+                month >= ad_start_month, active_users * ad_revenue_per_user, 0.0)
+
+            if month > 12:
+                burn_rate_fot = 4000000
+            elif month > 6:
+                burn_rate_fot = 2500000
+            else:
+                burn_rate_fot = 0
+            if month <= 6:
+                infra_cost = np.zeros(n)
+                marketing_expense = np.zeros(n)
+            else:
+                infra_multiplier = np.where(
+                    active_users > 50000, 2.0, np.where(active_users > 10000, 1.5, 1.0))
+                infra_cost = base_infra_cost * infra_multiplier
+                marketing_expense = marketing_budget
+
+            revenue = (
+                exchange_commission + reward_commission + subscription_revenue +
+                premium_revenue + ad_revenue + expired_points_income
+            )
+            operational_expenses = burn_rate_fot + infra_cost
+            total_expenses = operational_expenses + marketing_expense
+            vat = revenue * 0.20
+            profit_before_tax = revenue - vat - total_expenses
+            profit_tax = np.maximum(0, profit_before_tax * 0.20)
+
+            out['revenue'][:, t] = revenue
+            out['expenses'][:, t] = total_expenses
+            out['marketing'][:, t] = marketing_expense
+            out['fot'][:, t] = burn_rate_fot
+            out['infra_cost'][:, t] = infra_cost
+            out['operational_expenses'][:, t] = operational_expenses
+            out['profit'][:, t] = profit_before_tax - profit_tax
+            out['taxes'][:, t] = vat + profit_tax
+            out['purchase_volume'][:, t] = purchase_volume
+            out['loyalty_turnover'][:, t] = cashback
+            out['active_users'][:, t] = active_users
+            out['new_users'][:, t] = marketing_impact
+            out['base_growth'][:, t] = active_users * base_growth_rate
+            out['total_new_users'][:, t] = total_new_users
+            out['commission_revenue'][:, t] = exchange_commission + reward_commission
+            out['expired_points_income'][:, t] = expired_points_income
+            out['subscription_revenue'][:, t] = subscription_revenue
+            out['premium_revenue'][:, t] = premium_revenue
+            out['additional_revenue'][:, t] = ad_revenue
+
+        return out
+
+    except Exception as e:
+        log_error(e, context="Error in calculate_financials_batch")
+        raise
+
+
+class FinancialModel:
+    def __init__(self, params=None, horizon=DEFAULT_HORIZON, points_ledger=False):
+        self.months = range(1, horizon + 1)
+        self.params = params
+        self.points_ledger = points_ledger
+        log_info("Initializing Financial Model")
+
+    def _resolve_params(self, params):
+        if params is None:
+            params = self.params
+        if params is None:
+            # Обратная совместимость: параметры из текущей сессии Streamlit
+            from utils.config import get_model_parameters
+            params = get_model_parameters()
+        return params
+
+    def calculate_financials(self, params=None):
+        return calculate_financials(self._resolve_params(params), self.months, self.points_ledger)
+
+    def iter_months(self, params=None, horizon=None):
+        """Lazy month records; ``horizon=None`` keeps going until the caller stops"""
+        return iter_months(self._resolve_params(params), horizon)
+
+    def recalculate(self, previous_result, previous_params, params=None):
+        """Incremental version of calculate_financials after a parameter change"""
+        ledger_changed = ('points_outstanding' in previous_result) != self.points_ledger
+        if len(previous_result) != len(self.months) or ledger_changed:
+            return self.calculate_financials(params)
+        return recalculate_financials(previous_result, previous_params, self._resolve_params(params))
+
+    def calculate_financials_batch(self, params, columns=PARAMETER_KEYS):
+        return calculate_financials_batch(params, columns, self.months)
@@ -0,0 +1,225 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from models.executor import get_executor
+from models.financial_model import calculate_financials_batch
+from models.metrics import summarize
+from models.parameters import INTEGER_KEYS, PARAMETER_KEYS
+from utils.logging_config import log_error, log_info
+
+try:
+    from scipy.stats import qmc  # квазислучайные последовательности Соболя, если есть scipy
+except ImportError:
+    qmc = None
+
+GLOBAL_OUTPUTS = ('total_profit', 'roi', 'total_revenue', 'final_active_users')
+# Доли и конверсии не выходят за [0, 1] при расширении диапазона
+SHARE_KEYS = ('active_conversion', 'points_usage_rate', 'expired_points_rate', 'premium_business_rate')
+
+
+@dataclass(frozen=True)
+class MorrisResult:
+    """Elementary-effect screening: mean absolute effect and its spread per parameter"""
+    keys: tuple
+    mu_star: dict  # output -> array over keys
+    sigma: dict
+    trajectories: int
+    evaluations: int
+
+    def important(self, output, threshold=0.05):
+        """Parameters whose mu* is at least ``threshold`` of the largest one"""
+        mu_star = self.mu_star[output]
+        return tuple(key for key, value in zip(self.keys, mu_star) if value >= threshold * mu_star.max())
+
+
+@dataclass(frozen=True)
+class SobolEstimate:
+    """First-order and total Sobol indices with 95% bootstrap half-widths"""
+    keys: tuple
+    n_base: int
+    evaluations: int
+    first: dict  # output -> array over keys
+    total: dict
+    first_ci: dict
+    total_ci: dict
+
+
+def default_ranges(params, pct=0.2, keys=None):
+    """±pct around the scenario for every preset parameter with a non-zero value"""
+    if keys is None:
+        from utils.presets import PRESETS
+
+        preset_keys = set().union(*(preset.keys() for preset in PRESETS.values()))
+        keys = [key for key in PARAMETER_KEYS if key in preset_keys]
+    ranges = {}
+    for key in keys:
+        value = getattr(params, key)
+        low, high = sorted((value * (1 - pct), value * (1 + pct)))
+        if key in SHARE_KEYS or key.endswith('_rate'):
+            low, high = max(low, 0.0), min(high, 1.0)
+        if key in INTEGER_KEYS:
+            low, high = max(1, int(np.floor(low))), int(np.ceil(high))
+        if high > low:
+            ranges[key] = (low, high)
+    return ranges
+
+
+def _scaled_matrix(base_row, keys, low, high, unit):
+    """Parameter rows with ``keys`` set from points of the unit hypercube"""
+    matrix = np.repeat(np.asarray(base_row, dtype=np.float64)[None, :], len(unit), axis=0)
+    for j, key in enumerate(keys):
+        values = low[j] + unit[:, j] * (high[j] - low[j])
+        matrix[:, PARAMETER_KEYS.index(key)] = np.rint(values) if key in INTEGER_KEYS else values
+    return matrix
+
+
+def _evaluate(task):
+    """Scalar outputs for unit-cube points; runs in a worker process"""
+    base_row, keys, low, high, unit, outputs, months = task
+    matrix = _scaled_matrix(base_row, keys, low, high, unit)
+    summary = summarize(calculate_financials_batch(matrix, months=months), matrix)
+    # Безубыточность может отсутствовать (NaN): считаем её месяцем после горизонта
+    if 'break_even_month' in outputs:
+        summary['break_even_month'] = np.nan_to_num(summary['break_even_month'], nan=len(months) + 1)
+    return {output: summary[output] for output in outputs}
+
+
+def _bounds(ranges):
+    keys = tuple(ranges)
+    # Целые параметры: расширяем на полшага, чтобы после округления крайние значения были равновероятны
+    pad = np.array([0.4999 if key in INTEGER_KEYS else 0.0 for key in keys])
+    low = np.array([ranges[key][0] for key in keys], dtype=np.float64) - pad
+    high = np.array([ranges[key][1] for key in keys], dtype=np.float64) + pad
+    return keys, low, high
+
+
+def morris_screening(params, ranges, trajectories=20, levels=4, seed=0,
+                     outputs=GLOBAL_OUTPUTS, months=range(1, 25)):
+    """Morris elementary effects from ``trajectories`` one-at-a-time paths.
+
+    Costs trajectories × (P + 1) runs in one batch call, a small fraction of
+    a Sobol analysis, and ranks parameters well enough to drop the inert ones.
+    """
+    try:
+        keys, low, high = _bounds(ranges)
+        k = len(keys)
+        rng = np.random.default_rng(seed)
+        delta = levels / (2 * (levels - 1))
+        # Начальные точки на сетке нижней половины, чтобы шаг +delta не выходил за [0, 1]
+        start = rng.integers(0, levels // 2, size=(trajectories, k)) / (levels - 1)
+        order = np.argsort(rng.random((trajectories, k)), axis=1)
+        points = np.repeat(start[:, None, :], k + 1, axis=1)
+        for step in range(k):
+            changed = np.zeros((trajectories, k), dtype=bool)
+            changed[np.arange(trajectories), order[:, step]] = True
+            points[:, step + 1:, :] += np.where(changed, delta, 0.0)[:, None, :]
+
+        values = _evaluate((params.to_row(), keys, low, high,
+                            points.reshape(-1, k), outputs, list(months)))
+        mu_star, sigma = {}, {}
+        for output in outputs:
+            f = values[output].reshape(trajectories, k + 1)
+            effects = np.empty((trajectories, k))
+            effects[np.arange(trajectories)[:, None], order] = np.diff(f, axis=1) / delta
+            mu_star[output] = np.abs(effects).mean(axis=0)
+            sigma[output] = effects.std(axis=0)
+        log_info(f"Morris screening: {k} parameters, {trajectories * (k + 1)} runs")
+        return MorrisResult(keys, mu_star, sigma, trajectories, trajectories * (k + 1))
+
+    except Exception as e:
+        log_error(e, context="Error in morris_screening")
+        raise
+
+
+def sobol_indices(f_a, f_b, f_ab):
+    """Saltelli (2010) first-order and Jansen total-effect estimators.
+
+    ``f_a`` and ``f_b`` are outputs on the two base samples, ``f_ab[:, i]`` on
+    A with column i taken from B.
+    """
+    variance = np.var(np.concatenate([f_a, f_b]))
+    if variance == 0:
+        zeros = np.zeros(f_ab.shape[1])
+        return zeros, zeros
+    first = np.mean(f_b[:, None] * (f_ab - f_a[:, None]), axis=0) / variance
+    total = 0.5 * np.mean((f_a[:, None] - f_ab) ** 2, axis=0) / variance
+    return first, total
+
+
+def _estimate(keys, collected, outputs, n_bootstrap, rng):
+    n = len(collected['A'][outputs[0]])
+    first, total, first_ci, total_ci = {}, {}, {}, {}
+    resamples = [rng.integers(0, n, n) for _ in range(n_bootstrap)]
+    for output in outputs:
+        f_a, f_b, f_ab = collected['A'][output], collected['B'][output], collected['AB'][output]
+        first[output], total[output] = sobol_indices(f_a, f_b, f_ab)
+        boot = np.array([np.concatenate(sobol_indices(f_a[idx], f_b[idx], f_ab[idx])) for idx in resamples])
+        half_width = 1.96 * boot.std(axis=0)
+        first_ci[output], total_ci[output] = half_width[:len(keys)], half_width[len(keys):]
+    return SobolEstimate(keys, n, n * (len(keys) + 2), first, total, first_ci, total_ci)
+
+
+def iter_sobol(params, ranges, n_base=4096, chunk_size=512, seed=0, workers=None,
+               n_bootstrap=100, outputs=GLOBAL_OUTPUTS, months=range(1, 25)):
+    """Stream Sobol index estimates as base samples accumulate.
+
+    Uses Saltelli's A/B/AB_i design: n_base × (P + 2) runs in total. Chunks of
+    ``chunk_size`` base rows are evaluated by the batch engine on a process
+    pool, and a SobolEstimate with bootstrap confidence half-widths is yielded
+    after each one, so a caller can show convergence or stop early. The
+    sample is drawn up front from ``seed``, so results do not depend on the
+    number of workers.
+    """
+    try:
+        keys, low, high = _bounds(ranges)
+        k = len(keys)
+        months = list(months)
+        if qmc is not None:
+            unit = qmc.Sobol(d=2 * k, scramble=True, seed=seed).random(n_base)
+        else:
+            unit = np.random.default_rng(seed).random((n_base, 2 * k))
+        a, b = unit[:, :k], unit[:, k:]
+        base_row = params.to_row()
+
+        tasks = []
+        for start in range(0, n_base, chunk_size):
+            a_chunk, b_chunk = a[start:start + chunk_size], b[start:start + chunk_size]
+            ab_chunk = np.repeat(a_chunk[None, :, :], k, axis=0)
+            ab_chunk[np.arange(k), :, np.arange(k)] = b_chunk.T
+            points = np.concatenate([a_chunk, b_chunk, ab_chunk.reshape(-1, k)])
+            tasks.append((base_row, keys, low, high, points, outputs, months))
+        workers = workers or min(os.cpu_count() or 1, len(tasks))
+        log_info(f"Sobol analysis: {k} parameters, {n_base * (k + 2)} runs, {workers} workers")
+
+        collected = {part: {output: [] for output in outputs} for part in ('A', 'B', 'AB')}
+        rng = np.random.default_rng(seed + 1)
+        # Тёплый общий пул; при досрочной остановке map отменяет ещё не начатые задачи
+        results = get_executor().map(_evaluate, tasks, workers) if workers > 1 else map(_evaluate, tasks)
+        try:
+            for task, values in zip(tasks, results):
+                m = len(task[4]) // (k + 2)
+                for output in outputs:
+                    f = values[output]
+                    collected['A'][output].append(f[:m])
+                    collected['B'][output].append(f[m:2 * m])
+                    collected['AB'][output].append(f[2 * m:].reshape(k, m).T)
+                merged = {part: {output: np.concatenate(chunks) for output, chunks in by_output.items()}
+                          for part, by_output in collected.items()}
+                yield _estimate(keys, merged, outputs, n_bootstrap, rng)
+        finally:
+            if workers > 1:
+                results.close()
+
+    except Exception as e:
+        log_error(e, context="Error in iter_sobol")
+        raise
+
+
+def run_sobol(params, ranges, **kwargs):
+    """Final Sobol estimate after all chunks"""
+    estimate = None
+    for estimate in iter_sobol(params, ranges, **kwargs):
+        pass
+    return estimate
@@ -0,0 +1,171 @@
+import os
+
+import numpy as np
+
+from utils.logging_config import log_debug, log_warning
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+    prange = numba.prange
+except ImportError:  # numba — необязательная зависимость
+    numba = None
+    NUMBA_AVAILABLE = False
+    prange = range
+
+BACKENDS = ('python', 'numpy', 'numba')
+# Принудительный выбор движка, например FORECAST_KERNEL=numpy для сравнения
+DEFAULT_BACKEND = os.environ.get('FORECAST_KERNEL', 'auto')
+# До этого числа сценариев скалярный эталон быстрее накладных расходов NumPy
+PYTHON_MAX_ROWS = 4
+# С этого объёма (сценарии × месяцы) JIT окупает себя
+NUMBA_MIN_CELLS = 50000
+
+# Порядок столбцов параметров, которые получает ядро
+KERNEL_PARAMETERS = (
+    'growth_rate_y1', 'growth_rate_y2', 'marketing_spend_rate', 'marketing_efficiency',
+    'avg_check', 'cashback_rate', 'points_usage_rate', 'expired_points_rate',
+    'exchange_commission_rate', 'reward_commission_rate', 'premium_business_start_month',
+    'premium_business_rate', 'premium_business_price', 'premium_user_start_month',
+    'ad_start_month', 'ad_revenue_per_user', 'base_infra_cost', 'claim_period_months',
+    'initial_users', 'active_conversion',
+)
+# Порядок строк выходного массива ядра
+KERNEL_OUTPUTS = (
+    'revenue', 'expenses', 'marketing', 'fot', 'infra_cost', 'operational_expenses',
+    'profit', 'taxes', 'purchase_volume', 'loyalty_turnover', 'active_users', 'new_users',
+    'base_growth', 'total_new_users', 'commission_revenue', 'expired_points_income',
+    'unclaimed_points', 'subscription_revenue', 'premium_revenue', 'additional_revenue',
+)
+
+
+def select_backend(n_rows, months, requested=None, cohort_mode=False, points_ledger=False):
+    """Pick the month-recursion backend for a batch of ``n_rows`` scenarios.
+
+    ``requested`` is 'auto' or one of BACKENDS. Only the NumPy backend
+    supports the cohort engine and the points ledger; a missing numba or an
+    unsupported option falls back to NumPy instead of failing.
+    """
+    requested = requested or DEFAULT_BACKEND
+    if requested != 'auto' and requested not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend: {requested}")
+    if cohort_mode or points_ledger:
+        if requested not in ('auto', 'numpy'):
+            log_debug(f"Kernel backend {requested} does not support cohorts or the points ledger")
+        return 'numpy'
+    if requested == 'numba' and not NUMBA_AVAILABLE:
+        log_warning("numba is not installed, falling back to the NumPy kernel")
+        return 'numpy'
+    if requested == 'python' and list(months) != list(range(1, len(months) + 1)):
+        log_debug("Python kernel needs consecutive months from 1, using NumPy")
+        return 'numpy'
+    if requested != 'auto':
+        return requested
+
+    if n_rows <= PYTHON_MAX_ROWS and list(months) == list(range(1, len(months) + 1)):
+        return 'python'
+    if NUMBA_AVAILABLE and n_rows * len(months) >= NUMBA_MIN_CELLS:
+        return 'numba'
+    return 'numpy'
+
+
+def _month_recursion(p, months, out):
+    """Scalar month recursion per scenario, same arithmetic as iter_months.
+
+    ``p`` holds KERNEL_PARAMETERS columns, ``out`` is K×N×H in KERNEL_OUTPUTS
+    order. Scenarios are independent, so the outer loop runs in parallel
+    under numba.
+    """
+    for i in prange(p.shape[0]):
+        claim_period = int(p[i, 17])
+        active_users = p[i, 18] * p[i, 19]
+        revenue = 0.0
+        for t in range(months.shape[0]):
+            month = months[t]
+            base_growth_rate = p[i, 0] if month <= 12 else p[i, 1]
+            if month <= 6:
+                marketing_budget = 200000.0
+            else:
+                marketing_budget = revenue * p[i, 2]
+            marketing_impact = (marketing_budget / 100000) * p[i, 3]
+            total_new_users = active_users * base_growth_rate + marketing_impact
+            active_users += total_new_users
+
+            purchase_volume = active_users * p[i, 4] * 3.5
+            cashback = purchase_volume * p[i, 5]
+            used_points = cashback * p[i, 6]
+            unclaimed_points = cashback * (1 - p[i, 6])
+            out[16, i, t] = unclaimed_points
+            if t >= claim_period:
+                expired_points_income = out[16, i, t - claim_period] * p[i, 7]
+            else:
+                expired_points_income = 0.0
+            exchange_commission = used_points * p[i, 8]
+            reward_commission = cashback * p[i, 9]
+
+            subscription_revenue = 0.0
+            if month >= p[i, 10]:
+                subscription_revenue = (active_users / 100 + active_users / 80) * p[i, 11] * p[i, 12]
+            premium_revenue = active_users * 0.04 * 399 if month >= p[i, 13] else 0.0
+            ad_revenue = active_users * p[i, 15] if month >= p[i, 14] else 0.0
+
+            if month > 12:
+                burn_rate_fot = 4000000.0
+            elif month > 6:
+                burn_rate_fot = 2500000.0
+            else:
+                burn_rate_fot = 0.0
+            if month <= 6:
+                infra_cost = 0.0
+                marketing_expense = 0.0
+            else:
+                if active_users > 50000:
+                    infra_cost = p[i, 16] * 2.0
+                elif active_users > 10000:
+                    infra_cost = p[i, 16] * 1.5
+                else:
+                    infra_cost = p[i, 16]
+                marketing_expense = marketing_budget
+
+            revenue = (
+                exchange_commission + reward_commission + subscription_revenue +
+                premium_revenue + ad_revenue + expired_points_income
+            )
+            operational_expenses = burn_rate_fot + infra_cost
+            total_expenses = operational_expenses + marketing_expense
+            vat = revenue * 0.20
+            profit_before_tax = revenue - vat - total_expenses
+            profit_tax = max(0.0, profit_before_tax * 0.20)
+
+            out[0, i, t] = revenue
+            out[1, i, t] = total_expenses
+            out[2, i, t] = marketing_expense
+            out[3, i, t] = burn_rate_fot
+            out[4, i, t] = infra_cost
+            out[5, i, t] = operational_expenses
+            out[6, i, t] = profit_before_tax - profit_tax
+            out[7, i, t] = vat + profit_tax
+            out[8, i, t] = purchase_volume
+            out[9, i, t] = cashback
+            out[10, i, t] = active_users
+            out[11, i, t] = marketing_impact
+            out[12, i, t] = active_users * base_growth_rate
+            out[13, i, t] = total_new_users
+            out[14, i, t] = exchange_commission + reward_commission
+            out[15, i, t] = expired_points_income
+            out[17, i, t] = subscription_revenue
+            out[18, i, t] = premium_revenue
+            out[19, i, t] = ad_revenue
+
+
+if NUMBA_AVAILABLE:
+    _month_recursion_jit = numba.njit(parallel=True, cache=True)(_month_recursion)
+
+
+def run_numba(param, months):
+    """JIT backend: ``param(key)`` returns an N-vector for each kernel parameter"""
+    p = np.ascontiguousarray(np.column_stack([param(key) for key in KERNEL_PARAMETERS]))
+    months = np.asarray(list(months), dtype=np.int64)
+    out = np.zeros((len(KERNEL_OUTPUTS), p.shape[0], len(months)))
+    _month_recursion_jit(p, months, out)
+    return dict(zip(KERNEL_OUTPUTS, out))
@@ -0,0 +1,68 @@
+import numpy as np
+
+from models.parameters import PARAMETER_KEYS
+
+
+def parameter_column(params, key, columns=PARAMETER_KEYS):
+    """Return one column of an N×P parameter matrix"""
+    return np.atleast_2d(params)[:, list(columns).index(key)]
+
+
+def cumulative_cash(profit, initial_investment, preparatory_expenses):
+    """Cash balance after each month: investment minus preparatory spend plus accumulated profit"""
+    start = np.asarray(initial_investment, dtype=np.float64) - preparatory_expenses
+    return start[..., None] + np.cumsum(profit, axis=-1)
+
+
+def break_even_month(profit):
+    """First month from which profit stays positive to the end of the horizon.
+
+    The launch months have no payroll or infrastructure costs, so a single
+    positive month is not enough; NaN means the scenario ends unprofitable.
+    """
+    profit = np.atleast_2d(profit)
+    losing = profit <= 0
+    # Индекс последнего убыточного месяца (-1, если таких нет)
+    last_loss = profit.shape[1] - 1 - np.argmax(losing[:, ::-1], axis=1)
+    last_loss = np.where(losing.any(axis=1), last_loss, -1)
+    return np.where(losing[:, -1], np.nan, last_loss + 2.0)
+
+
+def profitable_by_month(profit):
+    """Share of scenarios that have broken even by each month"""
+    months = np.arange(1, np.shape(profit)[-1] + 1)
+    break_even = break_even_month(profit)
+    return (break_even[:, None] <= months[None, :]).mean(axis=0)
+
+
+def roi(out, params, columns=PARAMETER_KEYS):
+    """ROI in percent: total profit over operating expenses plus up-front investment"""
+    total_investment = (
+        out['expenses'].sum(axis=-1) +
+        parameter_column(params, 'initial_investment', columns) +
+        parameter_column(params, 'preparatory_expenses', columns)
+    )
+    total_profit = out['profit'].sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total_investment > 0, total_profit / total_investment * 100, 0.0)
+
+
+def npv(out, params, annual_rate=0.15, columns=PARAMETER_KEYS):
+    """Net present value: preparatory spend up front plus monthly profit discounted at ``annual_rate``.
+
+    The initial investment is financing, not a cost, so it is left out.
+    """
+    monthly_rate = (1 + annual_rate) ** (1 / 12) - 1
+    discount = (1 + monthly_rate) ** -np.arange(1, out['profit'].shape[-1] + 1)
+    return out['profit'] @ discount - parameter_column(params, 'preparatory_expenses', columns)
+
+
+def summarize(out, params, columns=PARAMETER_KEYS):
+    """Headline metrics per scenario for a batch result"""
+    return {
+        'total_revenue': out['revenue'].sum(axis=-1),
+        'total_profit': out['profit'].sum(axis=-1),
+        'roi': roi(out, params, columns),
+        'break_even_month': break_even_month(out['profit']),
+        'final_active_users': out['active_users'][:, -1],
+    }
@@ -0,0 +1,159 @@
+import math
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from models.executor import get_executor
+from models.financial_model import calculate_financials_batch
+from models.metrics import break_even_month, cumulative_cash, parameter_column
+from models.parameters import INTEGER_KEYS, PARAMETER_KEYS
+from models.sketches import BandAccumulator
+from utils.logging_config import log_error, log_info
+
+PERCENTILES = (5, 50, 95)
+BAND_METRICS = ('profit', 'cumulative_cash', 'active_users')
+# Задач на ядро: несколько, чтобы уравнять загрузку; группировка чанков зависит от ядер машины,
+# но не от аргумента workers
+TASKS_PER_CPU = 4
+
+
+@dataclass(frozen=True)
+class ParameterDistribution:
+    """Distribution of one parameter around its value in the current scenario.
+
+    ``spread`` is the relative standard deviation for ``normal`` and
+    ``lognormal`` and the relative half-width for ``uniform`` and
+    ``triangular``. Samples are clipped to ``[low, high]`` when given.
+    """
+    kind: str = 'normal'
+    spread: float = 0.1
+    low: float | None = None
+    high: float | None = None
+
+    def sample(self, base, rng, size):
+        if self.kind == 'normal':
+            values = rng.normal(base, abs(base) * self.spread, size)
+        elif self.kind == 'lognormal':
+            values = base * rng.lognormal(0.0, self.spread, size)
+        elif self.kind == 'uniform':
+            values = rng.uniform(base * (1 - self.spread), base * (1 + self.spread), size)
+        elif self.kind == 'triangular':
+            low, high = sorted((base * (1 - self.spread), base * (1 + self.spread)))
+            values = rng.triangular(low, base, high, size) if high > low else np.full(size, base)
+        else:
+            raise ValueError(f"Unknown distribution: {self.kind}")
+        if self.low is not None or self.high is not None:
+            values = np.clip(values, self.low, self.high)
+        return values
+
+
+DEFAULT_DISTRIBUTIONS = {
+    'growth_rate_y1': ParameterDistribution('normal', 0.20, low=0.0),
+    'active_conversion': ParameterDistribution('normal', 0.15, low=0.0, high=1.0),
+    'avg_check': ParameterDistribution('lognormal', 0.10),
+    'points_usage_rate': ParameterDistribution('uniform', 0.15, low=0.0, high=1.0),
+    'marketing_efficiency': ParameterDistribution('triangular', 0.30, low=0.0),
+}
+
+
+@dataclass(frozen=True)
+class MonteCarloResult:
+    n_paths: int
+    seed: int
+    bands: dict  # metric -> {percentile: array over months}
+    profitable_by_month: np.ndarray
+    months: np.ndarray
+    mean: dict  # metric -> array over months
+    std: dict
+
+    def probability_profitable_by(self, month):
+        """Probability that the forecast has broken even by ``month``"""
+        return float(self.profitable_by_month[int(month) - 1])
+
+
+def sample_parameters(base_row, distributions, rng, size, columns=PARAMETER_KEYS):
+    """Draw ``size`` parameter rows around ``base_row``"""
+    matrix = np.repeat(np.asarray(base_row, dtype=np.float64)[None, :], size, axis=0)
+    # Фиксированный порядок ключей, чтобы поток случайных чисел не зависел от dict
+    for key in sorted(distributions):
+        col = list(columns).index(key)
+        values = distributions[key].sample(matrix[0, col], rng, size)
+        matrix[:, col] = np.rint(values) if key in INTEGER_KEYS else values
+    return matrix
+
+
+def _simulate_task(task):
+    """Simulate a group of chunks and return only their merged sketches.
+
+    Paths live for one chunk at a time; what goes back to the parent is the
+    BandAccumulator and a histogram of break-even months.
+    """
+    base_row, distributions, chunks, months, metrics, relative_accuracy = task
+    accumulator = BandAccumulator(metrics, len(months), relative_accuracy)
+    # Индекс 0 — безубыточность не достигнута, 1..H — месяц выхода
+    break_even_counts = np.zeros(len(months) + 1, dtype=np.int64)
+    for seed_sequence, size in chunks:
+        rng = np.random.default_rng(seed_sequence)
+        matrix = sample_parameters(base_row, distributions, rng, size)
+        out = calculate_financials_batch(matrix, months=months)
+        out['cumulative_cash'] = cumulative_cash(
+            out['profit'],
+            parameter_column(matrix, 'initial_investment'),
+            parameter_column(matrix, 'preparatory_expenses'))
+        accumulator.add(out)
+        break_even = np.nan_to_num(break_even_month(out['profit']), nan=0).astype(np.int64)
+        break_even_counts += np.bincount(break_even, minlength=len(months) + 1)
+    return accumulator, break_even_counts
+
+
+def run_monte_carlo(params, distributions=None, n_paths=100000, seed=0,
+                    workers=None, chunk_size=10000, months=range(1, 25),
+                    metrics=BAND_METRICS, relative_accuracy=0.01):
+    """Simulate ``n_paths`` forecasts with parameters drawn from ``distributions``.
+
+    Paths are split into fixed-size chunks, each with its own child of
+    ``SeedSequence(seed)``. Chunks are grouped into tasks by ``n_chunks`` and
+    the machine's CPU count, never by ``workers``, so on one machine the
+    result is bit-identical for any number of workers. ``workers=1`` runs in
+    the calling process. Paths are never collected: bands come from mergeable
+    quantile sketches (within ``relative_accuracy``) and running moments, so
+    memory does not grow with ``n_paths``. ``metrics`` may be any line item
+    or 'cumulative_cash'.
+    """
+    try:
+        distributions = DEFAULT_DISTRIBUTIONS if distributions is None else distributions
+        base_row = params.to_row()
+        months = list(months)
+        n_chunks = -(-n_paths // chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+        chunks = [(seeds[i], min(chunk_size, n_paths - i * chunk_size)) for i in range(n_chunks)]
+        chunks_per_task = max(1, math.ceil(n_chunks / (TASKS_PER_CPU * (os.cpu_count() or 1))))
+        tasks = [
+            (base_row, distributions, chunks[i:i + chunks_per_task], months, metrics, relative_accuracy)
+            for i in range(0, n_chunks, chunks_per_task)
+        ]
+        workers = workers or min(os.cpu_count() or 1, len(tasks))
+        log_info(f"Running Monte Carlo: {n_paths} paths, {n_chunks} chunks, {workers} workers")
+
+        accumulator = BandAccumulator(metrics, len(months), relative_accuracy)
+        break_even_counts = np.zeros(len(months) + 1, dtype=np.int64)
+        # Тёплый общий пул процессов; сливаем результаты по мере поступления, в порядке задач
+        results = get_executor().map(_simulate_task, tasks, workers) if workers > 1 else map(_simulate_task, tasks)
+        for task_accumulator, task_counts in results:
+            accumulator.merge(task_accumulator)
+            break_even_counts += task_counts
+
+        return MonteCarloResult(
+            n_paths=n_paths,
+            seed=seed,
+            bands=accumulator.bands(PERCENTILES),
+            profitable_by_month=np.cumsum(break_even_counts[1:]) / n_paths,
+            months=np.array(months),
+            mean={metric: moments.mean for metric, moments in accumulator.moments.items()},
+            std={metric: moments.std for metric, moments in accumulator.moments.items()},
+        )
+
+    except Exception as e:
+        log_error(e, context="Error in run_monte_carlo")
+        raise
@@ -0,0 +1,218 @@
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from models.financial_model import calculate_financials_batch
+from models.metrics import cumulative_cash, npv, parameter_column, roi
+from models.monte_carlo import DEFAULT_DISTRIBUTIONS, sample_parameters
+from models.parameters import INTEGER_KEYS, PARAMETER_KEYS
+from utils.logging_config import log_error, log_info
+
+# Управляемые рычаги и границы поиска по умолчанию
+DEFAULT_LEVERS = {
+    'marketing_spend_rate': (0.0, 0.5),
+    'cashback_rate': (0.01, 0.2),
+    'reward_commission_rate': (0.0, 0.1),
+    'exchange_commission_rate': (0.0, 0.1),
+    'premium_business_price': (1000.0, 20000.0),
+    'premium_business_start_month': (1, 24),
+    'premium_user_start_month': (1, 24),
+    'ad_start_month': (1, 24),
+}
+
+OBJECTIVES = {
+    'roi': roi,
+    'npv': npv,
+}
+
+
+@dataclass(frozen=True)
+class OptimizationResult:
+    """Best lever values plus the final population for frontier analysis"""
+    levers: tuple
+    values: dict
+    objective: float
+    feasible: bool
+    violation: float
+    population: np.ndarray
+    population_objective: np.ndarray
+    population_violation: np.ndarray
+    history: np.ndarray
+    generations: int
+    evaluations: int
+    elapsed: float
+
+
+@dataclass(frozen=True)
+class RiskReturnFrontier:
+    """Expected objective and its downside percentile per candidate under shared samples"""
+    levers: tuple
+    candidates: np.ndarray
+    expected: np.ndarray
+    downside: np.ndarray
+    percentile: float
+    front: np.ndarray  # индексы недоминируемых кандидатов по росту downside, т. е. по убыванию риска
+
+
+def constraint_violation(out, matrix, min_cash=None, min_active_users=None):
+    """Scaled constraint violation per scenario; 0 means feasible"""
+    violation = np.zeros(len(matrix))
+    if min_cash is not None:
+        cash = cumulative_cash(out['profit'],
+                               parameter_column(matrix, 'initial_investment'),
+                               parameter_column(matrix, 'preparatory_expenses'))
+        violation += np.maximum(0.0, min_cash - cash.min(axis=1)) / max(abs(min_cash), 1e6)
+    if min_active_users is not None:
+        violation += (np.maximum(0.0, min_active_users - out['active_users'][:, -1]) /
+                      max(min_active_users, 1.0))
+    return violation
+
+
+def _apply_levers(matrix, keys, values):
+    for j, key in enumerate(keys):
+        column = values[:, j]
+        matrix[:, PARAMETER_KEYS.index(key)] = np.rint(column) if key in INTEGER_KEYS else column
+    return matrix
+
+
+def _better(f_new, v_new, f_old, v_old):
+    """Feasibility rules: feasible beats infeasible, then objective, then violation"""
+    both_feasible = (v_new == 0) & (v_old == 0)
+    return np.where(both_feasible, f_new >= f_old,
+                    np.where((v_new == 0) | (v_old == 0), v_new == 0, v_new <= v_old))
+
+
+def _best_index(f, v):
+    feasible = v == 0
+    if feasible.any():
+        return int(np.flatnonzero(feasible)[np.argmax(f[feasible])])
+    return int(np.argmin(v))
+
+
+def optimize_levers(params, objective='roi', levers=None, min_cash=None, min_active_users=None,
+                    population=None, generations=60, mutation=0.7, crossover=0.9, seed=0,
+                    months=range(1, 25)):
+    """Maximize ROI or NPV over the levers with differential evolution (rand/1/bin).
+
+    Every generation's trial population is evaluated in one batched model
+    call. Constraints ("cash never below ``min_cash``", "active users at the
+    last month ≥ ``min_active_users``") are handled with feasibility rules,
+    so no penalty weight has to be tuned. Start months are searched as reals
+    and rounded when applied.
+    """
+    try:
+        started = time.perf_counter()
+        levers = dict(DEFAULT_LEVERS if levers is None else levers)
+        keys = tuple(levers)
+        low = np.array([levers[key][0] for key in keys], dtype=np.float64)
+        high = np.array([levers[key][1] for key in keys], dtype=np.float64)
+        n = population or max(20, 8 * len(keys))
+        months = list(months)
+        score = OBJECTIVES[objective]
+        base_row = params.to_row()
+        rng = np.random.default_rng(seed)
+
+        def evaluate(candidates):
+            matrix = _apply_levers(np.repeat(base_row[None, :], len(candidates), axis=0),
+                                   keys, candidates)
+            out = calculate_financials_batch(matrix, months=months)
+            return score(out, matrix), constraint_violation(out, matrix, min_cash, min_active_users)
+
+        pop = low + rng.random((n, len(keys))) * (high - low)
+        f, v = evaluate(pop)
+        history = []
+        for generation in range(generations):
+            # Три различных донора на каждого члена популяции, не совпадающих с ним
+            donors = np.argsort(rng.random((n, n)) + np.eye(n), axis=1)[:, :3]
+            mutant = pop[donors[:, 0]] + mutation * (pop[donors[:, 1]] - pop[donors[:, 2]])
+            # Отражение от границ сохраняет разнообразие лучше, чем обрезка
+            mutant = np.where(mutant < low, 2 * low - mutant, mutant)
+            mutant = np.where(mutant > high, 2 * high - mutant, mutant)
+            mutant = np.clip(mutant, low, high)
+            cross = rng.random((n, len(keys))) < crossover
+            cross[np.arange(n), rng.integers(len(keys), size=n)] = True
+            trial = np.where(cross, mutant, pop)
+
+            f_trial, v_trial = evaluate(trial)
+            accept = _better(f_trial, v_trial, f, v)
+            pop[accept] = trial[accept]
+            f = np.where(accept, f_trial, f)
+            v = np.where(accept, v_trial, v)
+            history.append(f[_best_index(f, v)])
+
+        best = _best_index(f, v)
+        elapsed = time.perf_counter() - started
+        log_info(f"Lever optimization ({objective}): {generations} generations of {n}, "
+                 f"{elapsed:.2f}s, best {f[best]:.4g}, feasible {v[best] == 0}")
+        values = {
+            key: int(round(pop[best, j])) if key in INTEGER_KEYS else float(pop[best, j])
+            for j, key in enumerate(keys)
+        }
+        return OptimizationResult(
+            levers=keys,
+            values=values,
+            objective=float(f[best]),
+            feasible=bool(v[best] == 0),
+            violation=float(v[best]),
+            population=pop,
+            population_objective=f,
+            population_violation=v,
+            history=np.array(history),
+            generations=generations,
+            evaluations=n * (generations + 1),
+            elapsed=elapsed,
+        )
+
+    except Exception as e:
+        log_error(e, context="Error in optimize_levers")
+        raise
+
+
+def pareto_front(expected, downside):
+    """Indices not dominated when maximizing both, ordered by increasing downside"""
+    order = np.lexsort((-expected, -downside))
+    front = []
+    best_expected = -np.inf
+    for i in order:
+        if expected[i] > best_expected:
+            front.append(i)
+            best_expected = expected[i]
+    return np.array(front[::-1], dtype=np.int64)
+
+
+def risk_return_frontier(params, levers, candidates, objective='roi', distributions=None,
+                         n_samples=500, percentile=5, seed=0, months=range(1, 25)):
+    """Risk/return trade-off of lever candidates under common random numbers.
+
+    One set of uncertain-parameter samples is drawn and reused for every
+    candidate, so differences between candidates are not sampling noise.
+    All candidates × samples run in one batch call.
+    """
+    try:
+        levers = tuple(levers)
+        candidates = np.atleast_2d(np.asarray(candidates, dtype=np.float64))
+        distributions = DEFAULT_DISTRIBUTIONS if distributions is None else distributions
+        distributions = {key: dist for key, dist in distributions.items() if key not in levers}
+        samples = sample_parameters(params.to_row(), distributions,
+                                    np.random.default_rng(seed), n_samples)
+
+        matrix = np.tile(samples, (len(candidates), 1))
+        _apply_levers(matrix, levers, np.repeat(candidates, n_samples, axis=0))
+        out = calculate_financials_batch(matrix, months=list(months))
+        values = OBJECTIVES[objective](out, matrix).reshape(len(candidates), n_samples)
+
+        expected = values.mean(axis=1)
+        downside = np.percentile(values, percentile, axis=1)
+        return RiskReturnFrontier(
+            levers=levers,
+            candidates=candidates,
+            expected=expected,
+            downside=downside,
+            percentile=percentile,
+            front=pareto_front(expected, downside),
+        )
+
+    except Exception as e:
+        log_error(e, context="Error in risk_return_frontier")
+        raise
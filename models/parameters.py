@@ -0,0 +1,134 @@
+import json
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+
+# Порядок столбцов матрицы параметров для пакетного расчёта (ключи PRESETS)
+PARAMETER_KEYS = (
+    'initial_users', 'active_conversion', 'growth_rate_y1', 'growth_rate_y2',
+    'avg_check', 'points_usage_rate', 'cashback_rate', 'expired_points_rate',
+    'exchange_commission_rate', 'reward_commission_rate', 'base_infra_cost',
+    'marketing_efficiency', 'marketing_spend_rate', 'ad_revenue_per_user',
+    'partnership_rate', 'burn_rate_fot_1', 'burn_rate_fot_2',
+    'premium_business_start_month', 'premium_user_start_month', 'ad_start_month',
+    'premium_business_rate', 'premium_business_price', 'claim_period_months',
+    'initial_investment', 'preparatory_expenses', 'retention_decay', 'retention_floor'
+)
+
+# Значения по умолчанию для необязательных параметров
+PARAMETER_DEFAULTS = {
+    'claim_period_months': 2,
+    'premium_business_start_month': 13,
+    'premium_business_rate': 0.3,
+    'premium_business_price': 8000,
+    'premium_user_start_month': 13,
+    'ad_start_month': 13,
+    'ad_revenue_per_user': 20,
+    'partnership_rate': 0.0,
+    'burn_rate_fot_1': 2500000,
+    'burn_rate_fot_2': 4000000,
+    'initial_investment': 10000000,
+    'preparatory_expenses': 21000000,
+    'retention_decay': 0.0,
+    'retention_floor': 0.3,
+}
+
+# Параметры, которые задаются целым числом месяцев
+INTEGER_KEYS = frozenset({
+    'premium_business_start_month', 'premium_user_start_month',
+    'ad_start_month', 'claim_period_months'
+})
+
+# Параметры-доли: значения от 0 до 1
+SHARE_KEYS = frozenset({
+    'active_conversion', 'points_usage_rate', 'cashback_rate', 'expired_points_rate',
+    'exchange_commission_rate', 'reward_commission_rate', 'marketing_spend_rate',
+    'partnership_rate', 'premium_business_rate', 'retention_decay', 'retention_floor'
+})
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class ModelParameters:
+    """Immutable, hashable set of inputs for the financial model"""
+    initial_users: float
+    active_conversion: float
+    growth_rate_y1: float
+    growth_rate_y2: float
+    avg_check: float
+    points_usage_rate: float
+    cashback_rate: float
+    expired_points_rate: float
+    exchange_commission_rate: float
+    reward_commission_rate: float
+    base_infra_cost: float
+    marketing_efficiency: float
+    marketing_spend_rate: float
+    ad_revenue_per_user: float = 20.0
+    partnership_rate: float = 0.0
+    burn_rate_fot_1: float = 2500000.0
+    burn_rate_fot_2: float = 4000000.0
+    premium_business_start_month: int = 13
+    premium_user_start_month: int = 13
+    ad_start_month: int = 13
+    premium_business_rate: float = 0.3
+    premium_business_price: float = 8000.0
+    claim_period_months: int = 2
+    initial_investment: float = 10000000.0
+    preparatory_expenses: float = 21000000.0
+    # Когортная модель: удержание = floor + (1 - floor) * exp(-decay * возраст); 0 — без оттока
+    retention_decay: float = 0.0
+    retention_floor: float = 0.3
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        """Build parameters from a preset dict or session state, ignoring unknown keys"""
+        values = {}
+        for key in PARAMETER_KEYS:
+            if key in mapping:
+                value = mapping[key]
+            elif key in PARAMETER_DEFAULTS:
+                value = PARAMETER_DEFAULTS[key]
+            else:
+                raise KeyError(f"Missing required parameter: {key}")
+            values[key] = int(round(value)) if key in INTEGER_KEYS else float(value)
+        return cls(**values)
+
+    @classmethod
+    def from_preset(cls, preset_name, custom_presets_path='custom_presets.json'):
+        """Build parameters from a built-in or custom preset by name"""
+        from utils.presets import PRESETS
+
+        if preset_name in PRESETS:
+            return cls.from_mapping(PRESETS[preset_name])
+        try:
+            with open(custom_presets_path, 'r') as f:
+                custom_presets = json.load(f)
+        except FileNotFoundError:
+            custom_presets = {}
+        if preset_name not in custom_presets:
+            raise KeyError(f"Unknown preset: {preset_name}")
+        return cls.from_mapping(custom_presets[preset_name])
+
+    @classmethod
+    def from_row(cls, row, columns=PARAMETER_KEYS):
+        """Build parameters from one row of a parameter matrix"""
+        return cls.from_mapping(dict(zip(columns, np.asarray(row).tolist())))
+
+    def to_dict(self):
+        return asdict(self)
+
+    def to_row(self, columns=PARAMETER_KEYS):
+        """Return the parameters as a float64 vector in matrix column order"""
+        return np.array([getattr(self, key) for key in columns], dtype=np.float64)
+
+    def replace(self, **changes):
+        """Return a copy with some parameters changed"""
+        return replace(self, **changes)
+
+
+def stack_parameters(params_list, columns=PARAMETER_KEYS):
+    """Stack ModelParameters objects into an N×P parameter matrix"""
+    matrix = np.empty((len(params_list), len(columns)), dtype=np.float64)
+    for row, params in enumerate(params_list):
+        matrix[row] = params.to_row(columns)
+    return matrix
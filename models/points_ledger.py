@@ -0,0 +1,64 @@
+import numpy as np
+
+LEDGER_ITEMS = ('points_issued', 'points_redeemed', 'points_expired', 'points_outstanding')
+
+
+class PointsLedger:
+    """Points liability ledger for N scenarios with per-vintage FIFO aging.
+
+    Each issue month is a vintage kept in a fixed-size ring buffer.
+    Redemptions consume the oldest balances first. When a vintage reaches
+    ``claim_period`` months, ``expired_rate`` of what is left burns; the
+    rest stays redeemable for one more claim period (at least one month)
+    and whatever is still left then lapses in full. A vintage therefore
+    never outlives ``lifetime`` months, and the outstanding liability is
+    bounded by the issues of that many months. All state lives in NumPy
+    arrays, so one ``step`` per month serves every scenario at once.
+    """
+
+    def __init__(self, claim_period):
+        self.claim_period = np.asarray(claim_period, dtype=np.int64)
+        n = len(self.claim_period)
+        # Возраст полного сгорания остатка: ещё один период подтверждения после частичного
+        self.lifetime = np.maximum(2 * self.claim_period, self.claim_period + 1)
+        self.window = int(self.lifetime.max(initial=0)) + 1
+        self.vintages = np.zeros((n, self.window))
+        self.month = 0
+        self._rows = np.arange(n)
+
+    @property
+    def outstanding(self):
+        """Points issued and not yet redeemed or expired"""
+        return self.vintages.sum(axis=1)
+
+    def _take(self, t, age):
+        """Balance of the vintage of age ``age`` (where it exists) and its slot"""
+        exists = t - age >= 0
+        slot = (t - age) % self.window
+        return np.where(exists, self.vintages[self._rows, slot], 0.0), exists, slot
+
+    def step(self, issued, redeem, expired_rate):
+        """Book one month; returns (redeemed, expired) per scenario"""
+        t = self.month
+        # Слот выпуска возраста window уже пуст: его остаток сгорел в возрасте lifetime
+        self.vintages[:, t % self.window] = issued
+
+        # FIFO: выпуски от старых к новым
+        order = (t - np.arange(self.window - 1, -1, -1)) % self.window
+        balances = self.vintages[:, order]
+        taken_cum = np.minimum(np.cumsum(balances, axis=1), np.asarray(redeem)[:, None])
+        balances -= np.diff(taken_cum, axis=1, prepend=0.0)
+        self.vintages[:, order] = balances
+        redeemed = taken_cum[:, -1]
+
+        # Выпуск возраста claim_period: сгорает доля expired_rate остатка
+        matured, matures, slot = self._take(t, self.claim_period)
+        burned = matured * expired_rate
+        self.vintages[self._rows[matures], slot[matures]] -= burned[matures]
+
+        # Выпуск возраста lifetime: остаток сгорает полностью
+        lapsed, lapses, slot = self._take(t, self.lifetime)
+        self.vintages[self._rows[lapses], slot[lapses]] = 0.0
+
+        self.month += 1
+        return redeemed, burned + lapsed
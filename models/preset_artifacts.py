@@ -0,0 +1,147 @@
+"""Precomputed forecasts and Monte Carlo bands for the built-in presets.
+
+``python build_artifacts.py`` writes one result store per forecast horizon
+under ``artifacts/presets-<version>/``; the version hashes ``utils/presets.py``,
+the model sources and the band settings, so a stale artifact is never used.
+At startup ``load_preset_artifacts`` memory-maps the arrays and seeds the
+forecast cache, and the default landing view is served without running the
+model.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from models.cache import BAND_METRICS, BAND_PATHS, bands_key, compute_bands, forecast_cache, parameters_hash
+from models.disk_cache import model_fingerprint
+from models.financial_model import LINE_ITEMS
+from models.monte_carlo import PERCENTILES, MonteCarloResult
+from models.parameters import ModelParameters, stack_parameters
+from models.result_store import open_result_store, write_result_store
+from models.results import ForecastResult
+from utils.logging_config import log_error, log_info
+
+ARTIFACT_DIR = os.environ.get('PRESET_ARTIFACT_DIR', 'artifacts')
+ARTIFACT_INDEX = 'artifact.json'
+# Горизонты из выбора «Горизонт прогноза» на главной странице
+HORIZONS = (24, 36, 60, 84, 120)
+
+
+def artifact_version():
+    """Hash of the presets, the model code and the band settings"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    with open(os.path.join(root, 'utils', 'presets.py'), 'rb') as f:
+        digest.update(f.read())
+    digest.update(model_fingerprint().encode('utf-8'))
+    digest.update(json.dumps({'paths': BAND_PATHS, 'metrics': BAND_METRICS, 'percentiles': PERCENTILES,
+                              'horizons': HORIZONS}).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def artifact_path(directory=ARTIFACT_DIR, version=None):
+    return os.path.join(directory, f"presets-{(version or artifact_version())[:16]}")
+
+
+def _preset_parameters():
+    from utils.presets import PRESETS
+
+    return {name: ModelParameters.from_mapping(PRESETS[name]) for name in PRESETS}
+
+
+def build_preset_artifacts(directory=ARTIFACT_DIR, force=False):
+    """Write the artifact for the current version unless it exists; returns its path"""
+    try:
+        version = artifact_version()
+        path = artifact_path(directory, version)
+        if os.path.exists(os.path.join(path, ARTIFACT_INDEX)) and not force:
+            log_info(f"Preset artifacts are up to date: {path}")
+            return path
+
+        presets = _preset_parameters()
+        matrix = stack_parameters(list(presets.values()))
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for horizon in HORIZONS:
+            store_path = write_result_store(os.path.join(tmp_path, f'h{horizon:03d}'), matrix, list(presets),
+                                            months=range(1, horizon + 1))
+            simulations = [compute_bands(params, horizon) for params in presets.values()]
+            # metric × percentile × preset × month
+            np.save(os.path.join(store_path, 'bands.npy'), np.array([
+                [[result.bands[metric][p] for result in simulations] for p in PERCENTILES]
+                for metric in BAND_METRICS]))
+            np.save(os.path.join(store_path, 'band_mean.npy'), np.array([
+                [result.mean[metric] for result in simulations] for metric in BAND_METRICS]))
+            np.save(os.path.join(store_path, 'band_std.npy'), np.array([
+                [result.std[metric] for result in simulations] for metric in BAND_METRICS]))
+            np.save(os.path.join(store_path, 'profitable_by_month.npy'),
+                    np.array([result.profitable_by_month for result in simulations]))
+
+        with open(os.path.join(tmp_path, ARTIFACT_INDEX), 'w') as f:
+            json.dump({
+                'version': version,
+                'presets': list(presets),
+                'horizons': list(HORIZONS),
+                'band_paths': BAND_PATHS,
+                'band_metrics': list(BAND_METRICS),
+                'percentiles': list(PERCENTILES),
+            }, f, indent=2)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+        # Артефакты прошлых версий больше не нужны
+        for name in os.listdir(directory):
+            if name.startswith('presets-') and os.path.join(directory, name) != path:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        log_info(f"Preset artifacts built: {path}")
+        return path
+
+    except Exception as e:
+        log_error(e, context="Error in build_preset_artifacts")
+        raise
+
+
+def load_preset_artifacts(directory=ARTIFACT_DIR, cache=forecast_cache):
+    """Seed ``cache`` from the current artifact; False when it is missing or outdated"""
+    try:
+        path = artifact_path(directory)
+        if not os.path.exists(os.path.join(path, ARTIFACT_INDEX)):
+            log_info(f"No preset artifacts for this version in {directory}; presets will be computed")
+            return False
+        with open(os.path.join(path, ARTIFACT_INDEX), 'r') as f:
+            index = json.load(f)
+        presets = _preset_parameters()
+        if index['presets'] != list(presets):
+            return False
+
+        for horizon in index['horizons']:
+            store_path = os.path.join(path, f'h{horizon:03d}')
+            store = open_result_store(store_path)
+            items = {item: store.item(item) for item in LINE_ITEMS}
+            bands = np.load(os.path.join(store_path, 'bands.npy'), mmap_mode='r')
+            band_mean = np.load(os.path.join(store_path, 'band_mean.npy'), mmap_mode='r')
+            band_std = np.load(os.path.join(store_path, 'band_std.npy'), mmap_mode='r')
+            profitable = np.load(os.path.join(store_path, 'profitable_by_month.npy'), mmap_mode='r')
+            for row, params in enumerate(presets.values()):
+                # Строки отображённых в память массивов, без копирования
+                result = ForecastResult.from_batch(items, row, store.months)
+                cache.put(parameters_hash(params, horizon), result, persist=False)
+                cache.put(bands_key(params, horizon), MonteCarloResult(
+                    n_paths=index['band_paths'],
+                    seed=0,
+                    bands={metric: {p: bands[m, k, row] for k, p in enumerate(index['percentiles'])}
+                           for m, metric in enumerate(index['band_metrics'])},
+                    profitable_by_month=profitable[row],
+                    months=store.months,
+                    mean={metric: band_mean[m, row] for m, metric in enumerate(index['band_metrics'])},
+                    std={metric: band_std[m, row] for m, metric in enumerate(index['band_metrics'])},
+                ), persist=False)
+        log_info(f"Preset artifacts loaded: {len(presets)} presets × {len(index['horizons'])} horizons")
+        return True
+
+    except Exception as e:
+        log_error(e, context="Error loading preset artifacts")
+        return False
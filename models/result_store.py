@@ -0,0 +1,213 @@
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from models.financial_model import LINE_ITEMS, calculate_financials_batch
+from models.metrics import cumulative_cash, parameter_column, summarize
+from models.parameters import PARAMETER_KEYS
+from utils.logging_config import log_error, log_info
+
+INDEX_NAME = 'index.json'
+STORE_VERSION = 1
+STORE_ITEMS = LINE_ITEMS + ('cumulative_cash',)
+DEFAULT_STORE_DIR = os.environ.get('RESULT_STORE_DIR', 'results')
+
+
+class ResultStoreWriter:
+    """Writes a result set chunk by chunk into fixed-layout ``.npy`` files.
+
+    Each line item is one ``scenarios × months`` float64 array, so a reader
+    can map a single metric and touch only the rows it needs. Files are
+    written into a temporary directory that is renamed into place on
+    ``close()``; a store with an ``index.json`` is always complete.
+    """
+
+    def __init__(self, path, names, months, line_items=STORE_ITEMS, columns=PARAMETER_KEYS):
+        self.path = path
+        self.tmp_path = path.rstrip(os.sep) + '.tmp'
+        self.months = [int(month) for month in months]
+        self.line_items = tuple(line_items)
+        self.columns = tuple(columns)
+        self.n_scenarios = len(names)
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(os.path.join(self.tmp_path, 'items'))
+        os.makedirs(os.path.join(self.tmp_path, 'summary'))
+        shape = (self.n_scenarios, len(self.months))
+        self.items = {
+            item: np.lib.format.open_memmap(
+                os.path.join(self.tmp_path, 'items', f'{item}.npy'), mode='w+', dtype=np.float64, shape=shape)
+            for item in self.line_items
+        }
+        self.params = np.lib.format.open_memmap(
+            os.path.join(self.tmp_path, 'params.npy'), mode='w+', dtype=np.float64,
+            shape=(self.n_scenarios, len(self.columns)))
+        np.save(os.path.join(self.tmp_path, 'scenarios.npy'), np.asarray(names, dtype=str))
+        self.summary = None
+        self.written = 0
+
+    def write(self, start, params, out, summary):
+        """Rows [start, start + len(params)) from a batch result and its summary"""
+        stop = start + len(params)
+        self.params[start:stop] = params
+        for item in self.line_items:
+            self.items[item][start:stop] = out[item]
+        if self.summary is None:
+            self.summary = {
+                key: np.lib.format.open_memmap(
+                    os.path.join(self.tmp_path, 'summary', f'{key}.npy'), mode='w+', dtype=np.float64,
+                    shape=(self.n_scenarios,))
+                for key in summary
+            }
+        for key, values in summary.items():
+            self.summary[key][start:stop] = values
+        self.written += stop - start
+
+    def close(self):
+        for array in (*self.items.values(), self.params, *(self.summary or {}).values()):
+            array.flush()
+        index = {
+            'version': STORE_VERSION,
+            'n_scenarios': self.n_scenarios,
+            'months': self.months,
+            'line_items': list(self.line_items),
+            'summary': list(self.summary or ()),
+            'columns': list(self.columns),
+            'dtype': 'float64',
+        }
+        with open(os.path.join(self.tmp_path, INDEX_NAME), 'w') as f:
+            json.dump(index, f, indent=2)
+        self.items = self.params = self.summary = None
+        # Старое хранилище удаляется только после того, как новое встало на его место
+        old_path = self.path.rstrip(os.sep) + '.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, old_path)
+        os.replace(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return self.path
+
+
+def write_result_store(path, matrix, names, months=range(1, 25), chunk_size=20000, line_items=STORE_ITEMS):
+    """Forecast every row of ``matrix`` and store it under ``path``; memory is bounded by the chunk size"""
+    try:
+        matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+        months = list(months)
+        writer = ResultStoreWriter(path, names, months, line_items)
+        for start in range(0, len(matrix), chunk_size):
+            chunk = matrix[start:start + chunk_size]
+            out = calculate_financials_batch(chunk, months=months)
+            out['cumulative_cash'] = cumulative_cash(
+                out['profit'],
+                parameter_column(chunk, 'initial_investment'),
+                parameter_column(chunk, 'preparatory_expenses'))
+            writer.write(start, chunk, out, summarize(out, chunk))
+        path = writer.close()
+        log_info(f"Result store written: {path} ({len(matrix)} scenarios, {len(months)} months)")
+        return path
+    except Exception as e:
+        log_error(e, context="Error in write_result_store")
+        raise
+
+
+class ResultStore:
+    """Read-only, memory-mapped view of a stored result set.
+
+    Arrays are opened with ``np.load(mmap_mode='r')``: slicing reads only the
+    touched pages, and every process that maps the same files shares them
+    through the OS page cache instead of holding a private copy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_NAME), 'r') as f:
+            self.index = json.load(f)
+        if self.index.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported result store version in {path}: {self.index.get('version')}")
+        self.months = np.asarray(self.index['months'])
+        self.line_items = tuple(self.index['line_items'])
+        self.summary_keys = tuple(self.index['summary'])
+        self.columns = tuple(self.index['columns'])
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.index['n_scenarios']
+
+    def _map(self, relative_path):
+        with self._lock:
+            array = self._arrays.get(relative_path)
+            if array is None:
+                array = np.load(os.path.join(self.path, relative_path), mmap_mode='r')
+                self._arrays[relative_path] = array
+            return array
+
+    @property
+    def scenarios(self):
+        return self._map('scenarios.npy')
+
+    @property
+    def params(self):
+        return self._map('params.npy')
+
+    def item(self, item):
+        """scenarios × months memmap of one line item"""
+        if item not in self.line_items:
+            raise KeyError(f"Unknown line item: {item}")
+        return self._map(os.path.join('items', f'{item}.npy'))
+
+    def summary(self, key):
+        if key not in self.summary_keys:
+            raise KeyError(f"Unknown summary metric: {key}")
+        return self._map(os.path.join('summary', f'{key}.npy'))
+
+    def rows(self, item, indices):
+        """In-memory copy of the selected scenarios of one line item, in the order given"""
+        indices = np.asarray(indices, dtype=np.int64)
+        # Читаем строки по возрастанию смещения, затем возвращаем исходный порядок
+        order = np.argsort(indices, kind='stable')
+        values = np.empty((len(indices), len(self.months)))
+        values[order] = self.item(item)[indices[order]]
+        return values
+
+    def top(self, key, n, largest=True):
+        """Indices of the ``n`` scenarios with the largest (or smallest) summary value, best first"""
+        n = min(n, len(self))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64)
+        values = np.nan_to_num(np.asarray(self.summary(key)), nan=-np.inf if largest else np.inf)
+        values = -values if largest else values
+        candidates = np.argpartition(values, n - 1)[:n]
+        return candidates[np.argsort(values[candidates], kind='stable')]
+
+    @property
+    def nbytes(self):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(self.path) for name in names)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_result_store(path):
+    """Process-wide ResultStore for ``path``, reopened when the store is rewritten"""
+    index_path = os.path.join(path, INDEX_NAME)
+    stamp = os.stat(index_path).st_mtime_ns
+    with _stores_lock:
+        cached = _stores.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, ResultStore(path))
+            _stores[path] = cached
+        return cached[1]
+
+
+def list_result_stores(directory=DEFAULT_STORE_DIR):
+    """Names of complete stores in ``directory``"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory)
+                  if os.path.exists(os.path.join(directory, name, INDEX_NAME)))
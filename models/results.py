@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class ForecastResult:
+    """Struct-of-arrays forecast: one contiguous float64 array per line item.
+
+    ``result['revenue']`` returns the read-only series, ``result[i]`` and
+    iteration return month dicts like the old list-of-dicts output, and
+    slicing by position returns a view over the same arrays.
+    """
+    __slots__ = ('_columns',)
+
+    def __init__(self, columns):
+        self._columns = {}
+        for key, values in columns.items():
+            # Представление только для чтения: результат можно безопасно разделять
+            values = np.asarray(values, dtype=np.int64 if key == 'month' else np.float64).view()
+            values.setflags(write=False)
+            self._columns[key] = values
+
+    @classmethod
+    def from_records(cls, records, line_items=None):
+        """Build from an iterable of month dicts without keeping the dicts"""
+        records = iter(records)
+        try:
+            first = next(records)
+        except StopIteration:
+            return cls({'month': np.empty(0, dtype=np.int64)})
+        keys = list(line_items or first.keys())
+        buffers = {key: [first[key]] for key in keys}
+        for record in records:
+            for key in keys:
+                buffers[key].append(record[key])
+        return cls({key: np.array(values) for key, values in buffers.items()})
+
+    @classmethod
+    def from_batch(cls, out, row, months):
+        """Zero-copy view of one scenario row of a batch result"""
+        columns = {'month': np.asarray(list(months), dtype=np.int64)}
+        columns.update({key: values[row] for key, values in out.items()})
+        return cls(columns)
+
+    @property
+    def months(self):
+        return self._columns['month']
+
+    def keys(self):
+        return self._columns.keys()
+
+    def __contains__(self, key):
+        return key in self._columns
+
+    def __len__(self):
+        return len(self._columns['month'])
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._columns[key]
+        if isinstance(key, slice):
+            return ForecastResult({name: values[key] for name, values in self._columns.items()})
+        return {name: values[key].item() for name, values in self._columns.items()}
+
+    def __iter__(self):
+        # Совместимость со старым форматом: по одному словарю на месяц
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_records(self):
+        """List of month dicts with plain Python numbers (for JSON export)"""
+        columns = {name: values.tolist() for name, values in self._columns.items()}
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+    def to_pandas(self):
+        """DataFrame backed by the same arrays"""
+        import pandas as pd
+        return pd.DataFrame(self._columns, copy=False)
+
+    def to_arrow(self):
+        """pyarrow Table backed by the same buffers"""
+        import pyarrow as pa
+        return pa.table(self._columns)
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self._columns.values())
@@ -0,0 +1,61 @@
+import numpy as np
+
+from models.financial_model import calculate_financials_batch
+from models.metrics import summarize
+from models.parameters import INTEGER_KEYS, PARAMETER_KEYS
+from utils.logging_config import log_error, log_info
+
+TORNADO_OUTPUTS = ('total_profit', 'roi', 'break_even_month')
+
+
+def tornado_analysis(params, pct=0.1, keys=None, months=range(1, 25)):
+    """One-at-a-time ±pct sensitivity of headline metrics to every parameter.
+
+    All 2×P perturbed scenarios plus the base go through a single batch call.
+    Returns the base metrics and one row per parameter, unsorted.
+    """
+    try:
+        keys = [key for key in (keys or PARAMETER_KEYS) if getattr(params, key) != 0]
+        base_row = params.to_row()
+        matrix = np.repeat(base_row[None, :], 2 * len(keys) + 1, axis=0)
+        for i, key in enumerate(keys):
+            col = PARAMETER_KEYS.index(key)
+            low, high = base_row[col] * (1 - pct), base_row[col] * (1 + pct)
+            if key in INTEGER_KEYS:
+                low, high = np.rint(low), np.rint(high)
+            matrix[1 + i, col] = low
+            matrix[1 + len(keys) + i, col] = high
+
+        metrics = summarize(calculate_financials_batch(matrix, months=months), matrix)
+        # Сценарий без выхода на прибыльность считаем за месяцем после горизонта
+        metrics['break_even_month'] = np.nan_to_num(
+            metrics['break_even_month'], nan=len(months) + 1)
+        log_info(f"Tornado analysis evaluated {matrix.shape[0]} scenarios")
+
+        rows = []
+        for i, key in enumerate(keys):
+            col = PARAMETER_KEYS.index(key)
+            row = {
+                'parameter': key,
+                'low_value': float(matrix[1 + i, col]),
+                'high_value': float(matrix[1 + len(keys) + i, col]),
+            }
+            for output in TORNADO_OUTPUTS:
+                row[f'{output}_low'] = float(metrics[output][1 + i])
+                row[f'{output}_high'] = float(metrics[output][1 + len(keys) + i])
+            rows.append(row)
+        base = {output: float(metrics[output][0]) for output in TORNADO_OUTPUTS}
+        return base, rows
+
+    except Exception as e:
+        log_error(e, context="Error in tornado_analysis")
+        raise
+
+
+def rank_by_effect(base, rows, output):
+    """Sort tornado rows by the largest swing of ``output`` from its base value"""
+    return sorted(
+        rows,
+        key=lambda row: max(abs(row[f'{output}_low'] - base[output]),
+                            abs(row[f'{output}_high'] - base[output])),
+        reverse=True)
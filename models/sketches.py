@@ -0,0 +1,138 @@
+import numpy as np
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch for a vector of cells (e.g. months of one metric).
+
+    Values are counted in logarithmic buckets (the DDSketch scheme): every
+    quantile is returned with relative error at most ``relative_accuracy``.
+    Memory is fixed by the value range, not by how many paths are added,
+    and merging two sketches is an addition of counts, so the result does
+    not depend on how paths were split between workers. Values with
+    magnitude below ``min_value`` are counted as zero.
+    """
+
+    def __init__(self, n_cells, relative_accuracy=0.01, min_value=1e-2, max_value=1e15):
+        self.n_cells = n_cells
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+        self._offset = int(np.floor(np.log(min_value) / self._log_gamma))
+        self.n_buckets = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 1
+        self.positive = np.zeros((n_cells, self.n_buckets), dtype=np.int64)
+        self.negative = np.zeros((n_cells, self.n_buckets), dtype=np.int64)
+        self.zero = np.zeros(n_cells, dtype=np.int64)
+
+    @property
+    def count(self):
+        return self.positive.sum(axis=1) + self.negative.sum(axis=1) + self.zero
+
+    def _bucket_counts(self, magnitudes, cells):
+        index = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64) - self._offset
+        flat = cells * self.n_buckets + np.clip(index, 0, self.n_buckets - 1)
+        return np.bincount(flat, minlength=self.n_cells * self.n_buckets).reshape(self.n_cells, -1)
+
+    def add(self, values):
+        """Add a paths×cells array of observations"""
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.n_cells)
+        cells = np.broadcast_to(np.arange(self.n_cells), values.shape)
+        small = np.abs(values) < self.min_value
+        self.zero += small.sum(axis=0)
+        positive = (values > 0) & ~small
+        negative = (values < 0) & ~small
+        self.positive += self._bucket_counts(values[positive], cells[positive])
+        self.negative += self._bucket_counts(-values[negative], cells[negative])
+        return self
+
+    def merge(self, other):
+        if (other.n_cells, other.relative_accuracy, other.min_value, other.max_value) != (
+                self.n_cells, self.relative_accuracy, self.min_value, self.max_value):
+            raise ValueError("Cannot merge sketches with different layouts")
+        self.positive += other.positive
+        self.negative += other.negative
+        self.zero += other.zero
+        return self
+
+    def quantile(self, q):
+        """Estimate of the q-quantile (0..1) for every cell"""
+        # Все корзины по возрастанию значения: отрицательные, ноль, положительные
+        counts = np.concatenate(
+            [self.negative[:, ::-1], self.zero[:, None], self.positive], axis=1)
+        magnitudes = 2 * self._gamma ** (np.arange(self.n_buckets) + self._offset) / (self._gamma + 1)
+        values = np.concatenate([-magnitudes[::-1], [0.0], magnitudes])
+        cumulative = np.cumsum(counts, axis=1)
+        rank = q * (cumulative[:, -1] - 1)
+        index = np.argmax(cumulative > rank[:, None], axis=1)
+        return np.where(cumulative[:, -1] > 0, values[index], np.nan)
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max per cell, mergeable across workers"""
+
+    def __init__(self, n_cells):
+        self.count = 0
+        self.mean = np.zeros(n_cells)
+        self.m2 = np.zeros(n_cells)
+        self.min = np.full(n_cells, np.inf)
+        self.max = np.full(n_cells, -np.inf)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        other = RunningMoments(values.shape[1])
+        other.count = len(values)
+        other.mean = values.mean(axis=0)
+        other.m2 = ((values - other.mean) ** 2).sum(axis=0)
+        other.min = values.min(axis=0)
+        other.max = values.max(axis=0)
+        return self.merge(other)
+
+    def merge(self, other):
+        # Параллельная формула Чана для среднего и суммы квадратов отклонений
+        count = self.count + other.count
+        if other.count:
+            delta = other.mean - self.mean
+            self.mean = self.mean + delta * other.count / count
+            self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / count
+            self.min = np.minimum(self.min, other.min)
+            self.max = np.maximum(self.max, other.max)
+            self.count = count
+        return self
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / self.count) if self.count else np.full_like(self.mean, np.nan)
+
+
+class BandAccumulator:
+    """Per-metric, per-month sketches and moments for Monte Carlo paths"""
+
+    def __init__(self, metrics, n_months, relative_accuracy=0.01):
+        self.metrics = tuple(metrics)
+        self.sketches = {metric: QuantileSketch(n_months, relative_accuracy) for metric in self.metrics}
+        self.moments = {metric: RunningMoments(n_months) for metric in self.metrics}
+
+    def add(self, paths):
+        """Add a dict of paths×months arrays"""
+        for metric in self.metrics:
+            self.sketches[metric].add(paths[metric])
+            self.moments[metric].add(paths[metric])
+        return self
+
+    def merge(self, other):
+        for metric in self.metrics:
+            self.sketches[metric].merge(other.sketches[metric])
+            self.moments[metric].merge(other.moments[metric])
+        return self
+
+    def bands(self, percentiles):
+        return {
+            metric: {p: self.sketches[metric].quantile(p / 100) for p in percentiles}
+            for metric in self.metrics
+        }
+
+    @property
+    def nbytes(self):
+        return sum(sketch.positive.nbytes + sketch.negative.nbytes + sketch.zero.nbytes
+                   for sketch in self.sketches.values())
@@ -0,0 +1,201 @@
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from models.financial_model import calculate_financials_batch
+from models.metrics import break_even_month, cumulative_cash, parameter_column, roi
+from models.parameters import INTEGER_KEYS, PARAMETER_KEYS, ModelParameters, stack_parameters
+from utils.logging_config import log_error, log_info
+
+
+@dataclass(frozen=True)
+class SolverReport:
+    """Solutions and convergence details for a batch of solver problems"""
+    parameter: str
+    values: np.ndarray
+    objective: np.ndarray
+    converged: np.ndarray
+    bracket_width: np.ndarray
+    iterations: int
+    evaluations: int
+    elapsed: float
+
+
+# Целевые функции и ограничения: (результат пакетного расчёта, матрица) -> массив
+def monthly_profit(month):
+    return lambda out, matrix: out['profit'][:, month - 1]
+
+
+def broken_even_by(month):
+    """1.0 where the scenario has broken even by ``month``, 0.0 otherwise"""
+    return lambda out, matrix: (break_even_month(out['profit']) <= month).astype(np.float64)
+
+
+def total_roi(out, matrix):
+    return roi(out, matrix)
+
+
+def cash_floor(floor):
+    """Constraint: cumulative cash never drops below ``floor``"""
+    def constraint(out, matrix):
+        cash = cumulative_cash(
+            out['profit'],
+            parameter_column(matrix, 'initial_investment'),
+            parameter_column(matrix, 'preparatory_expenses'))
+        return cash.min(axis=1) >= floor
+    return constraint
+
+
+def _base_matrix(params, n):
+    params_list = [params] if isinstance(params, ModelParameters) else list(params)
+    matrix = stack_parameters(params_list)
+    if matrix.shape[0] == 1:
+        matrix = np.repeat(matrix, n, axis=0)
+    if matrix.shape[0] != n:
+        raise ValueError(f"Got {matrix.shape[0]} parameter sets for {n} problems")
+    return matrix
+
+
+def _evaluate(matrix, col, values, months):
+    matrix = matrix.copy()
+    matrix[:, col] = values
+    return calculate_financials_batch(matrix, months=months), matrix
+
+
+def goal_seek(params, key, objective, target=0.0, low=0.0, high=1.0,
+              tol=1e-6, max_iter=100, months=range(1, 25)):
+    """Smallest value of ``key`` in [low, high] with ``objective >= target``.
+
+    ``params`` is one ModelParameters or a list; ``target`` may be an array,
+    and every (params, target) pair is solved at once by bisection with one
+    batch model call per iteration. The objective must be non-decreasing in
+    ``key``. Problems whose ``high`` end misses the target get NaN.
+    """
+    try:
+        started = time.perf_counter()
+        months = list(months)
+        target = np.atleast_1d(np.asarray(target, dtype=np.float64))
+        n = max(len(target), 1 if isinstance(params, ModelParameters) else len(params))
+        target = np.broadcast_to(target, (n,))
+        matrix = _base_matrix(params, n)
+        col = PARAMETER_KEYS.index(key)
+        is_integer = key in INTEGER_KEYS
+        if is_integer:
+            tol = max(tol, 1.0)
+
+        lo = np.full(n, float(low))
+        hi = np.full(n, float(high))
+        f_lo = objective(*_evaluate(matrix, col, lo, months))
+        f_hi = objective(*_evaluate(matrix, col, hi, months))
+        evaluations = 2 * n
+        feasible = f_hi >= target
+        solved_at_low = f_lo >= target
+        # Если цель достигается уже на нижней границе, решение — сама граница
+        hi = np.where(solved_at_low, lo, hi)
+        f_best = np.where(solved_at_low, f_lo, f_hi)
+
+        iterations = 0
+        active = feasible & ~solved_at_low & (hi - lo > tol)
+        while active.any() and iterations < max_iter:
+            mid = (lo + hi) / 2
+            if is_integer:
+                mid = np.floor(mid)
+            f_mid = objective(*_evaluate(matrix[active], col, mid[active], months))
+            evaluations += int(active.sum())
+            ok = f_mid >= target[active]
+            idx = np.flatnonzero(active)
+            hi[idx[ok]] = mid[idx[ok]]
+            f_best[idx[ok]] = f_mid[ok]
+            lo[idx[~ok]] = mid[idx[~ok]]
+            iterations += 1
+            active = feasible & ~solved_at_low & (hi - lo > tol)
+
+        width = np.where(feasible, hi - lo, np.nan)
+        report = SolverReport(
+            parameter=key,
+            values=np.where(feasible, hi, np.nan),
+            objective=np.where(feasible, f_best, np.nan),
+            converged=feasible & (width <= tol),
+            bracket_width=width,
+            iterations=iterations,
+            evaluations=evaluations,
+            elapsed=time.perf_counter() - started,
+        )
+        log_info(f"Goal seek on {key}: {n} problems, {iterations} iterations, {report.elapsed:.3f}s")
+        return report
+
+    except Exception as e:
+        log_error(e, context="Error in goal_seek")
+        raise
+
+
+def maximize(params, key, objective, low=0.0, high=1.0, constraint=None, grid=33,
+             tol=1e-6, max_iter=50, months=range(1, 25)):
+    """Value of ``key`` in [low, high] that maximizes ``objective`` under ``constraint``.
+
+    Bracketing search: every iteration evaluates a ``grid``-point grid for all
+    problems in one batch call and shrinks each bracket around its best
+    feasible point. Does not assume unimodality beyond the grid resolution.
+    """
+    try:
+        started = time.perf_counter()
+        months = list(months)
+        n = 1 if isinstance(params, ModelParameters) else len(params)
+        matrix = _base_matrix(params, n)
+        col = PARAMETER_KEYS.index(key)
+        is_integer = key in INTEGER_KEYS
+        if is_integer:
+            tol = max(tol, 1.0)
+
+        lo = np.full(n, float(low))
+        hi = np.full(n, float(high))
+        best_x = np.full(n, np.nan)
+        best_f = np.full(n, -np.inf)
+        steps = np.linspace(0.0, 1.0, grid)
+        iterations = evaluations = 0
+        active = np.ones(n, dtype=bool)
+        while active.any() and iterations < max_iter:
+            idx = np.flatnonzero(active)
+            xs = lo[idx, None] + (hi - lo)[idx, None] * steps[None, :]
+            if is_integer:
+                xs = np.rint(xs)
+            rows = np.repeat(matrix[idx], grid, axis=0)
+            out, evaluated = _evaluate(rows, col, xs.ravel(), months)
+            f = objective(out, evaluated)
+            if constraint is not None:
+                f = np.where(constraint(out, evaluated), f, -np.inf)
+            evaluations += rows.shape[0]
+            f = f.reshape(len(idx), grid)
+
+            pick = np.argmax(f, axis=1)
+            picked = f[np.arange(len(idx)), pick]
+            better = picked > best_f[idx]
+            best_f[idx[better]] = picked[better]
+            best_x[idx[better]] = xs[np.arange(len(idx)), pick][better]
+
+            step = (hi - lo)[idx] / (grid - 1)
+            # Для целых месяцев сетка из grid точек уже перебрала все значения
+            exhausted = (hi - lo)[idx] <= grid - 1 if is_integer else np.zeros(len(idx), dtype=bool)
+            lo[idx] = np.maximum(lo[idx], best_x[idx] - step)
+            hi[idx] = np.minimum(hi[idx], best_x[idx] + step)
+            iterations += 1
+            active[idx] = np.isfinite(best_f[idx]) & (hi[idx] - lo[idx] > tol) & ~exhausted
+
+        feasible = np.isfinite(best_f)
+        report = SolverReport(
+            parameter=key,
+            values=np.where(feasible, best_x, np.nan),
+            objective=np.where(feasible, best_f, np.nan),
+            converged=feasible & ~active,
+            bracket_width=np.where(feasible, hi - lo, np.nan),
+            iterations=iterations,
+            evaluations=evaluations,
+            elapsed=time.perf_counter() - started,
+        )
+        log_info(f"Maximize over {key}: {n} problems, {iterations} iterations, {report.elapsed:.3f}s")
+        return report
+
+    except Exception as e:
+        log_error(e, context="Error in maximize")
+        raise
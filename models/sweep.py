@@ -0,0 +1,152 @@
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from models.financial_model import LINE_ITEMS, calculate_financials_batch
+from models.metrics import summarize
+from models.parameters import INTEGER_KEYS, PARAMETER_KEYS
+from utils.logging_config import log_error, log_info
+
+MANIFEST_NAME = '_sweep.json'
+MIN_CHUNK_ROWS = 1000
+MAX_CHUNK_ROWS = 1000000
+
+
+def available_memory():
+    """Free physical memory in bytes, or 1 GB when the platform does not say"""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return 1 << 30
+
+
+def chunk_rows_for_budget(n_months, n_line_items, memory_budget):
+    """Scenarios per chunk that keep the batch engine and output table within budget"""
+    # Все статьи модели, временные массивы шага и столбцы для Parquet
+    bytes_per_row = 8 * (n_months * (len(LINE_ITEMS) + 16 + 2 * n_line_items) + len(PARAMETER_KEYS))
+    return int(np.clip(memory_budget // bytes_per_row, MIN_CHUNK_ROWS, MAX_CHUNK_ROWS))
+
+
+def grid_rows(base_row, axes, start, stop):
+    """Parameter rows for flat grid indices [start, stop) in C order"""
+    keys = list(axes)
+    shape = tuple(len(axes[key]) for key in keys)
+    indices = np.unravel_index(np.arange(start, stop), shape)
+    matrix = np.repeat(np.asarray(base_row, dtype=np.float64)[None, :], stop - start, axis=0)
+    for key, index in zip(keys, indices):
+        values = np.asarray(axes[key], dtype=np.float64)[index]
+        matrix[:, PARAMETER_KEYS.index(key)] = np.rint(values) if key in INTEGER_KEYS else values
+    return matrix
+
+
+def chunk_table(matrix, axes, start, months, line_items):
+    out = calculate_financials_batch(matrix, months=months)
+    columns = {'scenario': np.arange(start, start + matrix.shape[0], dtype=np.int64)}
+    for key in axes:
+        columns[key] = matrix[:, PARAMETER_KEYS.index(key)]
+    columns.update(summarize(out, matrix))
+    for item in line_items:
+        for t, month in enumerate(months):
+            columns[f'{item}_m{month:02d}'] = out[item][:, t]
+    return pa.table(columns)
+
+
+def open_manifest(output_dir, spec):
+    """Create ``output_dir`` with its manifest, or check it holds the same sweep; returns the chunk size"""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            existing = json.load(f)
+        # Размер чанка берём из манифеста: он зависит от свободной памяти
+        if {**existing, 'chunk_size': spec['chunk_size']} != spec:
+            raise ValueError(f"{output_dir} holds a different sweep; use another directory")
+        return existing['chunk_size']
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(spec, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return spec['chunk_size']
+
+
+def part_path(output_dir, chunk):
+    return os.path.join(output_dir, f'part-{chunk:06d}.parquet')
+
+
+def read_sweep(output_dir):
+    """All finished parts of a sweep as one table in scenario order"""
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'r') as f:
+        spec = json.load(f)
+    n_chunks = -(-spec['n_scenarios'] // spec['chunk_size'])
+    paths = [part_path(output_dir, chunk) for chunk in range(n_chunks)]
+    return pa.concat_tables([pq.read_table(path) for path in paths if os.path.exists(path)])
+
+
+def write_part(output_dir, chunk, table):
+    """Write one chunk via an atomic rename, so a part file is either complete or absent"""
+    tmp_path = os.path.join(output_dir, f'.part-{chunk:06d}.tmp')
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, part_path(output_dir, chunk))
+
+
+def run_grid_sweep(params, axes, output_dir, line_items=('profit',), months=range(1, 25),
+                   chunk_size=None, memory_fraction=0.25, progress=None):
+    """Evaluate the Cartesian grid ``axes`` around ``params`` into a Parquet dataset.
+
+    Each chunk is written to its own ``part-NNNNNN.parquet`` file via an atomic
+    rename, and the grid spec is stored in ``_sweep.json``. Rerunning with the
+    same spec skips finished chunks, so an interrupted sweep resumes where it
+    stopped. Memory use is bounded by the chunk size, not the grid size.
+    """
+    try:
+        axes = {key: [float(v) for v in values] for key, values in axes.items()}
+        for key in axes:
+            if key not in PARAMETER_KEYS:
+                raise KeyError(f"Unknown parameter: {key}")
+        months = list(months)
+        n_scenarios = int(np.prod([len(values) for values in axes.values()]))
+        if chunk_size is None:
+            chunk_size = chunk_rows_for_budget(
+                len(months), len(line_items), available_memory() * memory_fraction)
+
+        spec = {
+            'axes': axes,
+            'base': params.to_dict(),
+            'line_items': list(line_items),
+            'months': months,
+            'chunk_size': int(chunk_size),
+            'n_scenarios': n_scenarios,
+        }
+        chunk_size = open_manifest(output_dir, spec)
+
+        n_chunks = -(-n_scenarios // chunk_size)
+        base_row = params.to_row()
+        written = skipped = 0
+        log_info(f"Grid sweep: {n_scenarios} scenarios in {n_chunks} chunks of {chunk_size}")
+
+        for chunk in range(n_chunks):
+            if os.path.exists(part_path(output_dir, chunk)):
+                skipped += 1
+            else:
+                start = chunk * chunk_size
+                stop = min(start + chunk_size, n_scenarios)
+                write_part(output_dir, chunk,
+                           chunk_table(grid_rows(base_row, axes, start, stop), axes, start, months, line_items))
+                written += 1
+            if progress is not None:
+                progress(chunk + 1, n_chunks)
+
+        log_info(f"Grid sweep finished: {written} chunks written, {skipped} resumed")
+        return {
+            'output_dir': output_dir,
+            'n_scenarios': n_scenarios,
+            'n_chunks': n_chunks,
+            'chunks_written': written,
+            'chunks_skipped': skipped,
+        }
+
+    except Exception as e:
+        log_error(e, context="Error in run_grid_sweep")
+        raise
@@ -1,139 +1,340 @@
+import json
+import time
+import numpy as np
 import streamlit as st
 import plotly.graph_objects as go
-from models.financial_model import FinancialModel
+from plotly.subplots import make_subplots
+from models.cache import forecast_cache, parameters_hash, warm_presets
+from models.financial_model import LINE_ITEMS, calculate_financials_batch
+from models.metrics import cumulative_cash, parameter_column, summarize
+from models.points_ledger import LEDGER_ITEMS
+from models.parameters import INTEGER_KEYS, PARAMETER_DEFAULTS, PARAMETER_KEYS, ModelParameters, stack_parameters
+from models.result_store import DEFAULT_STORE_DIR, list_result_stores, open_result_store
+from utils.config import get_model_parameters
 from utils.presets import PRESETS
 from utils.logging_config import log_error, log_warning, log_info
 
+SCENARIO_NAMES = {
+    "pessimistic": "Пессимистичный",
+    "standard": "Стандартный",
+    "optimistic": "Оптимистичный"
+}
+
+METRIC_TITLES = {
+    'revenue': ('Выручка', 'Выручка (₽)'),
+    'profit': ('Чистая прибыль', 'Прибыль (₽)'),
+    'cumulative_cash': ('Денежный остаток', 'Остаток (₽)'),
+    'active_users': ('Активные пользователи', 'Пользователи'),
+}
+# Только при учёте баллов по выпускам (переключатель на главной странице)
+LEDGER_METRIC_TITLES = {
+    'points_outstanding': ('Обязательства по баллам', 'Баллы (₽)'),
+}
+
+INVESTMENT_KEYS = ('initial_investment', 'preparatory_expenses')
+
+# Сколько сценариев ещё читаемо на одном графике и в сетке малых графиков
+LINE_CHART_LIMIT = 10
+SMALL_MULTIPLES_LIMIT = 60
+MAX_VARIANTS = 500
+MAX_STORED_ROWS = 500  # сколько строк большого набора читаем с диска для таблицы и графика
+
+SORT_KEYS = {
+    'total_profit': "Прибыль за период",
+    'roi': "ROI",
+    'total_revenue': "Выручка за период",
+    'final_active_users': "Активные пользователи в конце периода",
+}
+
 
 def format_currency(value):
     return f"₽{value:,.2f}"
 
 
-def backup_state():
-    """Create a backup of current session state values"""
-    log_info("Creating session state backup")
-    backup = {}
-    for key in st.session_state:
-        if isinstance(st.session_state[key], (int, float, str, bool)):
-            backup[key] = st.session_state[key]
-    return backup
-
-
-def restore_state(backup):
-    """Restore session state from backup"""
-    log_info("Restoring session state from backup")
-    for key, value in backup.items():
-        if key in st.session_state:
-            st.session_state[key] = value
+def load_custom_presets():
+    try:
+        with open('custom_presets.json', 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def page_investment():
+    """Investment amounts from the page inputs, applied to every compared scenario"""
+    return {
+        key: float(st.session_state.get(key, PARAMETER_DEFAULTS[key]))
+        for key in INVESTMENT_KEYS
+    }
+
+
+def scenario_snapshots(selected, custom_presets):
+    """Immutable parameter snapshots by display name; session state is only read"""
+    snapshots = {}
+    for name in selected:
+        if name == "current":
+            snapshots["Текущие параметры"] = get_model_parameters()
+        elif name in PRESETS:
+            snapshots[SCENARIO_NAMES[name]] = ModelParameters.from_mapping(PRESETS[name])
+        elif name in custom_presets:
+            snapshots[f"Пользовательский: {name}"] = ModelParameters.from_mapping(custom_presets[name])
+        else:
+            log_warning(f"Preset not found: {name}")
+    return snapshots
+
+
+def variant_snapshots(base_label, base, key, pct, count):
+    """Evenly spaced values of one parameter within ±pct of the base scenario"""
+    current = getattr(base, key)
+    values = np.linspace(current * (1 - pct), current * (1 + pct), count)
+    snapshots = {}
+    for value in values:
+        value = int(round(value)) if key in INTEGER_KEYS else float(value)
+        snapshots[f"{base_label}: {key} = {value:,.4g}"] = base.replace(**{key: value})
+    return snapshots
+
+
+def compute_scenarios(snapshots, horizon, points_ledger=False, priced=None):
+    """Uncached scenarios in one batch call: (line items, cumulative cash, summary).
+
+    Scenarios already in the forecast cache (built-in presets are loaded
+    from prebuilt artifacts at startup) are not recomputed. Investment does
+    not change the monthly figures, so they are looked up and computed with
+    ``snapshots`` as is, while cumulative cash and ROI use the investment of
+    ``priced`` (same labels). With ``points_ledger`` the LEDGER_ITEMS series
+    are added.
+    """
+    matrix = stack_parameters(list(snapshots.values()))
+    prefix = 'ledger:' if points_ledger else ''
+    cached = [forecast_cache.get(prefix + parameters_hash(params, horizon)) for params in snapshots.values()]
+    missing = [i for i, result in enumerate(cached) if result is None]
+    computed = calculate_financials_batch(matrix[missing], months=range(1, horizon + 1),
+                                          points_ledger=points_ledger) if missing else {}
+    out = {}
+    for key in LINE_ITEMS + LEDGER_ITEMS if points_ledger else LINE_ITEMS:
+        values = np.empty((len(matrix), horizon))
+        for i, result in enumerate(cached):
+            if result is not None:
+                values[i] = result[key]
+        if missing:
+            values[missing] = computed[key]
+        out[key] = values
+    if priced is not None:
+        matrix = stack_parameters([priced[label] for label in snapshots])
+    cash = cumulative_cash(out['profit'],
+                           parameter_column(matrix, 'initial_investment'),
+                           parameter_column(matrix, 'preparatory_expenses'))
+    return {**out, 'cumulative_cash': cash}, summarize(out, matrix)
+
+
+def line_chart(months, labels, values, metric):
+    titles = {**METRIC_TITLES, **LEDGER_METRIC_TITLES}
+    fig = go.Figure()
+    for label, series in zip(labels, values):
+        fig.add_trace(
+            go.Scatter(
+                x=months,
+                y=series,
+                name=label,
+                mode='lines+markers',
+                line=dict(width=2),
+                marker=dict(size=6),
+                hovertemplate=f"{titles[metric][0]}: %{{y:,.0f}}<extra></extra>"))
+    fig.update_layout(showlegend=True,
+                      plot_bgcolor='white',
+                      paper_bgcolor='white',
+                      height=600,
+                      xaxis=dict(title='Месяц',
+                                 showgrid=True,
+                                 gridwidth=1,
+                                 gridcolor='#f0f0f0',
+                                 tickformat=',d',
+                                 zeroline=False),
+                      yaxis=dict(title=titles[metric][1],
+                                 showgrid=True,
+                                 gridwidth=1,
+                                 gridcolor='#f0f0f0',
+                                 tickformat=',.0f',
+                                 zeroline=False),
+                      hovermode='x unified',
+                      hoverlabel=dict(bgcolor="white",
+                                      font_size=12,
+                                      font_family="Arial"),
+                      margin=dict(l=50, r=50, t=30, b=50),
+                      legend=dict(orientation="h",
+                                  yanchor="bottom",
+                                  y=1.02,
+                                  xanchor="right",
+                                  x=1))
+    return fig
+
+
+def small_multiples(months, labels, values, metric, n_cols=4):
+    """One small panel per scenario on a shared y axis"""
+    n_rows = -(-len(labels) // n_cols)
+    fig = make_subplots(rows=n_rows, cols=n_cols, shared_xaxes=True, shared_yaxes=True,
+                        subplot_titles=labels, vertical_spacing=min(0.08, 0.5 / n_rows),
+                        horizontal_spacing=0.03)
+    for i, series in enumerate(values):
+        fig.add_trace(
+            go.Scatter(x=months, y=series, mode='lines', line=dict(color='#8884d8', width=1.5),
+                       showlegend=False,
+                       hovertemplate=f"{labels[i]}<br>%{{x}}: %{{y:,.0f}}<extra></extra>"),
+            row=i // n_cols + 1, col=i % n_cols + 1)
+    fig.update_annotations(font_size=10)
+    fig.update_layout(plot_bgcolor='white',
+                      paper_bgcolor='white',
+                      height=180 * n_rows + 60,
+                      margin=dict(l=50, r=30, t=40, b=30))
+    fig.update_xaxes(showgrid=True, gridcolor='#f0f0f0', tickformat=',d')
+    fig.update_yaxes(showgrid=True, gridcolor='#f0f0f0', tickformat='.2s')
+    return fig
+
+
+def heatmap(months, labels, values, metric):
+    """Scenarios × months colour map, readable for hundreds of scenarios"""
+    limit = np.nanmax(np.abs(values)) or 1.0
+    signed = metric in ('profit', 'cumulative_cash')
+    titles = {**METRIC_TITLES, **LEDGER_METRIC_TITLES}
+    fig = go.Figure(go.Heatmap(
+        z=values,
+        x=months,
+        y=labels,
+        colorscale='RdYlGn' if signed else 'Viridis',
+        zmid=0 if signed else None,
+        zmin=-limit if signed else None,
+        zmax=limit if signed else None,
+        colorbar=dict(title=titles[metric][1], tickformat='.2s'),
+        hovertemplate="%{y}<br>Месяц %{x}: %{z:,.0f}<extra></extra>"))
+    fig.update_layout(plot_bgcolor='white',
+                      paper_bgcolor='white',
+                      height=min(max(400, 14 * len(labels) + 100), 4000),
+                      xaxis=dict(title='Месяц', tickformat=',d'),
+                      yaxis=dict(autorange='reversed', showticklabels=len(labels) <= 80),
+                      margin=dict(l=50, r=50, t=30, b=50))
+    return fig
+
+
+def stored_results_section(metric):
+    """Browse a large precomputed result set; only the displayed rows are read from disk"""
+    names = list_result_stores(DEFAULT_STORE_DIR)
+    if not names:
+        st.caption(f"Нет сохранённых наборов в каталоге «{DEFAULT_STORE_DIR}». "
+                   f"Создать: python run_batch.py --input сценарии.csv --store {DEFAULT_STORE_DIR}/имя")
+        return
+
+    col_store, col_sort, col_count = st.columns(3)
+    with col_store:
+        name = st.selectbox("Набор результатов", names)
+    with col_sort:
+        sort_key = st.selectbox("Сортировать по", options=list(SORT_KEYS.keys()),
+                                format_func=lambda x: SORT_KEYS[x])
+    with col_count:
+        count = st.slider("Лучших сценариев", 5, MAX_STORED_ROWS, 50, 5)
+
+    store = open_result_store(f"{DEFAULT_STORE_DIR}/{name}")
+    st.caption(f"{len(store):,} сценариев × {len(store.months)} мес. · "
+               f"{store.nbytes / 2 ** 20:,.0f} МБ на диске")
+    indices = store.top(sort_key, count)
+    labels = [str(label) for label in store.scenarios[indices]]
+    roi, break_even = store.summary('roi')[indices], store.summary('break_even_month')[indices]
+    st.dataframe([{
+        "Сценарий": label,
+        "Выручка за период": format_currency(store.summary('total_revenue')[i]),
+        "Прибыль за период": format_currency(store.summary('total_profit')[i]),
+        "ROI": f"{roi[j]:.1f}%",
+        "Выход на прибыльность": "—" if np.isnan(break_even[j]) else f"{break_even[j]:.0f} мес.",
+    } for j, (i, label) in enumerate(zip(indices, labels))], use_container_width=True, hide_index=True)
+
+    # В наборах на диске нет рядов учёта баллов
+    metric = metric if metric in store.line_items else 'profit'
+    values = store.rows(metric, indices)
+    if len(labels) <= LINE_CHART_LIMIT:
+        fig = line_chart(store.months, labels, values, metric)
+    else:
+        fig = heatmap(store.months, labels, values, metric)
+    st.plotly_chart(fig, use_container_width=True)
 
 
 def scenario_analysis_page():
     st.title("Анализ сценариев")
 
     try:
-        # Initialize model
-        model = FinancialModel()
+        warm_presets()
+        custom_presets = load_custom_presets()
+        scenario_names = {
+            "current": "Текущие параметры",
+            **SCENARIO_NAMES,
+            **{name: f"Пользовательский: {name}" for name in custom_presets.keys()}
+        }
 
         # Display scenario selection
-        scenarios = ["pessimistic", "standard", "optimistic"]
         selected_scenarios = st.multiselect(
             "Выберите сценарии для сравнения",
-            scenarios,
-            default=scenarios,
-            format_func=lambda x: {
-                "pessimistic": "Пессимистичный",
-                "standard": "Стандартный",
-                "optimistic": "Оптимистичный"
-            }[x])
-
-        if not selected_scenarios:
+            list(scenario_names.keys()),
+            default=list(SCENARIO_NAMES.keys()),
+            format_func=lambda x: scenario_names[x])
+        snapshots = scenario_snapshots(selected_scenarios, custom_presets)
+        # ROI и денежный остаток всех сценариев считаем при одних и тех же инвестициях
+        investment = page_investment()
+        priced = {label: params.replace(**investment) for label, params in snapshots.items()}
+
+        with st.expander("Варианты параметра", expanded=False):
+            add_variants = st.checkbox("Добавить варианты одного параметра", value=False)
+            col_base, col_key = st.columns(2)
+            with col_base:
+                base_name = st.selectbox("Базовый сценарий",
+                                         options=list(scenario_names.keys()),
+                                         index=list(scenario_names.keys()).index("standard"),
+                                         format_func=lambda x: scenario_names[x])
+            with col_key:
+                variant_key = st.selectbox("Параметр", PARAMETER_KEYS,
+                                           index=PARAMETER_KEYS.index('growth_rate_y1'))
+            col_pct, col_count = st.columns(2)
+            with col_pct:
+                variant_pct = st.slider("Диапазон (±X%)", 5.0, 90.0, 30.0, 5.0, format="%.0f%%") / 100
+            with col_count:
+                variant_count = st.number_input("Количество вариантов", min_value=2,
+                                                max_value=MAX_VARIANTS, value=100, step=10)
+            if add_variants:
+                base = next(iter(scenario_snapshots([base_name], custom_presets).values()))
+                variants = variant_snapshots(scenario_names[base_name], base.replace(**investment),
+                                             variant_key, variant_pct, int(variant_count))
+                snapshots.update(variants)
+                priced.update(variants)
+
+        if not snapshots:
             st.warning(
                 "Пожалуйста, выберите хотя бы один сценарий для анализа")
             return
 
-        # Calculate metrics for each scenario
-        results = {}
-        metrics_data = []
-
-        for scenario_name in selected_scenarios:
-            try:
-                # Backup current state
-                state_backup = backup_state()
-
-                # Load scenario preset
-                if scenario_name in PRESETS:
-                    # Directly update session state with all preset values
-                    for key, value in PRESETS[scenario_name].items():
-                        st.session_state[key] = value
-                    log_info(
-                        f"Applied preset {scenario_name} with values: {PRESETS[scenario_name]}"
-                    )
-                else:
-                    log_warning(f"Preset not found: {scenario_name}")
-                    continue
-
-                # Calculate financials
-                data = model.calculate_financials()
-                results[scenario_name] = data
-
-                # Extract key metrics
-                final_month = data[-1]
-                final_revenue = final_month['revenue']
-                final_expenses = final_month['expenses']
-                final_profit = final_month['profit']
-                # Calculate total operational expenses
-                total_operational_expenses = sum(month['expenses']
-                                                 for month in data)
-                total_profit = sum(month['profit'] for month in data)
-
-                # Add initial and preparatory investments
-                initial_investment = st.session_state.get(
-                    'initial_investment', 10000000)
-                preparatory_expenses = st.session_state.get(
-                    'preparatory_expenses', 21000000)
-                total_investment = total_operational_expenses + initial_investment + preparatory_expenses
-                log_info(
-                    f"Scenario {scenario_name}: Total investment = {total_investment} (operational: {total_operational_expenses}, initial: {initial_investment}, preparatory: {preparatory_expenses})"
-                )
-
-                # Calculate ROI including all investments
-                roi = (total_profit / total_investment *
-                       100) if total_investment > 0 else 0
-
-                # Store metrics
-                metrics_data.append({
-                    "Сценарий": {
-                        "pessimistic": "Пессимистичный",
-                        "standard": "Стандартный",
-                        "optimistic": "Оптимистичный"
-                    }[scenario_name],
-                    "Выручка (последний месяц)":
-                    format_currency(final_revenue),
-                    "Расходы (последний месяц)":
-                    format_currency(final_expenses),
-                    "Прибыль (последний месяц)":
-                    format_currency(final_profit),
-                    "ROI":
-                    f"{roi:.1f}%"
-                })
-
-                # Restore original state
-                restore_state(state_backup)
-
-            except Exception as e:
-                log_error(e, context=f"Error in scenario: {scenario_name}")
-                st.error(
-                    f"Ошибка при расчете сценария {scenario_name}: {str(e)}")
-                continue
-
-        if not results:
-            log_warning("No scenario results calculated")
-            st.warning("Не удалось рассчитать ни один сценарий")
-            return
+        horizon = st.session_state.get('horizon_years', 2) * 12
+        points_ledger = st.session_state.get('points_ledger', False)
+        started = time.perf_counter()
+        out, summary = compute_scenarios(snapshots, horizon, points_ledger, priced)
+        elapsed = time.perf_counter() - started
+        labels = list(snapshots.keys())
+        months = np.arange(1, horizon + 1)
+        log_info(f"Scenario analysis: {len(labels)} scenarios in {elapsed:.3f}s")
 
         # Display metrics table
         st.subheader("Сравнение метрик")
-        st.table(metrics_data)
+        st.caption(f"{len(labels)} сценариев за {elapsed * 1000:.0f} мс")
+        metrics_data = [{
+            "Сценарий": label,
+            "Выручка (последний месяц)": format_currency(out['revenue'][i, -1]),
+            "Расходы (последний месяц)": format_currency(out['expenses'][i, -1]),
+            "Прибыль (последний месяц)": format_currency(out['profit'][i, -1]),
+            "ROI": f"{summary['roi'][i]:.1f}%",
+            "Выход на прибыльность": (
+                "—" if np.isnan(summary['break_even_month'][i])
+                else f"{summary['break_even_month'][i]:.0f} мес."),
+            **({"Обязательства по баллам (конец периода)": format_currency(out['points_outstanding'][i, -1])}
+               if points_ledger else {}),
+        } for i, label in enumerate(labels)]
+        if len(metrics_data) <= LINE_CHART_LIMIT:
+            st.table(metrics_data)
+        else:
+            st.dataframe(metrics_data, use_container_width=True, hide_index=True)
 
         # Add investment parameters
         st.subheader("Параметры инвестиций")
@@ -176,96 +377,42 @@ def scenario_analysis_page():
 
         # Plot comparisons
         st.subheader("Графики сравнения")
-
-        # Revenue comparison
-        fig_revenue = go.Figure()
-        for scenario_name in results:
-            scenario_data = results[scenario_name]
-            fig_revenue.add_trace(
-                go.Scatter(
-                    x=[d['month'] for d in scenario_data],
-                    y=[d['revenue'] for d in scenario_data],
-                    name={
-                        "pessimistic": "Пессимистичный",
-                        "standard": "Стандартный",
-                        "optimistic": "Оптимистичный"
-                    }[scenario_name],
-                    mode='lines+markers',
-                    line=dict(width=2),
-                    marker=dict(size=6),
-                    hovertemplate=f"Выручка: %{{y:,.0f}} ₽<extra></extra>"))
-        fig_revenue.update_layout(showlegend=True,
-                                  plot_bgcolor='white',
-                                  paper_bgcolor='white',
-                                  height=600,
-                                  xaxis=dict(title='Месяц',
-                                             showgrid=True,
-                                             gridwidth=1,
-                                             gridcolor='#f0f0f0',
-                                             tickformat=',d',
-                                             zeroline=False),
-                                  yaxis=dict(title='Выручка (₽)',
-                                             showgrid=True,
-                                             gridwidth=1,
-                                             gridcolor='#f0f0f0',
-                                             tickformat=',.0f',
-                                             zeroline=False),
-                                  hovermode='x unified',
-                                  hoverlabel=dict(bgcolor="white",
-                                                  font_size=12,
-                                                  font_family="Arial"),
-                                  margin=dict(l=50, r=50, t=30, b=50),
-                                  legend=dict(orientation="h",
-                                              yanchor="bottom",
-                                              y=1.02,
-                                              xanchor="right",
-                                              x=1))
-        st.plotly_chart(fig_revenue, use_container_width=True)
-
-        # Profit comparison
-        fig_profit = go.Figure()
-        for scenario_name in results:
-            scenario_data = results[scenario_name]
-            fig_profit.add_trace(
-                go.Scatter(
-                    x=[d['month'] for d in scenario_data],
-                    y=[d['profit'] for d in scenario_data],
-                    name={
-                        "pessimistic": "Пессимистичный",
-                        "standard": "Стандартный",
-                        "optimistic": "Оптимистичный"
-                    }[scenario_name],
-                    mode='lines+markers',
-                    line=dict(width=2),
-                    marker=dict(size=6),
-                    hovertemplate=f"Прибыль: %{{y:,.0f}} ₽<extra></extra>"))
-        fig_profit.update_layout(showlegend=True,
-                                 plot_bgcolor='white',
-                                 paper_bgcolor='white',
-                                 height=600,
-                                 xaxis=dict(title='Месяц',
-                                            showgrid=True,
-                                            gridwidth=1,
-                                            gridcolor='#f0f0f0',
-                                            tickformat=',d',
-                                            zeroline=False),
-                                 yaxis=dict(title='Прибыль (₽)',
-                                            showgrid=True,
-                                            gridwidth=1,
-                                            gridcolor='#f0f0f0',
-                                            tickformat=',.0f',
-                                            zeroline=False),
-                                 hovermode='x unified',
-                                 hoverlabel=dict(bgcolor="white",
-                                                 font_size=12,
-                                                 font_family="Arial"),
-                                 margin=dict(l=50, r=50, t=30, b=50),
-                                 legend=dict(orientation="h",
-                                             yanchor="bottom",
-                                             y=1.02,
-                                             xanchor="right",
-                                             x=1))
-        st.plotly_chart(fig_profit, use_container_width=True)
+        col_metric, col_view = st.columns(2)
+        with col_metric:
+            titles = {**METRIC_TITLES, **(LEDGER_METRIC_TITLES if points_ledger else {})}
+            metric = st.selectbox("Показатель",
+                                  options=list(titles.keys()),
+                                  format_func=lambda x: titles[x][0])
+        views = {
+            'lines': "Линии",
+            'small_multiples': "Малые графики",
+            'heatmap': "Тепловая карта",
+        }
+        if len(labels) <= LINE_CHART_LIMIT:
+            default_view = 'lines'
+        elif len(labels) <= SMALL_MULTIPLES_LIMIT:
+            default_view = 'small_multiples'
+        else:
+            default_view = 'heatmap'
+        with col_view:
+            view = st.radio("Вид", options=list(views.keys()), format_func=lambda x: views[x],
+                            index=list(views.keys()).index(default_view), horizontal=True)
+
+        values = out[metric]
+        if view == 'small_multiples' and len(labels) > SMALL_MULTIPLES_LIMIT:
+            st.info(f"Показаны первые {SMALL_MULTIPLES_LIMIT} сценариев; "
+                    "все сценарии — на тепловой карте")
+            labels, values = labels[:SMALL_MULTIPLES_LIMIT], values[:SMALL_MULTIPLES_LIMIT]
+        if view == 'lines':
+            fig = line_chart(months, labels, values, metric)
+        elif view == 'small_multiples':
+            fig = small_multiples(months, labels, values, metric)
+        else:
+            fig = heatmap(months, labels, values, metric)
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("Сохранённые наборы результатов")
+        stored_results_section(metric)
 
     except Exception as e:
         log_error(e, context="Error in scenario analysis page")
@@ -0,0 +1,152 @@
+import json
+import streamlit as st
+import plotly.graph_objects as go
+from models.monte_carlo import DEFAULT_DISTRIBUTIONS, ParameterDistribution, run_monte_carlo
+from models.parameters import ModelParameters
+from utils.config import format_years, get_horizon_years
+from utils.logging_config import log_error, log_info
+
+SCENARIO_NAMES = {
+    "pessimistic": "Пессимистичный",
+    "standard": "Стандартный",
+    "optimistic": "Оптимистичный"
+}
+
+METRIC_TITLES = {
+    'profit': ('Чистая прибыль', 'Прибыль (₽)'),
+    'cumulative_cash': ('Денежный остаток', 'Остаток (₽)'),
+    'active_users': ('Активные пользователи', 'Пользователи'),
+}
+
+DISTRIBUTION_NAMES = {
+    'normal': 'Нормальное',
+    'lognormal': 'Логнормальное',
+    'uniform': 'Равномерное',
+    'triangular': 'Треугольное'
+}
+
+
+def fan_chart(months, bands, title):
+    """Build a P5–P95 band with a P50 line"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=months, y=bands[95], mode='lines', line=dict(width=0),
+        showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(
+        x=months, y=bands[5], mode='lines', line=dict(width=0),
+        fill='tonexty', fillcolor='rgba(136, 132, 216, 0.25)',
+        name='P5–P95', hovertemplate="P5: %{y:,.0f}<extra></extra>"))
+    fig.add_trace(go.Scatter(
+        x=months, y=bands[50], mode='lines+markers',
+        line=dict(color='#8884d8', width=2), marker=dict(size=6),
+        name='P50', hovertemplate="P50: %{y:,.0f}<extra></extra>"))
+    fig.update_layout(showlegend=True,
+                      plot_bgcolor='white',
+                      paper_bgcolor='white',
+                      height=450,
+                      xaxis=dict(title='Месяц',
+                                 showgrid=True,
+                                 gridcolor='#f0f0f0',
+                                 tickformat=',d',
+                                 zeroline=False),
+                      yaxis=dict(title=title,
+                                 showgrid=True,
+                                 gridcolor='#f0f0f0',
+                                 tickformat=',.0f',
+                                 zeroline=False),
+                      hovermode='x unified',
+                      margin=dict(l=50, r=50, t=30, b=50),
+                      legend=dict(orientation="h",
+                                  yanchor="bottom",
+                                  y=1.02,
+                                  xanchor="right",
+                                  x=1))
+    return fig
+
+
+def monte_carlo_page():
+    st.title("Моделирование Монте-Карло")
+
+    try:
+        try:
+            with open('custom_presets.json', 'r') as f:
+                custom_presets = json.load(f)
+        except FileNotFoundError:
+            custom_presets = {}
+        scenario_names = {
+            **SCENARIO_NAMES,
+            **{name: f"Пользовательский: {name}" for name in custom_presets.keys()}
+        }
+
+        col_scenario, col_paths, col_seed = st.columns(3)
+        with col_scenario:
+            scenario = st.selectbox(
+                "Базовый сценарий",
+                options=list(scenario_names.keys()),
+                format_func=lambda x: scenario_names[x],
+                index=list(scenario_names.keys()).index("standard"))
+        with col_paths:
+            n_paths = st.number_input(
+                "Количество траекторий",
+                min_value=1000,
+                max_value=1000000,
+                value=100000,
+                step=10000)
+        with col_seed:
+            seed = st.number_input("Seed", min_value=0, value=42, step=1)
+
+        st.subheader("Распределения параметров")
+        distributions = {}
+        for key, default in DEFAULT_DISTRIBUTIONS.items():
+            col_kind, col_spread = st.columns(2)
+            with col_kind:
+                kind = st.selectbox(
+                    key,
+                    options=list(DISTRIBUTION_NAMES.keys()),
+                    format_func=lambda x: DISTRIBUTION_NAMES[x],
+                    index=list(DISTRIBUTION_NAMES.keys()).index(default.kind),
+                    key=f"mc_kind_{key}")
+            with col_spread:
+                spread = st.slider(
+                    "Разброс",
+                    min_value=0.0,
+                    max_value=100.0,
+                    value=default.spread * 100,
+                    step=1.0,
+                    format="%.0f%%",
+                    key=f"mc_spread_{key}") / 100
+            distributions[key] = ParameterDistribution(kind, spread, default.low, default.high)
+
+        horizon_years = get_horizon_years()
+        st.caption(f"Горизонт прогноза: {format_years(horizon_years)}")
+        if st.button("Запустить моделирование", type="primary"):
+            params = ModelParameters.from_preset(scenario)
+            with st.spinner("Моделирование..."):
+                st.session_state['monte_carlo_result'] = run_monte_carlo(
+                    params, distributions, n_paths=int(n_paths), seed=int(seed),
+                    months=range(1, horizon_years * 12 + 1))
+            log_info(f"Monte Carlo finished for scenario {scenario}")
+
+        result = st.session_state.get('monte_carlo_result')
+        if result is None:
+            st.info("Настройте распределения и запустите моделирование")
+            return
+
+        selected_month = st.selectbox("Выход на прибыльность к месяцу", result.months.tolist(), 11)
+        st.metric(
+            "Вероятность выхода на прибыльность",
+            f"{result.probability_profitable_by(selected_month):.1%}")
+
+        for metric, (title, axis_title) in METRIC_TITLES.items():
+            st.subheader(title)
+            st.plotly_chart(
+                fan_chart(result.months, result.bands[metric], axis_title),
+                use_container_width=True)
+
+    except Exception as e:
+        log_error(e, context="Error in Monte Carlo page")
+        st.error(f"Произошла ошибка при моделировании: {str(e)}")
+
+
+if __name__ == "__main__":
+    monte_carlo_page()
@@ -0,0 +1,239 @@
+import json
+import time
+import numpy as np
+import streamlit as st
+import plotly.graph_objects as go
+from models.jacobian import forecast_jacobian
+from models.parameters import ModelParameters, PARAMETER_KEYS
+from models.sensitivity import rank_by_effect, tornado_analysis
+from models.solver import broken_even_by, cash_floor, goal_seek, maximize, monthly_profit, total_roi
+from utils.config import format_years, get_horizon_years, get_model_parameters, initialize_session_state
+from utils.logging_config import log_error, log_info
+
+OUTPUT_NAMES = {
+    'total_profit': ('Прибыль за {period}', '₽'),
+    'roi': ('ROI', '%'),
+    'break_even_month': ('Месяц выхода на прибыльность', 'мес.'),
+}
+
+
+def tornado_chart(base, rows, output, top_n):
+    """Horizontal bars of the low/high deviation from the base value"""
+    rows = list(reversed(rows[:top_n]))
+    labels = [row['parameter'] for row in rows]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=labels,
+        x=[row[f'{output}_low'] - base[output] for row in rows],
+        orientation='h',
+        name='−X%',
+        marker_color='#d88884',
+        customdata=[row['low_value'] for row in rows],
+        hovertemplate="%{y} = %{customdata:,.4g}: %{x:+,.2f}<extra></extra>"))
+    fig.add_trace(go.Bar(
+        y=labels,
+        x=[row[f'{output}_high'] - base[output] for row in rows],
+        orientation='h',
+        name='+X%',
+        marker_color='#82ca9d',
+        customdata=[row['high_value'] for row in rows],
+        hovertemplate="%{y} = %{customdata:,.4g}: %{x:+,.2f}<extra></extra>"))
+    fig.update_layout(barmode='overlay',
+                      showlegend=True,
+                      plot_bgcolor='white',
+                      paper_bgcolor='white',
+                      height=max(400, 28 * len(rows)),
+                      xaxis=dict(title=f'Отклонение от базового значения ({OUTPUT_NAMES[output][1]})',
+                                 showgrid=True,
+                                 gridcolor='#f0f0f0',
+                                 tickformat=',.2f',
+                                 zeroline=True),
+                      margin=dict(l=50, r=50, t=30, b=50),
+                      legend=dict(orientation="h",
+                                  yanchor="bottom",
+                                  y=1.02,
+                                  xanchor="right",
+                                  x=1))
+    return fig
+
+
+def solver_report_caption(report):
+    status = "сошёлся" if bool(report.converged[0]) else "не сошёлся"
+    return (f"Решатель {status}: {report.iterations} итераций, "
+            f"{report.evaluations} расчётов, {report.elapsed * 1000:.0f} мс, "
+            f"ширина интервала {report.bracket_width[0]:.2g}")
+
+
+def goal_seek_section(params, months):
+    """Solver for break-even and ROI questions instead of dragging sliders"""
+    with st.expander("Подбор параметра", expanded=False):
+        col_key, col_low, col_high = st.columns(3)
+        with col_key:
+            key = st.selectbox("Параметр", PARAMETER_KEYS,
+                               index=PARAMETER_KEYS.index('growth_rate_y1'), key='solver_key')
+        current = float(getattr(params, key))
+        with col_low:
+            low = st.number_input("Нижняя граница", value=0.0, key='solver_low')
+        with col_high:
+            high = st.number_input("Верхняя граница", value=max(current * 3, 1.0), key='solver_high')
+
+        goal = st.radio(
+            "Задача",
+            options=['profit', 'break_even', 'roi'],
+            format_func=lambda x: {
+                'profit': "Минимальное значение для прибыли в месяце ≥ цели",
+                'break_even': "Минимальное значение для выхода на прибыльность к месяцу",
+                'roi': "Максимум ROI при минимальном денежном остатке",
+            }[x],
+            key='solver_goal')
+        col_month, col_target = st.columns(2)
+        with col_month:
+            month = st.number_input("Месяц", min_value=1, max_value=len(months), value=min(12, len(months)),
+                                    key='solver_month')
+        with col_target:
+            target = st.number_input(
+                "Цель по прибыли / минимальный остаток (₽)", value=0.0, step=100000.0, key='solver_target')
+
+        if goal == 'roi':
+            report = maximize(params, key, total_roi, low, high, constraint=cash_floor(target), months=months)
+            label = "ROI"
+        elif goal == 'break_even':
+            report = goal_seek(params, key, broken_even_by(int(month)), 0.5, low, high, months=months)
+            label = None
+        else:
+            report = goal_seek(params, key, monthly_profit(int(month)), target, low, high, months=months)
+            label = "Прибыль"
+
+        value = report.values[0]
+        if np.isnan(value):
+            st.warning("На заданном интервале решения нет")
+        else:
+            st.metric(f"{key} (сейчас {current:,.4g})", f"{value:,.4g}")
+            if label:
+                st.caption(f"{label} в решении: {report.objective[0]:,.2f}")
+        st.caption(solver_report_caption(report))
+
+
+DERIVATIVE_OUTPUTS = {
+    'profit': "Прибыль за {period}",
+    'revenue': "Выручка за {period}",
+    'cumulative_cash': "Денежный остаток на конец периода",
+}
+
+
+def derivatives_section(params, months, period):
+    """Exact effect of +1% of every parameter from one forward-mode pass"""
+    with st.expander("Производные по параметрам", expanded=False):
+        if params.retention_decay > 0:
+            st.info("Производные доступны только без оттока пользователей")
+            return
+        output = st.selectbox("Показатель",
+                              options=list(DERIVATIVE_OUTPUTS.keys()),
+                              format_func=lambda x: DERIVATIVE_OUTPUTS[x].format(period=period),
+                              key='derivative_output')
+        started = time.perf_counter()
+        jacobian = forecast_jacobian(params, months)
+        elapsed = time.perf_counter() - started
+        if output == 'cumulative_cash':
+            effects = jacobian.one_percent_effects(output, month=len(jacobian.values[output]))
+        else:
+            effects = jacobian.one_percent_effects(output)
+
+        order = [i for i in np.argsort(-np.abs(effects)) if effects[i] != 0][:15]
+        order.reverse()
+        fig = go.Figure(go.Bar(
+            y=[jacobian.parameters[i] for i in order],
+            x=[effects[i] for i in order],
+            orientation='h',
+            marker_color=['#82ca9d' if effects[i] > 0 else '#d88884' for i in order],
+            hovertemplate="%{y}: %{x:+,.0f} ₽<extra></extra>"))
+        fig.update_layout(plot_bgcolor='white',
+                          paper_bgcolor='white',
+                          height=max(300, 28 * len(order)),
+                          xaxis=dict(title='Изменение при росте параметра на 1% (₽)',
+                                     showgrid=True,
+                                     gridcolor='#f0f0f0',
+                                     tickformat=',.0f',
+                                     zeroline=True),
+                          margin=dict(l=50, r=50, t=30, b=50))
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Точные производные за один проход модели: {elapsed * 1000:.0f} мс. "
+                   "Пороги (месяцы запуска, шкала инфраструктуры, налог при убытке) "
+                   "учитываются по текущей ветке.")
+
+
+def sensitivity_page():
+    st.title("Анализ чувствительности")
+
+    try:
+        initialize_session_state()
+        try:
+            with open('custom_presets.json', 'r') as f:
+                custom_presets = json.load(f)
+        except FileNotFoundError:
+            custom_presets = {}
+        months = range(1, get_horizon_years() * 12 + 1)
+        period = format_years(get_horizon_years())
+        scenario_names = {
+            "current": "Текущие параметры",
+            "standard": "Стандартный",
+            "pessimistic": "Пессимистичный",
+            "optimistic": "Оптимистичный",
+            **{name: f"Пользовательский: {name}" for name in custom_presets.keys()}
+        }
+
+        col_scenario, col_pct, col_output = st.columns(3)
+        with col_scenario:
+            scenario = st.selectbox(
+                "Сценарий",
+                options=list(scenario_names.keys()),
+                format_func=lambda x: scenario_names[x])
+        with col_pct:
+            pct = st.slider(
+                "Изменение параметров (±X%)",
+                min_value=1.0,
+                max_value=50.0,
+                value=10.0,
+                step=1.0,
+                format="%.0f%%") / 100
+        with col_output:
+            output = st.selectbox(
+                "Показатель",
+                options=list(OUTPUT_NAMES.keys()),
+                format_func=lambda x: OUTPUT_NAMES[x][0].format(period=period))
+
+        params = get_model_parameters() if scenario == "current" else ModelParameters.from_preset(scenario)
+
+        started = time.perf_counter()
+        base, rows = tornado_analysis(params, pct, months=months)
+        elapsed = time.perf_counter() - started
+        log_info(f"Sensitivity analysis for {scenario} took {elapsed:.3f}s")
+
+        ranked = rank_by_effect(base, rows, output)
+        top_n = st.slider("Количество параметров", 5, len(ranked), min(15, len(ranked)))
+
+        st.caption(f"Базовое значение: {base[output]:,.2f} {OUTPUT_NAMES[output][1]} · "
+                   f"{2 * len(rows) + 1} сценариев за {elapsed * 1000:.0f} мс")
+        st.plotly_chart(tornado_chart(base, ranked, output, top_n), use_container_width=True)
+
+        st.subheader("Таблица чувствительности")
+        st.table([{
+            "Параметр": row['parameter'],
+            "−X%": f"{row['low_value']:,.4g}",
+            "+X%": f"{row['high_value']:,.4g}",
+            **{
+                f"{OUTPUT_NAMES[key][0].format(period=period)} (−/+)": f"{row[f'{key}_low']:,.1f} / {row[f'{key}_high']:,.1f}"
+                for key in OUTPUT_NAMES
+            }
+        } for row in ranked[:top_n]])
+
+        derivatives_section(params, months, period)
+        goal_seek_section(params, months)
+
+    except Exception as e:
+        log_error(e, context="Error in sensitivity page")
+        st.error(f"Произошла ошибка при анализе чувствительности: {str(e)}")
+
+
+if __name__ == "__main__":
+    sensitivity_page()
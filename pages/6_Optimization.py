@@ -0,0 +1,174 @@
+import json
+import numpy as np
+import streamlit as st
+import plotly.graph_objects as go
+from models.optimizer import DEFAULT_LEVERS, optimize_levers, risk_return_frontier
+from models.parameters import ModelParameters
+from utils.config import format_years, get_horizon_years, get_model_parameters, initialize_session_state
+from utils.logging_config import log_error, log_info
+
+SCENARIO_NAMES = {
+    "current": "Текущие параметры",
+    "standard": "Стандартный",
+    "pessimistic": "Пессимистичный",
+    "optimistic": "Оптимистичный"
+}
+
+OBJECTIVE_NAMES = {
+    'roi': ("ROI", "%"),
+    'npv': ("NPV (15% годовых)", "₽"),
+}
+
+
+def convergence_chart(history, objective):
+    fig = go.Figure(go.Scatter(
+        x=np.arange(1, len(history) + 1), y=history, mode='lines',
+        line=dict(color='#8884d8', width=2),
+        hovertemplate="Поколение %{x}: %{y:,.2f}<extra></extra>"))
+    fig.update_layout(plot_bgcolor='white',
+                      paper_bgcolor='white',
+                      height=300,
+                      xaxis=dict(title='Поколение', showgrid=True, gridcolor='#f0f0f0'),
+                      yaxis=dict(title=f'{OBJECTIVE_NAMES[objective][0]} ({OBJECTIVE_NAMES[objective][1]})',
+                                 showgrid=True, gridcolor='#f0f0f0', tickformat=',.2f'),
+                      margin=dict(l=50, r=50, t=30, b=50))
+    return fig
+
+
+def frontier_chart(frontier, objective):
+    """All candidates with the Pareto frontier between downside and expected value"""
+    unit = OBJECTIVE_NAMES[objective][1]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=frontier.downside, y=frontier.expected, mode='markers',
+        marker=dict(color='#cccccc', size=7), name='Кандидаты',
+        hovertemplate=f"P{frontier.percentile}: %{{x:,.2f}} {unit}<br>Среднее: %{{y:,.2f}} {unit}<extra></extra>"))
+    fig.add_trace(go.Scatter(
+        x=frontier.downside[frontier.front], y=frontier.expected[frontier.front],
+        mode='lines+markers', line=dict(color='#82ca9d', width=2), marker=dict(size=9),
+        name='Граница Парето',
+        hovertemplate=f"P{frontier.percentile}: %{{x:,.2f}} {unit}<br>Среднее: %{{y:,.2f}} {unit}<extra></extra>"))
+    fig.update_layout(plot_bgcolor='white',
+                      paper_bgcolor='white',
+                      height=450,
+                      xaxis=dict(title=f'Неблагоприятный исход, P{frontier.percentile} ({unit})',
+                                 showgrid=True, gridcolor='#f0f0f0', tickformat=',.2f'),
+                      yaxis=dict(title=f'Ожидаемое значение ({unit})',
+                                 showgrid=True, gridcolor='#f0f0f0', tickformat=',.2f'),
+                      margin=dict(l=50, r=50, t=30, b=50),
+                      legend=dict(orientation="h",
+                                  yanchor="bottom",
+                                  y=1.02,
+                                  xanchor="right",
+                                  x=1))
+    return fig
+
+
+def optimization_page():
+    st.title("Оптимизация маркетинга и цен")
+
+    try:
+        initialize_session_state()
+        try:
+            with open('custom_presets.json', 'r') as f:
+                custom_presets = json.load(f)
+        except FileNotFoundError:
+            custom_presets = {}
+        scenario_names = {
+            **SCENARIO_NAMES,
+            **{name: f"Пользовательский: {name}" for name in custom_presets.keys()}
+        }
+
+        col_scenario, col_objective, col_generations = st.columns(3)
+        with col_scenario:
+            scenario = st.selectbox(
+                "Базовый сценарий",
+                options=list(scenario_names.keys()),
+                format_func=lambda x: scenario_names[x])
+        with col_objective:
+            objective = st.radio(
+                "Цель",
+                options=list(OBJECTIVE_NAMES.keys()),
+                format_func=lambda x: f"Максимум {OBJECTIVE_NAMES[x][0]}",
+                horizontal=True)
+        with col_generations:
+            generations = st.slider("Поколений", 10, 300, 60, 10)
+
+        st.subheader("Ограничения")
+        col_cash, col_users = st.columns(2)
+        with col_cash:
+            use_cash = st.checkbox("Денежный остаток не ниже", value=True)
+            min_cash = st.number_input("Минимальный остаток (₽)", value=0.0, step=1000000.0,
+                                       disabled=not use_cash)
+        with col_users:
+            use_users = st.checkbox("Активных пользователей в последнем месяце не меньше", value=False)
+            min_users = st.number_input("Пользователей", min_value=0.0, value=50000.0, step=1000.0,
+                                        disabled=not use_users)
+
+        st.subheader("Рычаги")
+        levers = {}
+        for key, (low, high) in DEFAULT_LEVERS.items():
+            integer = isinstance(low, int)
+            bounds = st.slider(key,
+                               min_value=low,
+                               max_value=high,
+                               value=(low, high),
+                               step=1 if integer else (high - low) / 100,
+                               key=f"lever_{key}")
+            if bounds[0] < bounds[1]:
+                levers[key] = bounds
+        if not levers:
+            st.warning("Задайте хотя бы один рычаг с ненулевым диапазоном")
+            return
+
+        horizon_years = get_horizon_years()
+        months = range(1, horizon_years * 12 + 1)
+        st.caption(f"Горизонт прогноза: {format_years(horizon_years)}")
+        if st.button("Запустить оптимизацию", type="primary"):
+            params = get_model_parameters() if scenario == "current" else ModelParameters.from_preset(scenario)
+            with st.spinner("Оптимизация..."):
+                result = optimize_levers(
+                    params, objective, levers,
+                    min_cash=min_cash if use_cash else None,
+                    min_active_users=min_users if use_users else None,
+                    generations=generations, months=months)
+                frontier = risk_return_frontier(params, result.levers, result.population, objective,
+                                                months=months)
+            st.session_state['optimization_result'] = (params, objective, result, frontier)
+            log_info(f"Optimization finished for scenario {scenario}")
+
+        stored = st.session_state.get('optimization_result')
+        if stored is None:
+            st.info("Задайте ограничения и запустите оптимизацию")
+            return
+        params, objective, result, frontier = stored
+        name, unit = OBJECTIVE_NAMES[objective]
+
+        if not result.feasible:
+            st.warning("Допустимое решение не найдено: показан вариант с наименьшим нарушением ограничений")
+        st.metric(f"{name} в решении", f"{result.objective:,.2f} {unit}")
+        st.caption(f"{result.evaluations} расчётов модели за {result.elapsed:.2f} с "
+                   f"({result.generations} поколений, один пакетный расчёт на поколение)")
+        st.table([{
+            "Рычаг": key,
+            "Сейчас": f"{getattr(params, key):,.4g}",
+            "Оптимум": f"{value:,.4g}",
+        } for key, value in result.values.items()])
+        st.plotly_chart(convergence_chart(result.history, objective), use_container_width=True)
+
+        st.subheader("Риск и доходность")
+        st.caption("Итоговая популяция на одних и тех же случайных сценариях неопределённых параметров")
+        st.plotly_chart(frontier_chart(frontier, objective), use_container_width=True)
+        st.table([{
+            f"P{frontier.percentile} ({unit})": f"{frontier.downside[i]:,.2f}",
+            f"Среднее ({unit})": f"{frontier.expected[i]:,.2f}",
+            **{key: f"{frontier.candidates[i, j]:,.4g}" for j, key in enumerate(frontier.levers)},
+        } for i in frontier.front])
+
+    except Exception as e:
+        log_error(e, context="Error in optimization page")
+        st.error(f"Произошла ошибка при оптимизации: {str(e)}")
+
+
+if __name__ == "__main__":
+    optimization_page()
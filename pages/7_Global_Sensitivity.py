@@ -0,0 +1,144 @@
+import json
+import time
+import numpy as np
+import streamlit as st
+import plotly.graph_objects as go
+from models.global_sensitivity import default_ranges, iter_sobol, morris_screening
+from models.parameters import ModelParameters
+from utils.config import format_years, get_horizon_years, get_model_parameters, initialize_session_state
+from utils.logging_config import log_error, log_info
+
+OUTPUT_NAMES = {
+    'total_profit': "Прибыль за {period}",
+    'roi': "ROI",
+    'total_revenue': "Выручка за {period}",
+    'final_active_users': "Активные пользователи в конце периода",
+}
+
+
+def sobol_chart(estimate, output, top_n=15):
+    """First-order and total indices with 95% intervals, largest total effect on top"""
+    order = list(np.argsort(-estimate.total[output])[:top_n])[::-1]
+    labels = [estimate.keys[i] for i in order]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=labels, x=estimate.first[output][order], orientation='h', name='Первого порядка (S1)',
+        marker_color='#8884d8',
+        error_x=dict(type='data', array=estimate.first_ci[output][order]),
+        hovertemplate="%{y}: S1 = %{x:.3f}<extra></extra>"))
+    fig.add_trace(go.Bar(
+        y=labels, x=estimate.total[output][order], orientation='h', name='Полный (ST)',
+        marker_color='#82ca9d',
+        error_x=dict(type='data', array=estimate.total_ci[output][order]),
+        hovertemplate="%{y}: ST = %{x:.3f}<extra></extra>"))
+    fig.update_layout(barmode='group',
+                      plot_bgcolor='white',
+                      paper_bgcolor='white',
+                      height=max(400, 32 * len(labels)),
+                      xaxis=dict(title='Доля дисперсии', showgrid=True, gridcolor='#f0f0f0',
+                                 tickformat='.2f'),
+                      margin=dict(l=50, r=50, t=30, b=50),
+                      legend=dict(orientation="h",
+                                  yanchor="bottom",
+                                  y=1.02,
+                                  xanchor="right",
+                                  x=1))
+    return fig
+
+
+def morris_chart(result, output):
+    """mu* against sigma: far right is influential, high up is non-linear or interacting"""
+    fig = go.Figure(go.Scatter(
+        x=result.mu_star[output], y=result.sigma[output], mode='markers+text',
+        text=list(result.keys), textposition='top center', marker=dict(color='#8884d8', size=9),
+        hovertemplate="%{text}<br>μ* = %{x:,.3g}<br>σ = %{y:,.3g}<extra></extra>"))
+    fig.update_layout(plot_bgcolor='white',
+                      paper_bgcolor='white',
+                      height=450,
+                      xaxis=dict(title='μ* (средний модуль эффекта)', showgrid=True, gridcolor='#f0f0f0'),
+                      yaxis=dict(title='σ (нелинейность и взаимодействия)', showgrid=True, gridcolor='#f0f0f0'),
+                      margin=dict(l=50, r=50, t=30, b=50))
+    return fig
+
+
+def global_sensitivity_page():
+    st.title("Глобальная чувствительность")
+
+    try:
+        initialize_session_state()
+        try:
+            with open('custom_presets.json', 'r') as f:
+                custom_presets = json.load(f)
+        except FileNotFoundError:
+            custom_presets = {}
+        months = range(1, get_horizon_years() * 12 + 1)
+        period = format_years(get_horizon_years())
+        scenario_names = {
+            "current": "Текущие параметры",
+            "standard": "Стандартный",
+            "pessimistic": "Пессимистичный",
+            "optimistic": "Оптимистичный",
+            **{name: f"Пользовательский: {name}" for name in custom_presets.keys()}
+        }
+
+        col_scenario, col_pct, col_output = st.columns(3)
+        with col_scenario:
+            scenario = st.selectbox(
+                "Сценарий",
+                options=list(scenario_names.keys()),
+                format_func=lambda x: scenario_names[x])
+        with col_pct:
+            pct = st.slider("Диапазон параметров (±X%)", 5.0, 50.0, 20.0, 5.0, format="%.0f%%") / 100
+        with col_output:
+            output = st.selectbox("Показатель",
+                                  options=list(OUTPUT_NAMES.keys()),
+                                  format_func=lambda x: OUTPUT_NAMES[x].format(period=period))
+
+        params = get_model_parameters() if scenario == "current" else ModelParameters.from_preset(scenario)
+        ranges = default_ranges(params, pct)
+
+        st.subheader("Отбор по Моррису")
+        morris = morris_screening(params, ranges, months=months)
+        st.caption(f"{morris.evaluations} расчётов, {len(ranges)} параметров")
+        st.plotly_chart(morris_chart(morris, output), use_container_width=True)
+
+        st.subheader("Индексы Соболя")
+        col_samples, col_screen = st.columns(2)
+        with col_samples:
+            n_base = st.select_slider("Базовых точек", options=[512, 1024, 2048, 4096, 8192, 16384],
+                                      value=2048)
+        with col_screen:
+            screen = st.checkbox("Только значимые по Моррису (μ* ≥ 5% от максимума)", value=True)
+        keys = morris.important(output) if screen else tuple(ranges)
+        sobol_ranges = {key: ranges[key] for key in keys}
+        st.caption(f"{len(keys)} параметров, {n_base * (len(keys) + 2):,} расчётов модели")
+
+        if st.button("Рассчитать индексы Соболя", type="primary"):
+            progress = st.progress(0.0)
+            chart = st.empty()
+            status = st.empty()
+            started = time.perf_counter()
+            estimate = None
+            for estimate in iter_sobol(params, sobol_ranges, n_base=n_base,
+                                       chunk_size=max(256, n_base // 8), months=months):
+                progress.progress(estimate.n_base / n_base)
+                chart.plotly_chart(sobol_chart(estimate, output), use_container_width=True)
+                status.caption(f"{estimate.n_base} из {n_base} точек · "
+                               f"макс. ширина интервала ST ±{estimate.total_ci[output].max():.3f} · "
+                               f"{time.perf_counter() - started:.1f} с")
+            st.session_state['sobol_estimate'] = (scenario, estimate)
+            log_info(f"Sobol analysis finished for scenario {scenario}")
+        elif 'sobol_estimate' in st.session_state:
+            stored_scenario, estimate = st.session_state['sobol_estimate']
+            if output in estimate.first:
+                st.caption(f"Последний расчёт: {scenario_names.get(stored_scenario, stored_scenario)}, "
+                           f"{estimate.n_base} точек")
+                st.plotly_chart(sobol_chart(estimate, output), use_container_width=True)
+
+    except Exception as e:
+        log_error(e, context="Error in global sensitivity page")
+        st.error(f"Произошла ошибка при анализе чувствительности: {str(e)}")
+
+
+if __name__ == "__main__":
+    global_sensitivity_page()
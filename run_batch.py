@@ -0,0 +1,160 @@
+"""Headless batch runner: forecasts for presets or parameter files without Streamlit.
+
+    python run_batch.py --all-presets --format parquet
+    python run_batch.py --input scenarios.csv --horizon 60 --workers 4
+    python run_batch.py --input big_grid.csv --store results/big_grid
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from models.executor import get_executor
+from models.financial_model import LINE_ITEMS, calculate_financials_batch
+from models.metrics import summarize
+from models.parameters import PARAMETER_KEYS, ModelParameters, stack_parameters
+from models.result_store import write_result_store
+from utils.export import export_financial_data
+from utils.logging_config import log_error, log_info
+from utils.presets import PRESETS
+
+NAME_COLUMNS = ('name', 'scenario')
+
+
+def load_parameter_file(path, base):
+    """Named parameter sets from a CSV or JSONL file; missing values are taken from ``base``.
+
+    Columns other than the parameter names and a ``name``/``scenario`` column are rejected.
+    """
+    if path.endswith('.jsonl'):
+        frame = pd.read_json(path, lines=True)
+    elif path.endswith('.csv'):
+        frame = pd.read_csv(path)
+    else:
+        raise ValueError(f"Unsupported parameter file: {path} (expected .csv or .jsonl)")
+    name_column = next((column for column in NAME_COLUMNS if column in frame.columns), None)
+    # Опечатка в имени столбца иначе молча подставила бы значение базового пресета
+    unknown = set(frame.columns) - set(PARAMETER_KEYS) - set(NAME_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown parameters in {path}: {', '.join(sorted(unknown))}")
+    scenarios = {}
+    for i, row in enumerate(frame.to_dict('records')):
+        name = str(row[name_column]) if name_column else f"{os.path.basename(path)}:{i + 1}"
+        values = {key: value for key, value in row.items() if key in PARAMETER_KEYS and pd.notna(value)}
+        scenarios[name] = ModelParameters.from_mapping({**base.to_dict(), **values})
+    return scenarios
+
+
+def collect_scenarios(args):
+    scenarios = {}
+    custom_presets = {}
+    if args.all_presets or args.preset:
+        try:
+            with open(args.custom_presets, 'r') as f:
+                custom_presets = json.load(f)
+        except FileNotFoundError:
+            custom_presets = {}
+    if args.all_presets:
+        for name, preset in {**PRESETS, **custom_presets}.items():
+            scenarios[name] = ModelParameters.from_mapping(preset)
+    for name in args.preset or ():
+        if name in PRESETS:
+            scenarios[name] = ModelParameters.from_mapping(PRESETS[name])
+        elif name in custom_presets:
+            scenarios[name] = ModelParameters.from_mapping(custom_presets[name])
+        else:
+            raise KeyError(f"Unknown preset: {name}")
+    if args.input:
+        base = ModelParameters.from_preset(args.base, args.custom_presets)
+        for path in args.input:
+            scenarios.update(load_parameter_file(path, base))
+    return scenarios
+
+
+def _result_frames(names, horizon, matrix, results):
+    """Long-format monthly table and summary; pandas copies the arrays, so shared results can be released"""
+    summary = summarize(results, matrix)
+    monthly = pd.DataFrame({
+        'scenario': np.repeat(names, horizon),
+        'month': np.tile(np.arange(1, horizon + 1), len(names)),
+        **{key: results[key].ravel() for key in LINE_ITEMS},
+    })
+    return monthly, pd.DataFrame({'scenario': names, **summary})
+
+
+def run_scenarios(scenarios, horizon, workers=None, chunk_size=2000):
+    """Monthly results (long format) and one summary row per scenario"""
+    names = list(scenarios)
+    matrix = stack_parameters(list(scenarios.values()))
+    months = range(1, horizon + 1)
+    workers = workers or min(os.cpu_count() or 1, -(-len(matrix) // chunk_size))
+    if workers > 1:
+        # Параметры и результаты в общей памяти тёплого пула; читаем их без копирования
+        with get_executor().run(matrix, months, chunk_size=chunk_size, workers=workers) as results:
+            monthly, summary = _result_frames(names, horizon, matrix, results)
+    else:
+        monthly, summary = _result_frames(
+            names, horizon, matrix, calculate_financials_batch(matrix, months=months))
+    return monthly, summary, workers
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Расчёт финансовой модели без интерфейса Streamlit")
+    parser.add_argument('--preset', action='append', help="встроенный или пользовательский пресет (можно несколько)")
+    parser.add_argument('--all-presets', action='store_true', help="все встроенные и пользовательские пресеты")
+    parser.add_argument('--custom-presets', default='custom_presets.json', help="файл пользовательских пресетов")
+    parser.add_argument('--input', action='append', help="CSV или JSONL с наборами параметров (столбец name — имя)")
+    parser.add_argument('--base', default='standard', help="пресет для параметров, которых нет в файле")
+    parser.add_argument('--horizon', type=int, default=24, help="горизонт в месяцах")
+    parser.add_argument('--format', choices=('csv', 'json', 'parquet'), default='csv')
+    parser.add_argument('--output-dir', default='exports')
+    parser.add_argument('--workers', type=int, default=None, help="процессов (по умолчанию — число ядер)")
+    parser.add_argument('--chunk-size', type=int, default=2000, help="сценариев на задачу")
+    parser.add_argument('--store', help="вместо экспорта записать хранилище с отображением в память "
+                                        "(каталог; открывается на странице «Анализ сценариев»)")
+    args = parser.parse_args(argv)
+    if not (args.preset or args.all_presets or args.input):
+        parser.error("укажите --preset, --all-presets или --input")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        started = time.perf_counter()
+        scenarios = collect_scenarios(args)
+        loaded = time.perf_counter()
+        if args.store:
+            path = write_result_store(args.store, stack_parameters(list(scenarios.values())), list(scenarios),
+                                      months=range(1, args.horizon + 1), chunk_size=args.chunk_size)
+            log_info(f"Batch run: {len(scenarios)} scenarios, {args.horizon} months, stored in {path}")
+            print(f"Сценариев: {len(scenarios)} · горизонт {args.horizon} мес. · "
+                  f"расчёт и запись {time.perf_counter() - loaded:.2f} с")
+            print(f"Хранилище: {path}")
+            return 0
+        monthly, summary, workers = run_scenarios(scenarios, args.horizon, args.workers, args.chunk_size)
+        computed = time.perf_counter()
+        monthly_file = export_financial_data(monthly, args.format, args.output_dir, 'batch_results')
+        summary_file = export_financial_data(summary, args.format, args.output_dir, 'batch_summary')
+        finished = time.perf_counter()
+
+        log_info(f"Batch run: {len(scenarios)} scenarios, {args.horizon} months, {workers} workers")
+        print(summary.sort_values('total_profit', ascending=False).head(20).to_string(
+            index=False, float_format=lambda x: f"{x:,.2f}"))
+        print(f"\nСценариев: {len(scenarios)} · горизонт {args.horizon} мес. · процессов: {workers}")
+        print(f"Загрузка {loaded - started:.2f} с · расчёт {computed - loaded:.2f} с · "
+              f"запись {finished - computed:.2f} с · всего {finished - started:.2f} с")
+        print(f"Результаты: {monthly_file}\nСводка: {summary_file}")
+        return 0
+    except Exception as e:
+        log_error(e, context="Error in batch run")
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
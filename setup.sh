@@ -19,3 +19,6 @@ gatherUsageStats = false
 layout = "wide"
 EOL
 fi
+
+# Предрасчёт пресетов; без артефакта приложение посчитает их при старте
+python build_artifacts.py || echo "Preset artifacts were not built"
@@ -0,0 +1,110 @@
+"""Grid sweeps sharded across machines: one coordinator, any number of workers.
+
+    python sweep_cluster.py coordinator --axis growth_rate_y1=0.1:0.6:50 \\
+        --axis active_conversion=0.2:0.5:40 --output-dir exports/sweep \\
+        --host 0.0.0.0 --allow-remote --port 9100
+    python sweep_cluster.py worker --host coordinator-host --port 9100
+
+    # всё на одной машине: координатор и три локальных воркера
+    python sweep_cluster.py coordinator --axis ... --local-workers 3
+"""
+import argparse
+import socket
+import subprocess
+import sys
+
+import numpy as np
+
+from models.distributed import HEARTBEAT_TIMEOUT, run_coordinator, run_worker
+from models.parameters import ModelParameters
+from utils.logging_config import log_error
+
+
+def parse_axis(text):
+    """``key=start:stop:count`` (evenly spaced) or ``key=v1,v2,...``"""
+    key, _, values = text.partition('=')
+    if not values:
+        raise argparse.ArgumentTypeError(f"Expected key=start:stop:count or key=v1,v2: {text}")
+    try:
+        if ':' in values:
+            start, stop, count = values.split(':')
+            return key, np.linspace(float(start), float(stop), int(count)).tolist()
+        return key, [float(value) for value in values.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Bad axis values: {text}")
+
+
+def start_local_workers(count, port):
+    return [
+        subprocess.Popen([sys.executable, __file__, 'worker', '--host', '127.0.0.1', '--port', str(port),
+                          '--name', f"local-{i + 1}"])
+        for i in range(count)
+    ]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Распределённый перебор параметров по нескольким машинам")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    coordinator = commands.add_parser('coordinator', help="раздаёт чанки и собирает результаты")
+    coordinator.add_argument('--axis', action='append', type=parse_axis, required=True,
+                             help="параметр и значения: key=start:stop:count или key=v1,v2 (можно несколько)")
+    coordinator.add_argument('--preset', default='standard', help="базовый пресет")
+    coordinator.add_argument('--custom-presets', default='custom_presets.json')
+    coordinator.add_argument('--line-item', action='append', help="помесячные статьи в результате (по умолчанию profit)")
+    coordinator.add_argument('--horizon', type=int, default=24, help="горизонт в месяцах")
+    coordinator.add_argument('--output-dir', required=True, help="каталог Parquet-частей; повторный запуск продолжает")
+    coordinator.add_argument('--chunk-size', type=int, default=5000, help="сценариев в чанке")
+    coordinator.add_argument('--host', default='127.0.0.1',
+                             help="адрес для воркеров; не локальный адрес требует --allow-remote")
+    coordinator.add_argument('--allow-remote', action='store_true',
+                             help="разрешить подключения из сети: протокол без аутентификации, только доверенная сеть")
+    coordinator.add_argument('--port', type=int, default=9100, help="0 — любой свободный порт")
+    coordinator.add_argument('--heartbeat-timeout', type=float, default=HEARTBEAT_TIMEOUT,
+                             help="секунд без сигнала, после которых чанк воркера отдаётся другому")
+    coordinator.add_argument('--local-workers', type=int, default=0, help="запустить воркеры на этой машине")
+
+    worker = commands.add_parser('worker', help="берёт чанки у координатора и считает их")
+    worker.add_argument('--host', default='127.0.0.1')
+    worker.add_argument('--port', type=int, default=9100)
+    worker.add_argument('--name', default=socket.gethostname())
+    worker.add_argument('--connect-timeout', type=float, default=30.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        if args.command == 'worker':
+            computed = run_worker(args.host, args.port, args.name, args.connect_timeout)
+            print(f"Воркер {args.name}: посчитано чанков: {computed}")
+            return 0
+
+        params = ModelParameters.from_preset(args.preset, args.custom_presets)
+        local = []
+        try:
+            summary = run_coordinator(
+                params, dict(args.axis), args.output_dir, host=args.host, port=args.port,
+                allow_remote=args.allow_remote,
+                on_started=lambda port: local.extend(start_local_workers(args.local_workers, port)),
+                line_items=args.line_item or ('profit',), months=range(1, args.horizon + 1),
+                chunk_size=args.chunk_size, heartbeat_timeout=args.heartbeat_timeout)
+        finally:
+            for process in local:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        print(f"Сценариев: {summary['n_scenarios']} · чанков: {summary['n_chunks']} "
+              f"(из прошлого запуска: {summary['chunks_resumed']}, повторов: {summary['retries']}) · "
+              f"{summary['seconds']:.2f} с")
+        print(f"Результаты: {summary['output_dir']}")
+        return 0
+    except Exception as e:
+        log_error(e, context=f"Error in sweep cluster {args.command}")
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
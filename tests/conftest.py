@@ -0,0 +1,4 @@
+import os
+
+# Тесты не пишут в общий кэш на диске рабочего каталога
+os.environ.setdefault('FORECAST_DISK_CACHE', '0')
@@ -0,0 +1,77 @@
+import numpy as np
+
+from models.cache import ENTRY_OVERHEAD_BYTES, ForecastCache, parameters_hash
+from models.parameters import ModelParameters
+
+
+class Value:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+
+def entry(kb):
+    return Value(kb * 1024 - ENTRY_OVERHEAD_BYTES)
+
+
+class MemoryDisk:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, value):
+        self.entries[key] = value
+
+    def stats(self):
+        return {}
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ForecastCache(max_bytes=3 * 1024)
+    for key in 'abc':
+        cache.put(key, entry(1))
+    assert cache.get('a') is not None  # 'a' становится самой свежей
+    cache.put('d', entry(1))
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in 'acd')
+    assert cache.evictions == 1
+    assert cache.size_bytes == 3 * 1024
+
+
+def test_size_cap_evicts_several_entries_and_skips_oversized_values():
+    cache = ForecastCache(max_bytes=4 * 1024)
+    for key in 'abcd':
+        cache.put(key, entry(1))
+    cache.put('big', entry(3))
+    assert [key for key in 'abcd' if cache.get(key) is not None] == ['d']
+    oversized = entry(5)
+    assert cache.put('huge', oversized) is oversized
+    assert cache.get('huge') is None
+    assert cache.size_bytes <= cache.max_bytes
+
+
+def test_existing_entry_is_returned_on_repeated_put():
+    cache = ForecastCache(max_bytes=4 * 1024)
+    first = cache.put('a', entry(1))
+    assert cache.put('a', entry(1)) is first
+    assert cache.stats()['entries'] == 1
+
+
+def test_disk_layer_fills_memory_misses_unless_persist_is_off():
+    disk = MemoryDisk()
+    cache = ForecastCache(max_bytes=4 * 1024, disk=disk)
+    cache.put('a', entry(1))
+    cache.put('b', entry(1), persist=False)
+    assert set(disk.entries) == {'a'}
+    cache.clear()
+    assert cache.get('a') is disk.entries['a']
+    assert cache.get('b') is None
+
+
+def test_parameters_hash_is_canonical():
+    params = ModelParameters.from_preset('standard')
+    same = ModelParameters.from_mapping(dict(reversed(list(params.to_dict().items()))))
+    assert parameters_hash(params, 24) == parameters_hash(same, 24)
+    assert parameters_hash(params, 24) != parameters_hash(params, 36)
+    assert parameters_hash(params) != parameters_hash(params.replace(avg_check=np.nextafter(params.avg_check, 1e9)))
@@ -0,0 +1,67 @@
+import os
+import pickle
+
+from models.disk_cache import ENTRY_SUFFIX, MARKER_NAME, DiskCache
+
+
+class Unpicklable:
+    def __reduce__(self):
+        raise pickle.PicklingError("refused")
+
+
+def files(cache):
+    return sorted(os.listdir(cache.path))
+
+
+def test_entries_survive_a_new_instance(tmp_path):
+    DiskCache(str(tmp_path), fingerprint='a' * 64).put('key', {'x': 1})
+    assert DiskCache(str(tmp_path), fingerprint='a' * 64).get('key') == {'x': 1}
+
+
+def test_failed_write_leaves_no_partial_files(tmp_path):
+    cache = DiskCache(str(tmp_path), fingerprint='a' * 64)
+    cache.put('key', {'x': 1})
+    before = files(cache)
+    cache.put('key', Unpicklable())
+    cache.put('other', Unpicklable())
+    assert files(cache) == before
+    assert not any(name.endswith('.tmp') for name in files(cache))
+    # Старая запись не повреждена неудачной перезаписью
+    assert cache.get('key') == {'x': 1}
+    assert cache.get('other') is None
+
+
+def test_corrupt_entry_is_dropped(tmp_path):
+    cache = DiskCache(str(tmp_path), fingerprint='a' * 64)
+    cache.put('key', [1, 2, 3])
+    (entry,) = [name for name in files(cache) if name.endswith(ENTRY_SUFFIX)]
+    with open(os.path.join(cache.path, entry), 'wb') as f:
+        f.write(b'not a pickle')
+    assert cache.get('key') is None
+    assert entry not in files(cache)
+
+
+def test_model_change_invalidates_only_old_generations(tmp_path):
+    old = DiskCache(str(tmp_path), fingerprint='a' * 64)
+    old.put('key', 1)
+    unrelated = tmp_path / 'reports'
+    unrelated.mkdir()
+    (unrelated / 'data.txt').write_text('keep')
+
+    new = DiskCache(str(tmp_path), fingerprint='b' * 64)
+    assert new.get('key') is None
+    assert not os.path.exists(old.path)
+    assert (unrelated / 'data.txt').read_text() == 'keep'
+    assert os.path.exists(os.path.join(new.path, MARKER_NAME))
+
+
+def test_eviction_keeps_directory_under_the_limit(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=20000, fingerprint='a' * 64)
+    for i in range(20):
+        cache.put(f'key-{i}', bytes(2000))
+    size = sum(os.path.getsize(os.path.join(cache.path, name))
+               for name in files(cache) if name.endswith(ENTRY_SUFFIX))
+    assert size <= 20000
+    assert cache.evictions > 0
+    assert cache.get('key-19') is not None
+
@@ -0,0 +1,76 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from models.distributed import (FRAME, MAX_PAYLOAD_BYTES, ProtocolError, encode_frame, read_frame as read_message,
+                                run_coordinator, run_worker)
+from models.parameters import ModelParameters
+from models.sweep import read_sweep, run_grid_sweep
+
+AXES = {'growth_rate_y1': [0.1, 0.25, 0.4, 0.55], 'active_conversion': [0.2, 0.3, 0.4]}
+OPTIONS = {'line_items': ('profit', 'revenue'), 'months': range(1, 13), 'chunk_size': 2}
+
+
+def read_frame(output_dir):
+    # pandas считает NaN равными (break_even_month без окупаемости), pyarrow — нет
+    return read_sweep(str(output_dir)).to_pandas()
+
+
+def run_cluster(output_dir, n_workers, before_workers=None):
+    """Coordinator on a free localhost port with ``n_workers`` worker threads"""
+    threads = []
+
+    def start_workers(port):
+        if before_workers is not None:
+            before_workers(port)
+        for i in range(n_workers):
+            thread = threading.Thread(target=run_worker, args=('127.0.0.1', port, f"test-{i + 1}", 10.0),
+                                      daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    summary = run_coordinator(ModelParameters.from_preset('standard'), AXES, str(output_dir),
+                              host='127.0.0.1', port=0, on_started=start_workers, **OPTIONS)
+    for thread in threads:
+        thread.join(timeout=10)
+    return summary
+
+
+def test_local_workers_match_single_process_sweep(tmp_path):
+    summary = run_cluster(tmp_path / 'cluster', n_workers=3)
+    run_grid_sweep(ModelParameters.from_preset('standard'), AXES, str(tmp_path / 'local'), **OPTIONS)
+
+    assert summary['n_scenarios'] == 12
+    assert read_frame(tmp_path / 'cluster').equals(read_frame(tmp_path / 'local'))
+
+
+def test_failed_handshake_does_not_stop_sweep(tmp_path):
+    def bad_client(port):
+        with socket.create_connection(('127.0.0.1', port)) as sock:
+            sock.sendall(encode_frame({'type': 'ready'}))
+
+    run_cluster(tmp_path / 'cluster', n_workers=2, before_workers=bad_client)
+    run_grid_sweep(ModelParameters.from_preset('standard'), AXES, str(tmp_path / 'local'), **OPTIONS)
+
+    assert read_frame(tmp_path / 'cluster').equals(read_frame(tmp_path / 'local'))
+
+
+def test_oversized_payload_is_rejected_before_reading():
+    async def read(data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_message(reader)
+
+    header = b'{"type": "result", "chunk": 0}'
+    with pytest.raises(ProtocolError, match='Payload'):
+        asyncio.run(read(FRAME.pack(len(header), MAX_PAYLOAD_BYTES + 1) + header))
+    assert asyncio.run(read(encode_frame({'type': 'ready'}, b'abc'))) == ({'type': 'ready'}, b'abc')
+
+
+def test_coordinator_refuses_remote_bind_without_opt_in(tmp_path):
+    with pytest.raises(ValueError, match='allow_remote'):
+        run_coordinator(ModelParameters.from_preset('standard'), AXES, str(tmp_path), host='0.0.0.0', port=0,
+                        **OPTIONS)
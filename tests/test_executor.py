@@ -0,0 +1,41 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from models.executor import get_executor
+from models.financial_model import calculate_financials_batch
+from models.parameters import ModelParameters, stack_parameters
+
+
+def square(x):
+    return x * x
+
+
+def exit_on_two(x):
+    if x == 2:
+        os._exit(1)
+    return x
+
+
+def test_executor_is_shared_and_keeps_input_order():
+    executor = get_executor()
+    assert get_executor() is executor
+    assert list(executor.map(square, range(20), workers=3)) == [x * x for x in range(20)]
+
+
+def test_broken_pool_is_replaced():
+    executor = get_executor()
+    with pytest.raises(BrokenProcessPool):
+        list(executor.map(exit_on_two, range(5)))
+    assert list(executor.map(square, range(5))) == [0, 1, 4, 9, 16]
+
+
+def test_shared_run_matches_batch():
+    matrix = stack_parameters([ModelParameters.from_preset(name) for name in ('pessimistic', 'standard', 'optimistic')])
+    matrix = np.repeat(matrix, 5, axis=0)
+    expected = calculate_financials_batch(matrix, months=range(1, 25))
+    with get_executor().run(matrix, range(1, 25), chunk_size=4, workers=2) as results:
+        for key in results.keys():
+            np.testing.assert_array_equal(results[key], expected[key])
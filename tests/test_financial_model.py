@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from models import financial_model
+from models.financial_model import (
+    LINE_ITEMS, calculate_financials, calculate_financials_batch, first_affected_month, iter_months,
+    recalculate_financials
+)
+from models.kernels import NUMBA_AVAILABLE
+from models.parameters import ModelParameters, stack_parameters
+from utils.presets import PRESETS
+
+MONTHS = range(1, 37)
+BACKENDS = ['python', 'numpy',
+            pytest.param('numba', marks=pytest.mark.skipif(not NUMBA_AVAILABLE, reason="numba is not installed"))]
+
+
+def preset_parameters():
+    presets = [ModelParameters.from_preset(name) for name in PRESETS]
+    # Когортный режим с оттоком считается отдельной веткой пакетного движка
+    return presets + [presets[1].replace(retention_decay=0.1, retention_floor=0.4)]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_batch_matches_scalar_forecast(backend):
+    presets = preset_parameters()
+    out = calculate_financials_batch(stack_parameters(presets), months=MONTHS, backend=backend)
+    for row, params in enumerate(presets):
+        scalar = calculate_financials(params, MONTHS)
+        for key in LINE_ITEMS:
+            np.testing.assert_allclose(out[key][row], scalar[key], rtol=1e-9, atol=1e-6,
+                                       err_msg=f"{key}, row {row}")
+
+
+@pytest.mark.parametrize('changes', [
+    {'growth_rate_y2': 0.35},
+    {'marketing_spend_rate': 0.2},
+    {'premium_user_start_month': 9},
+    {'ad_start_month': 20},
+    {'claim_period_months': 4},
+    {'expired_points_rate': 0.5},
+    {'burn_rate_fot_2': 5000000},
+    {'avg_check': 1500},
+])
+def test_recalculation_matches_full_forecast(changes):
+    previous_params = ModelParameters.from_preset('standard')
+    previous = calculate_financials(previous_params, MONTHS)
+    params = previous_params.replace(**changes)
+    recalculated = recalculate_financials(previous, previous_params, params)
+    full = calculate_financials(params, MONTHS)
+    for key in full.keys():
+        np.testing.assert_allclose(recalculated[key], full[key], rtol=1e-12, atol=1e-6, err_msg=key)
+
+
+def test_recalculation_starts_at_first_affected_month(monkeypatch):
+    previous_params = ModelParameters.from_preset('standard')
+    previous = calculate_financials(previous_params, MONTHS)
+    params = previous_params.replace(growth_rate_y2=0.35)
+    assert first_affected_month(previous_params, params) == 13
+
+    starts = []
+
+    def recording_iter_months(params, horizon, start_month=1, state=None):
+        starts.append(start_month)
+        return iter_months(params, horizon, start_month, state)
+
+    monkeypatch.setattr(financial_model, 'iter_months', recording_iter_months)
+    recalculated = recalculate_financials(previous, previous_params, params)
+    assert starts == [13]
+    np.testing.assert_array_equal(recalculated['profit'][:12], previous['profit'][:12])
+
+
+def test_change_without_monthly_effect_returns_previous_result():
+    previous_params = ModelParameters.from_preset('standard')
+    previous = calculate_financials(previous_params, MONTHS)
+    params = previous_params.replace(initial_investment=5000000)
+    assert recalculate_financials(previous, previous_params, params) is previous
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import numpy as np
+
+from forecast_service import ForecastService, MicroBatcher, ServiceStats
+from models.cache import forecast_cache
+from models.financial_model import calculate_financials
+from models.parameters import ModelParameters
+
+
+def scenarios(n, offset):
+    base = ModelParameters.from_preset('standard')
+    return [base.replace(avg_check=offset + i) for i in range(n)]
+
+
+async def submit_all(batcher, params_list, horizon=24):
+    return await asyncio.gather(*(batcher.submit(params, horizon) for params in params_list))
+
+
+def test_concurrent_requests_form_one_deduplicated_batch():
+    forecast_cache.clear()
+    stats = ServiceStats()
+    batcher = MicroBatcher(stats, window=0.05)
+    unique = scenarios(5, 1001.5)
+    requests = unique + unique[:3] + unique[:1]
+    results = asyncio.run(submit_all(batcher, requests))
+
+    assert stats.batches == 1
+    assert stats.batched_requests == len(requests)
+    assert stats.deduplicated == 4
+    assert list(stats.batch_sizes) == [5]
+    for params, result in zip(requests, results):
+        np.testing.assert_allclose(result['profit'], calculate_financials(params, range(1, 25))['profit'])
+    # Одинаковые запросы получают один и тот же объект
+    assert results[5] is results[0]
+
+
+def test_max_batch_flushes_early_and_cache_answers_repeats():
+    forecast_cache.clear()
+    stats = ServiceStats()
+    batcher = MicroBatcher(stats, window=10.0, max_batch=4)
+    requests = scenarios(8, 2001.5)
+    asyncio.run(asyncio.wait_for(submit_all(batcher, requests), timeout=30))
+    assert stats.batches == 2
+    assert list(stats.batch_sizes) == [4, 4]
+
+    asyncio.run(submit_all(batcher, requests))
+    assert stats.batches == 2
+
+
+def test_invalid_requests_get_400_and_are_not_batched():
+    service = ForecastService()
+
+    async def call(body):
+        return await service.dispatch('POST', '/forecast', json.dumps(body).encode())
+
+    assert asyncio.run(call({'params': {'growth_rte_y2': 0.1}}))[0] == 400
+    assert asyncio.run(call({'horizon': 'long'}))[0] == 400
+    assert asyncio.run(call({'params': {'claim_period_months': -3}}))[0] == 400
+    assert asyncio.run(call({'params': {'claim_period_months': 2.5}}))[0] == 400
+    assert asyncio.run(call({'params': {'cashback_rate': 1.5}}))[0] == 400
+    assert asyncio.run(call({'params': {'avg_check': -100}}))[0] == 400
+    assert asyncio.run(call({'preset': 'no-such-preset'}))[0] == 400
+    assert service.stats.batches == 0
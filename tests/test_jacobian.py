@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from models.financial_model import calculate_financials_batch
+from models.jacobian import forecast_jacobian
+from models.parameters import PARAMETER_KEYS, ModelParameters
+
+MONTHS = range(1, 37)
+ITEMS = ('revenue', 'expenses', 'profit', 'active_users', 'unclaimed_points')
+
+
+@pytest.mark.parametrize('preset', ['pessimistic', 'standard', 'optimistic'])
+def test_jacobian_matches_central_differences(preset):
+    params = ModelParameters.from_preset(preset)
+    result = forecast_jacobian(params, MONTHS)
+    base = params.to_row()
+
+    rows = []
+    steps = []
+    for key in result.parameters:
+        column = PARAMETER_KEYS.index(key)
+        step = 1e-6 * max(abs(base[column]), 1.0)
+        for sign in (1, -1):
+            row = base.copy()
+            row[column] += sign * step
+            rows.append(row)
+        steps.append(step)
+    out = calculate_financials_batch(np.array(rows), months=MONTHS, backend='numpy')
+
+    for item in ITEMS:
+        numeric = ((out[item][0::2] - out[item][1::2]) / (2 * np.array(steps))[:, None]).T
+        scale = np.abs(numeric).max(axis=0, keepdims=True) + 1.0
+        np.testing.assert_allclose(result.jacobian[item] / scale, numeric / scale, atol=1e-4, err_msg=item)
+
+
+def test_jacobian_values_match_forecast():
+    params = ModelParameters.from_preset('standard')
+    result = forecast_jacobian(params, MONTHS)
+    out = calculate_financials_batch(params.to_row(), months=MONTHS)
+    for item in ITEMS:
+        np.testing.assert_allclose(result.values[item], out[item][0], rtol=1e-12, atol=1e-6)
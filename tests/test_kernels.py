@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from models.financial_model import LINE_ITEMS, calculate_financials_batch
+from models.kernels import NUMBA_AVAILABLE
+from models.parameters import PARAMETER_KEYS, ModelParameters, stack_parameters
+
+MONTHS = range(1, 37)
+
+
+def fractional_batch():
+    """Presets with non-integer values in the integer columns"""
+    base = ModelParameters.from_preset('standard')
+    matrix = stack_parameters([base, ModelParameters.from_preset('optimistic'),
+                               ModelParameters.from_preset('pessimistic')])
+    matrix[:, PARAMETER_KEYS.index('ad_start_month')] = [7.4, 3.6, 12.5]
+    matrix[:, PARAMETER_KEYS.index('claim_period_months')] = [2.6, 1.4, 3.5]
+    matrix[:, PARAMETER_KEYS.index('premium_business_start_month')] = [5.5, 6.2, 8.9]
+    matrix[:, PARAMETER_KEYS.index('premium_user_start_month')] = [4.49, 9.51, 2.5]
+    return matrix
+
+
+BACKENDS = ['python', 'numpy',
+            pytest.param('numba', marks=pytest.mark.skipif(not NUMBA_AVAILABLE, reason="numba is not installed"))]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_kernels_agree_on_fractional_integer_parameters(backend):
+    matrix = fractional_batch()
+    reference = calculate_financials_batch(matrix, months=MONTHS, backend='numpy')
+    out = calculate_financials_batch(matrix, months=MONTHS, backend=backend)
+    for key in LINE_ITEMS:
+        np.testing.assert_allclose(out[key], reference[key], rtol=1e-9, atol=1e-6, err_msg=key)
+
+
+def test_result_does_not_depend_on_batch_size():
+    matrix = fractional_batch()
+    batch = calculate_financials_batch(np.repeat(matrix, 2, axis=0), months=MONTHS)
+    for row in range(len(matrix)):
+        alone = calculate_financials_batch(matrix[row:row + 1], months=MONTHS)
+        np.testing.assert_allclose(batch['profit'][2 * row], alone['profit'][0], rtol=1e-9, atol=1e-6)
+
+
+def test_fractional_values_match_rounded_parameters():
+    matrix = fractional_batch()
+    rounded = stack_parameters([ModelParameters.from_row(row) for row in matrix])
+    out = calculate_financials_batch(matrix, months=MONTHS, backend='numpy')
+    expected = calculate_financials_batch(rounded, months=MONTHS, backend='numpy')
+    np.testing.assert_array_equal(out['profit'], expected['profit'])
@@ -0,0 +1,69 @@
+import numpy as np
+
+from models.financial_model import calculate_financials, calculate_financials_batch, recalculate_financials
+from models.parameters import ModelParameters, stack_parameters
+from models.points_ledger import PointsLedger
+
+
+def test_ledger_conserves_points():
+    rng = np.random.default_rng(3)
+    claim_period = np.array([1, 2, 4])
+    ledger = PointsLedger(claim_period)
+    issued_total = redeemed_total = expired_total = np.zeros(3)
+    for _ in range(30):
+        issued = rng.uniform(0, 100, 3)
+        redeem = rng.uniform(0, 120, 3)
+        redeemed, expired = ledger.step(issued, redeem, np.array([0.5, 1.0, 0.0]))
+        issued_total = issued_total + issued
+        redeemed_total = redeemed_total + redeemed
+        expired_total = expired_total + expired
+        assert np.all(redeemed <= redeem + 1e-9)
+        assert np.all(ledger.vintages >= -1e-9)
+        np.testing.assert_allclose(issued_total, redeemed_total + expired_total + ledger.outstanding)
+
+
+def test_redemptions_take_oldest_vintage_first():
+    ledger = PointsLedger(np.array([3]))
+    ledger.step(np.array([10.0]), np.array([0.0]), 1.0)
+    ledger.step(np.array([20.0]), np.array([0.0]), 1.0)
+    redeemed, _ = ledger.step(np.array([0.0]), np.array([15.0]), 1.0)
+    assert redeemed[0] == 15.0
+    # От первого выпуска ничего не осталось, от второго — 15
+    _, expired = ledger.step(np.array([0.0]), np.array([0.0]), 1.0)
+    assert expired[0] == 0.0
+    _, expired = ledger.step(np.array([0.0]), np.array([0.0]), 1.0)
+    assert expired[0] == 15.0
+
+
+def test_remainder_lapses_one_claim_period_after_partial_expiry():
+    ledger = PointsLedger(np.array([2]))
+    expired = [ledger.step(np.array([100.0 if t == 0 else 0.0]), np.array([0.0]), 0.5)[1][0] for t in range(6)]
+    assert expired == [0.0, 0.0, 50.0, 0.0, 50.0, 0.0]
+    assert ledger.outstanding[0] == 0.0
+
+
+def test_outstanding_is_bounded_by_lifetime_issues():
+    claim_period = np.array([1, 3])
+    ledger = PointsLedger(claim_period)
+    for _ in range(40):
+        ledger.step(np.array([10.0, 10.0]), np.array([0.0, 0.0]), 0.0)
+    # Без погашений и без частичного сгорания живут выпуски последних lifetime месяцев
+    np.testing.assert_array_equal(ledger.outstanding, 10.0 * ledger.lifetime)
+
+
+def test_forecast_ledger_items_balance():
+    matrix = stack_parameters([ModelParameters.from_preset(name) for name in ('pessimistic', 'standard', 'optimistic')])
+    out = calculate_financials_batch(matrix, months=range(1, 37), points_ledger=True)
+    balance = (np.cumsum(out['points_issued'], axis=1) - np.cumsum(out['points_redeemed'], axis=1)
+               - np.cumsum(out['points_expired'], axis=1))
+    np.testing.assert_allclose(out['points_outstanding'], balance, rtol=1e-9, atol=1e-3)
+
+
+def test_ledger_forecast_exposes_liability_and_survives_recalculation():
+    params = ModelParameters.from_preset('standard')
+    result = calculate_financials(params, range(1, 25), points_ledger=True)
+    assert result['points_outstanding'][-1] > 0
+    changed = params.replace(growth_rate_y2=0.35)
+    recalculated = recalculate_financials(result, params, changed)
+    expected = calculate_financials(changed, range(1, 25), points_ledger=True)
+    np.testing.assert_array_equal(recalculated['points_outstanding'], expected['points_outstanding'])
@@ -0,0 +1,64 @@
+import numpy as np
+
+from models.financial_model import LINE_ITEMS, calculate_financials_batch
+from models.metrics import summarize
+from models.parameters import PARAMETER_KEYS, ModelParameters, stack_parameters
+from models.result_store import list_result_stores, open_result_store, write_result_store
+
+MONTHS = range(1, 19)
+
+
+def scenario_matrix(n=25):
+    base = stack_parameters([ModelParameters.from_preset(name) for name in ('pessimistic', 'standard', 'optimistic')])
+    matrix = np.repeat(base, -(-n // 3), axis=0)[:n]
+    matrix[:, PARAMETER_KEYS.index('avg_check')] *= np.linspace(0.5, 1.5, n)
+    return matrix
+
+
+def test_round_trip_matches_direct_forecast(tmp_path):
+    matrix = scenario_matrix()
+    names = [f"s{i}" for i in range(len(matrix))]
+    path = write_result_store(str(tmp_path / 'store'), matrix, names, months=MONTHS, chunk_size=7)
+    store = open_result_store(path)
+    expected = calculate_financials_batch(matrix, months=MONTHS)
+
+    assert len(store) == len(matrix)
+    assert store.scenarios.tolist() == names
+    np.testing.assert_array_equal(store.months, list(MONTHS))
+    np.testing.assert_array_equal(store.params, matrix)
+    for item in LINE_ITEMS:
+        np.testing.assert_array_equal(store.item(item), expected[item])
+    for key, values in summarize(expected, matrix).items():
+        np.testing.assert_array_equal(store.summary(key), values)
+    assert list_result_stores(str(tmp_path)) == ['store']
+
+
+def test_rows_and_top_follow_requested_order(tmp_path):
+    matrix = scenario_matrix()
+    store = open_result_store(write_result_store(str(tmp_path / 'store'), matrix, list(map(str, range(len(matrix)))),
+                                                 months=MONTHS))
+    indices = [17, 3, 20, 3]
+    np.testing.assert_array_equal(store.rows('profit', indices), np.asarray(store.item('profit'))[indices])
+
+    total = np.asarray(store.summary('total_profit'))
+    assert store.top('total_profit', 5).tolist() == np.argsort(-total, kind='stable')[:5].tolist()
+    assert store.top('total_profit', 5, largest=False).tolist() == np.argsort(total, kind='stable')[:5].tolist()
+
+
+def test_rewrite_reopens_the_store(tmp_path):
+    path = str(tmp_path / 'store')
+    first = open_result_store(write_result_store(path, scenario_matrix(6), list('abcdef'), months=MONTHS))
+    second = open_result_store(write_result_store(path, scenario_matrix(4), list('wxyz'), months=MONTHS))
+    assert second is not first
+    assert len(second) == 4
+    assert not (tmp_path / 'store.tmp').exists()
+    assert not (tmp_path / 'store.old').exists()
+
+
+def test_top_of_empty_store_is_empty(tmp_path):
+    store = open_result_store(write_result_store(str(tmp_path / 'store'), np.empty((0, len(PARAMETER_KEYS))), [],
+                                                 months=MONTHS))
+    assert len(store) == 0
+    assert store.top('total_profit', 5).tolist() == []
+    assert open_result_store(write_result_store(str(tmp_path / 'other'), scenario_matrix(3), list('abc'),
+                                                months=MONTHS)).top('total_profit', 0).tolist() == []
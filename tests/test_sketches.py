@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from models.monte_carlo import run_monte_carlo
+from models.parameters import ModelParameters
+from models.sketches import QuantileSketch, RunningMoments
+
+
+def sample(rng, n):
+    """Heavy-tailed values of both signs, as profit paths have"""
+    return np.column_stack([rng.lognormal(12, 1.5, n), rng.normal(-5e5, 2e6, n), rng.uniform(-10, 1e4, n)])
+
+
+@pytest.mark.parametrize('relative_accuracy', [0.01, 0.005])
+def test_quantiles_within_relative_accuracy(relative_accuracy):
+    values = sample(np.random.default_rng(0), 20000)
+    sketch = QuantileSketch(values.shape[1], relative_accuracy).add(values)
+    for q in (0.01, 0.05, 0.5, 0.95, 0.99):
+        exact = np.quantile(values, q, axis=0, method='lower')
+        estimate = sketch.quantile(q)
+        small = np.abs(exact) < sketch.min_value
+        assert np.all(np.abs(estimate - exact)[~small] <= relative_accuracy * np.abs(exact)[~small] * (1 + 1e-9))
+
+
+def test_merge_does_not_depend_on_split():
+    values = sample(np.random.default_rng(1), 9000)
+    whole = QuantileSketch(3).add(values)
+    parts = QuantileSketch(3)
+    for part in np.array_split(values, [10, 2500, 2501, 7000]):
+        parts.merge(QuantileSketch(3).add(part))
+    np.testing.assert_array_equal(parts.positive, whole.positive)
+    np.testing.assert_array_equal(parts.negative, whole.negative)
+    np.testing.assert_array_equal(parts.zero, whole.zero)
+
+    moments = RunningMoments(3)
+    for part in np.array_split(values, 4):
+        moments.add(part)
+    np.testing.assert_allclose(moments.mean, values.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(moments.std, values.std(axis=0), rtol=1e-9)
+
+
+def test_monte_carlo_identical_across_worker_counts():
+    params = ModelParameters.from_preset('standard')
+    runs = [run_monte_carlo(params, n_paths=3000, seed=5, workers=workers, chunk_size=500, months=range(1, 13))
+            for workers in (1, 2, 3)]
+    for other in runs[1:]:
+        for metric, bands in runs[0].bands.items():
+            for p, values in bands.items():
+                np.testing.assert_array_equal(other.bands[metric][p], values)
+            np.testing.assert_array_equal(other.mean[metric], runs[0].mean[metric])
+        np.testing.assert_array_equal(other.profitable_by_month, runs[0].profitable_by_month)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from models.financial_model import calculate_financials_batch
+from models.parameters import PARAMETER_KEYS, ModelParameters
+from models.solver import goal_seek, maximize, monthly_profit
+
+MONTHS = range(1, 25)
+AVG_CHECK = PARAMETER_KEYS.index('avg_check')
+
+
+def profit_at(params, values, month=24):
+    matrix = np.repeat(params.to_row()[None, :], len(values), axis=0)
+    matrix[:, AVG_CHECK] = values
+    return calculate_financials_batch(matrix, months=MONTHS)['profit'][:, month - 1]
+
+
+def test_goal_seek_recovers_known_solutions():
+    params = ModelParameters.from_preset('standard')
+    solutions = np.array([600.0, 1100.0, 1900.0])
+    targets = profit_at(params, solutions)
+    report = goal_seek(params, 'avg_check', monthly_profit(24), target=targets, low=100, high=5000, tol=1e-4)
+
+    assert report.converged.all()
+    assert np.all(report.bracket_width <= 1e-4)
+    np.testing.assert_allclose(report.values, solutions, atol=1e-3)
+    assert np.all(report.objective >= targets)
+    # Чуть левее решения цель ещё не достигнута
+    assert np.all(profit_at(params, report.values - 2e-3) < targets)
+
+
+def test_goal_seek_marks_unreachable_targets():
+    params = ModelParameters.from_preset('standard')
+    reachable = profit_at(params, [1000.0])[0]
+    report = goal_seek(params, 'avg_check', monthly_profit(24), target=[reachable, 1e15], low=100, high=5000)
+    assert report.converged.tolist() == [True, False]
+    assert np.isnan(report.values[1])
+
+
+def test_maximize_converges_to_interior_optimum():
+    params = ModelParameters.from_preset('standard')
+    column = PARAMETER_KEYS.index('cashback_rate')
+    report = maximize(params, 'cashback_rate', lambda out, matrix: -(matrix[:, column] - 0.0371) ** 2,
+                      low=0.0, high=0.2, tol=1e-7)
+    assert report.converged.all()
+    np.testing.assert_allclose(report.values, [0.0371], atol=1e-6)
+
+
+def test_maximize_respects_constraint():
+    params = ModelParameters.from_preset('standard')
+    column = PARAMETER_KEYS.index('cashback_rate')
+    report = maximize(params, 'cashback_rate', lambda out, matrix: matrix[:, column], low=0.0, high=0.2,
+                      constraint=lambda out, matrix: matrix[:, column] <= 0.123, tol=1e-7)
+    assert report.converged.all()
+    assert report.values[0] <= 0.123
+    np.testing.assert_allclose(report.values, [0.123], atol=1e-6)
@@ -9,3 +9,18 @@ def initialize_session_state():
         preset_data = PRESETS['standard'].copy()
         for key, value in preset_data.items():
             st.session_state[key] = value
+
+
+def get_horizon_years():
+    """Forecast horizon chosen on the main page, in years"""
+    return st.session_state.get('horizon_years', 2)
+
+
+def format_years(years):
+    return f"{years} года" if years in (2, 3, 4) else f"{years} лет"
+
+
+def get_model_parameters():
+    """Snapshot the current session state as immutable ModelParameters"""
+    from models.parameters import ModelParameters
+    return ModelParameters.from_mapping(st.session_state)
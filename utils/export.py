@@ -1,32 +1,50 @@
 import pandas as pd
 import json
 from datetime import datetime
-import plotly
 import os
 from utils.logging_config import log_info, log_error
 
-def export_financial_data(data, format='csv'):
+def export_financial_data(data, format='csv', output_dir='exports', name='financial_data'):
     """Export financial data to various formats"""
     try:
         # Create export directory if it doesn't exist
-        os.makedirs('exports', exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
         
         # Generate timestamp for unique filenames
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = os.path.join(output_dir, f'{name}_{timestamp}.{format}')
         
-        if format == 'csv':
+        # Колоночный ForecastResult, готовая таблица или прежний список словарей по месяцам
+        if isinstance(data, pd.DataFrame):
+            df = data
+        elif hasattr(data, 'to_pandas'):
+            df = data.to_pandas()
+        else:
             df = pd.DataFrame(data)
-            filename = f'exports/financial_data_{timestamp}.csv'
+
+        if format == 'csv':
             df.to_csv(filename, index=False)
             log_info(f"Financial data exported to CSV: {filename}")
             return filename
             
         elif format == 'json':
-            filename = f'exports/financial_data_{timestamp}.json'
+            if isinstance(data, pd.DataFrame):
+                records = json.loads(df.to_json(orient='records'))
+            elif hasattr(data, 'to_records'):
+                records = data.to_records()
+            else:
+                records = data
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                json.dump(records, f, ensure_ascii=False, indent=2)
             log_info(f"Financial data exported to JSON: {filename}")
             return filename
+
+        elif format == 'parquet':
+            df.to_parquet(filename, index=False)
+            log_info(f"Financial data exported to Parquet: {filename}")
+            return filename
+
+        raise ValueError(f"Unsupported export format: {format}")
             
     except Exception as e:
         log_error(e, context="Error exporting financial data")
@@ -41,6 +59,8 @@ def export_chart(figure, chart_name):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'exports/{chart_name}_{timestamp}.html'
         
+        import plotly.io  # только для графиков: пакетному запуску plotly не нужен
+
         plotly.io.write_html(figure, filename)
         log_info(f"Chart exported to HTML: {filename}")
         return filename
@@ -1,4 +1,3 @@
-import streamlit as st
 import json
 
 PRESETS = {
@@ -81,6 +80,8 @@ PRESETS = {
 
 
 def load_preset(preset_name):
+    import streamlit as st
+
     if preset_name in PRESETS:
         for key, value in PRESETS[preset_name].items():
             st.session_state[key] = value
@@ -100,6 +101,8 @@ def save_preset(preset_name, values):
 
 
 def load_custom_preset(preset_name):
+    import streamlit as st
+
     try:
         with open('custom_presets.json', 'r') as f:
             custom_presets = json.load(f)